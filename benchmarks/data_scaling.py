@@ -0,0 +1,70 @@
+""" Measure how writing, loading, preparing, down sampling and plotting the data scale with the number of vertices,
+    on the synthetic ISSM models of `utils.write_synthetic_issm`
+
+Usage:
+    python benchmarks/data_scaling.py --num_vertices 1000 10000 100000 1000000 --output data_scaling.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pinnicle as pinn
+
+
+def run(path, num_vertices, data_size, resolution):
+    """ time each stage on a synthetic model of `num_vertices` vertices
+    """
+    times = {"num_vertices": num_vertices}
+    start = time.perf_counter()
+    matfile, expfile = pinn.utils.write_synthetic_issm(path, filename=f"synthetic{num_vertices}",
+                                                       num_vertices=num_vertices, noise=0.01, seed=0)
+    times["write"] = time.perf_counter() - start
+    times["file_mb"] = os.path.getsize(matfile) / 2**20
+
+    data = pinn.modeldata.ISSMmdData(pinn.parameter.SingleDataParameter({"data_path": matfile,
+            "data_size": {"u": data_size, "v": data_size, "s": data_size, "H": data_size, "C": None}}))
+    start = time.perf_counter()
+    data.load_data()
+    times["load_data"] = time.perf_counter() - start
+    start = time.perf_counter()
+    data.prepare_training_data()
+    times["prepare_training_data"] = time.perf_counter() - start
+    start = time.perf_counter()
+    pinn.utils.down_sample(data.get_ice_coordinates(), data_size)
+    times["down_sample"] = time.perf_counter() - start
+    start = time.perf_counter()
+    data.plot(data_names=["u", "s"], resolution=resolution)
+    plt.close("all")
+    times["plot"] = time.perf_counter() - start
+    os.remove(matfile)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_vertices", nargs="+", type=int, default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--data_size", type=int, default=4000)
+    parser.add_argument("--resolution", type=int, default=200)
+    parser.add_argument("--output", default="", help="save the results to a json file")
+    args = parser.parse_args()
+
+    stages = ["write", "load_data", "prepare_training_data", "down_sample", "plot"]
+    results = []
+    print(f"{'vertices':>10}{'MB':>8}" + "".join(f"{s:>23}" for s in stages))
+    with tempfile.TemporaryDirectory() as path:
+        for n in args.num_vertices:
+            r = run(path, n, args.data_size, args.resolution)
+            results.append(r)
+            print(f"{r['num_vertices']:>10}{r['file_mb']:>8.1f}" + "".join(f"{r[s]:>23.3f}" for s in stages))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
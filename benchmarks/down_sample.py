@@ -0,0 +1,90 @@
+""" Compare `utils.down_sample` with the previous down sampling, which rebuilt a `KDTree` over all the points and queried
+    a full grid for each doubling of the resolution. Both are run on uniformly scattered points and on dense
+    altimetry-like tracks, the evenness of the selection is measured by the distance from the points to the nearest
+    selected point, the smaller the mean and the max, the more even the coverage
+
+Usage:
+    python benchmarks/down_sample.py --num_points 1000000 10000000 --data_size 1000 10000 --output down_sample.json
+"""
+import argparse
+import json
+import time
+import numpy as np
+from sklearn.neighbors import KDTree
+from pinnicle.utils import down_sample, down_sample_core
+
+
+def kdtree_down_sample(points, data_size):
+    """ the previous `down_sample`: `down_sample_core` with the resolution doubled until enough points
+    """
+    data_size = min(points.shape[0], data_size)
+    resolution = 2*int(np.ceil(data_size**0.5))
+    ind = down_sample_core(points, resolution=resolution)
+    while (resolution**2 < points.shape[0]) and (ind.shape[0] < data_size):
+        resolution *= 2
+        ind = down_sample_core(points, resolution=resolution)
+    if ind.shape[0] < data_size:
+        return ind
+    return np.random.choice(ind, data_size, replace=False)
+
+
+def make_points(kind, num_points, rng):
+    """ `num_points` points in a 100 km square, "uniform" scattered, or "tracks" along 200 random lines
+    """
+    if kind == "uniform":
+        return rng.uniform(0, 100e3, (num_points, 2))
+    num_tracks = 200
+    start = rng.uniform(0, 100e3, (num_tracks, 2))
+    angle = rng.uniform(0, np.pi, num_tracks)
+    track = rng.integers(0, num_tracks, num_points)
+    s = rng.uniform(-150e3, 150e3, num_points)
+    points = start[track] + s[:,None] * np.column_stack([np.cos(angle), np.sin(angle)])[track]
+    return points[np.all((points >= 0) & (points <= 100e3), axis=1)]
+
+
+def coverage(points, ind, probes):
+    """ mean and max distance from the probe points to the nearest selected point
+    """
+    dist, _ = KDTree(points[ind]).query(points[probes], k=1)
+    return float(dist.mean()), float(dist.max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num_points", nargs="+", type=int, default=[1000000, 10000000])
+    parser.add_argument("--data_size", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--kinds", nargs="+", default=["uniform", "tracks"], choices=["uniform", "tracks"])
+    parser.add_argument("--skip_kdtree", action="store_true", help="only run the current down sampling")
+    parser.add_argument("--output", default="", help="save the results to a json file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    methods = {"grid": down_sample} if args.skip_kdtree else {"kdtree": kdtree_down_sample, "grid": down_sample}
+    results = []
+    print(f"{'kind':<9}{'points':>10}{'size':>7}{'method':>8}{'time (s)':>10}{'selected':>10}{'mean dist':>11}{'max dist':>10}")
+    for kind in args.kinds:
+        for n in args.num_points:
+            points = make_points(kind, n, rng)
+            probes = rng.choice(points.shape[0], min(100000, points.shape[0]), replace=False)
+            for size in args.data_size:
+                for name, method in methods.items():
+                    start = time.perf_counter()
+                    ind = method(points, size)
+                    elapsed = time.perf_counter() - start
+                    mean, worst = coverage(points, ind, probes)
+                    r = {"kind": kind, "num_points": points.shape[0], "data_size": size, "method": name,
+                         "time": elapsed, "selected": int(ind.shape[0]), "mean_dist": mean, "max_dist": worst}
+                    results.append(r)
+                    print(f"{kind:<9}{r['num_points']:>10}{size:>7}{name:>8}{elapsed:>10.3f}{r['selected']:>10}{mean:>11.1f}{worst:>10.1f}")
+            # the sizes of several variables from one down sampling
+            sizes = {f"v{i}": size for i, size in enumerate(args.data_size)}
+            start = time.perf_counter()
+            down_sample(points, sizes)
+            print(f"{kind:<9}{points.shape[0]:>10}{'all':>7}{'grid':>8}{time.perf_counter() - start:>10.3f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+""" Compare the time per training step of the derivative engines in the physics module
+
+Usage:
+    python benchmarks/jacobian_engines.py --num_points 5000 --steps 50
+"""
+import argparse
+import time
+import numpy as np
+import deepxde as dde
+from deepxde.backend import tf
+from pinnicle.physics import Physics
+from pinnicle.parameter import PhysicsParameter, NNParameter
+from pinnicle.nn import FNN
+
+
+def build(equation, engine, num_neurons, num_layers):
+    """ set up the physics and the neural network for one equation with the given derivative engine
+    """
+    eq = {"scalar_variables": {"B": 1.26802073401e+08}, "derivative_engine": engine}
+    physics = Physics(PhysicsParameter({"equations": {equation: eq}}))
+    nn_params = NNParameter({"input_variables": physics.input_var,
+                             "output_variables": physics.output_var,
+                             "num_neurons": num_neurons,
+                             "num_layers": num_layers,
+                             "input_lb": np.array([0.0, 0.0]),
+                             "input_ub": np.array([1.0e5, 1.0e5]),
+                             "output_lb": np.array(physics.output_lb),
+                             "output_ub": np.array(physics.output_ub)})
+    return physics, FNN(nn_params).net
+
+
+def time_per_step(physics, net, X, steps):
+    """ average wall time of one Adam step on the pde residuals
+    """
+    opt = tf.keras.optimizers.Adam(1.0e-3)
+    weights = tf.constant(physics.pde_weights, dtype=X.dtype)
+
+    @tf.function
+    def train_step(x):
+        with tf.GradientTape() as tape:
+            y = net(x, training=True)
+            f = physics.pdes(x, y)
+            loss = tf.reduce_sum(weights * tf.stack([tf.reduce_mean(tf.square(r)) for r in f]))
+        grads = tape.gradient(loss, net.trainable_variables)
+        opt.apply_gradients(zip(grads, net.trainable_variables))
+        return loss
+
+    # trace and warm up
+    train_step(X)
+    start = time.perf_counter()
+    for _ in range(steps):
+        train_step(X)
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--equations", nargs="+", default=["SSA", "MOLHO", "MC"])
+    parser.add_argument("--engines", nargs="+", default=["component", "forward", "vectorized"])
+    parser.add_argument("--num_points", type=int, default=5000)
+    parser.add_argument("--num_neurons", type=int, default=20)
+    parser.add_argument("--num_layers", type=int, default=6)
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args()
+
+    X = tf.constant(np.random.uniform(0.0, 1.0e5, size=(args.num_points, 2)), dtype=dde.config.real(tf))
+
+    print(f"{'equation':<10}{'engine':<12}{'ms/step':>10}{'speedup':>10}")
+    for equation in args.equations:
+        baseline = None
+        for engine in args.engines:
+            physics, net = build(equation, engine, args.num_neurons, args.num_layers)
+            t = time_per_step(physics, net, X, args.steps)
+            baseline = t if baseline is None else baseline
+            print(f"{equation:<10}{engine:<12}{1000*t:>10.2f}{baseline/t:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
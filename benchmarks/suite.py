@@ -0,0 +1,160 @@
+""" Throughput benchmarks of PINN on CPU: setup time, training steps/s, peak RSS and predict throughput,
+    for DUMMY, SSA, MOLHO, MC and SSA+MC at several collocation sizes, data sizes and network sizes.
+    The data are written by `utils.write_synthetic_issm`, so the suite runs offline. Each case runs in a new process,
+    so that the peak RSS belongs to the case, and the results are written as json lines, one case per line, with the versions
+
+Usage:
+    python benchmarks/suite.py --output results.jsonl
+    python benchmarks/suite.py --equations SSA --num_collocation_points 1000 10000 --num_neurons 20 40 --steps 50
+    python benchmarks/suite.py --compare old.jsonl new.jsonl
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# the data of each case, None for the boundary values only
+equations = {
+    "DUMMY": {"equations": {"DUMMY": {"output": ["u", "v", "s", "H"]}},
+              "data_size": {"u":1, "v":1, "s":1, "H":1}},
+    "SSA": {"equations": {"SSA": {"scalar_variables": {"B": 1.26802073401e+08}}},
+            "data_size": {"u":1, "v":1, "s":1, "H":1, "C":None}},
+    "MOLHO": {"equations": {"MOLHO": {"scalar_variables": {"B": 1.26802073401e+08}}},
+              "data_size": {"u":1, "v":1, "s":1, "H":1, "C":None}},
+    "MC": {"equations": {"MC": {}},
+           "data_size": {"u":1, "v":1, "a":1, "H":1}},
+    "SSA+MC": {"equations": {"SSA": {"scalar_variables": {"B": 1.26802073401e+08}}, "MC": {}},
+               "data_size": {"u":1, "v":1, "s":1, "H":1, "a":1, "C":None}},
+    }
+
+# keys of a case, the others in the results are the measurements
+case_keys = ["equation", "num_collocation_points", "data_size", "num_neurons", "num_layers"]
+
+
+def run(case, steps, num_vertices, num_predict):
+    """ set up, train and predict one case, return the measurements
+    """
+    import deepxde as dde
+    import numpy as np
+    import pinnicle as pinn
+    dde.config.set_default_float('float64')
+
+    with tempfile.TemporaryDirectory() as path:
+        matfile, shapefile = pinn.utils.write_synthetic_issm(path, num_vertices=num_vertices, noise=0.01, seed=0)
+        hp = {}
+        hp["epochs"] = steps
+        hp["learning_rate"] = 0.001
+        hp["loss_functions"] = "MSE"
+        hp["is_save"] = False
+        hp["num_neurons"] = case["num_neurons"]
+        hp["num_layers"] = case["num_layers"]
+        hp["shapefile"] = shapefile
+        hp["num_collocation_points"] = case["num_collocation_points"]
+        hp["equations"] = equations[case["equation"]]["equations"]
+        data_size = {k: (case["data_size"] if v else None) for k, v in equations[case["equation"]]["data_size"].items()}
+        hp["data"] = {"ISSM": {"data_path": matfile, "data_size": data_size}}
+
+        # including loading the data
+        start = time.perf_counter()
+        experiment = pinn.PINN(params=hp)
+        experiment.compile()
+        setup_time = time.perf_counter() - start
+        # the first step includes tracing
+        start = time.perf_counter()
+        experiment.train(1)
+        first_step = time.perf_counter() - start
+        start = time.perf_counter()
+        experiment.train(steps)
+        train_time = time.perf_counter() - start
+
+        X = np.random.default_rng(0).uniform(experiment.params.nn.input_lb, experiment.params.nn.input_ub, (num_predict, 2))
+        experiment.predict(X[:10])
+        start = time.perf_counter()
+        experiment.predict(X)
+        predict_time = time.perf_counter() - start
+
+    result = dict(case)
+    result.update({"setup_time": setup_time, "first_step_time": first_step, "steps_per_s": steps / train_time,
+                   "predict_points_per_s": num_predict / predict_time,
+                   # kilobytes on linux
+                   "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+                   "steps": steps, "num_vertices": num_vertices, "num_predict": num_predict})
+    return result
+
+
+def versions():
+    """ versions of the code and the environment, saved with each result
+    """
+    import deepxde as dde
+    import numpy as np
+    from deepxde.backend import backend_name, tf
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True).stdout.strip()
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__, "deepxde": dde.__version__,
+            "backend": backend_name, "tensorflow": tf.__version__, "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare(old, new):
+    """ print the ratio new/old of the measurements of the cases in both files
+    """
+    def load(filename):
+        with open(filename) as f:
+            return {tuple(r[k] for k in case_keys): r for r in map(json.loads, f) if "error" not in r}
+    old, new = load(old), load(new)
+    metrics = ["setup_time", "steps_per_s", "peak_rss_mb", "predict_points_per_s"]
+    print(f"{'case':<40}" + "".join(f"{m:>22}" for m in metrics))
+    for key in new:
+        if key in old:
+            print(f"{str(key):<40}" + "".join(f"{new[key][m]/old[key][m]:>22.2f}" for m in metrics))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--equations", nargs="+", default=list(equations), choices=list(equations))
+    parser.add_argument("--num_collocation_points", nargs="+", type=int, default=[1000, 5000])
+    parser.add_argument("--data_size", nargs="+", type=int, default=[1000])
+    parser.add_argument("--num_neurons", nargs="+", type=int, default=[20])
+    parser.add_argument("--num_layers", nargs="+", type=int, default=[6])
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--num_vertices", type=int, default=20000)
+    parser.add_argument("--num_predict", type=int, default=100000)
+    parser.add_argument("--output", default="benchmark.jsonl", help="the results are appended to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.child:
+        print(json.dumps(run(json.loads(args.child), args.steps, args.num_vertices, args.num_predict)))
+        return
+
+    info = versions()
+    cases = [dict(zip(case_keys, values)) for values in itertools.product(args.equations, args.num_collocation_points,
+             args.data_size, args.num_neurons, args.num_layers)]
+    print(f"{'equation':<8}{'colloc':>8}{'data':>8}{'width':>6}{'depth':>6}{'setup (s)':>11}{'steps/s':>9}{'RSS (MB)':>10}{'predict pts/s':>15}")
+    for case in cases:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", json.dumps(case), "--steps", str(args.steps),
+               "--num_vertices", str(args.num_vertices), "--num_predict", str(args.num_predict)]
+        out = subprocess.run(cmd, capture_output=True, text=True)
+        if out.returncode != 0:
+            result = dict(case, error=out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed")
+        else:
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{case['equation']:<8}{case['num_collocation_points']:>8}{case['data_size']:>8}{case['num_neurons']:>6}"
+                  f"{case['num_layers']:>6}{result['setup_time']:>11.2f}{result['steps_per_s']:>9.2f}"
+                  f"{result['peak_rss_mb']:>10.0f}{result['predict_points_per_s']:>15.0f}")
+        result.update(info)
+        with open(args.output, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+""" Measure the training steps/s of SSA and the prediction throughput at different numbers of threads on CPU,
+    each setting runs in a new process, since the threads can only be set before the runtime is initialized
+
+Usage:
+    python benchmarks/thread_scaling.py --intra_op 1 2 4 8 16 --inter_op 1 2 --steps 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+repoPath = os.path.join(os.path.dirname(__file__), "..", "examples")
+appDataPath = os.path.join(repoPath, "dataset")
+
+
+def run(intra_op, inter_op, cpu_affinity, steps, num_collocation_points, num_neurons, num_layers):
+    """ set up and train a PINN of SSA on the Helheim example with the given threads, return the timing
+    """
+    import deepxde as dde
+    import numpy as np
+    import pinnicle as pinn
+    dde.config.set_default_float('float64')
+
+    hp = {}
+    hp["epochs"] = 1
+    hp["learning_rate"] = 0.001
+    hp["loss_functions"] = "MSE"
+    hp["is_save"] = False
+    hp["num_intra_op_threads"] = intra_op
+    hp["num_inter_op_threads"] = inter_op
+    hp["cpu_affinity"] = cpu_affinity
+    hp["num_neurons"] = num_neurons
+    hp["num_layers"] = num_layers
+    hp["shapefile"] = os.path.join(appDataPath, "fastflow_CF.exp")
+    hp["num_collocation_points"] = num_collocation_points
+    hp["equations"] = {"SSA": {"scalar_variables": {"B": 1.26802073401e+08}}}
+    issm = {"data_path": os.path.join(appDataPath, "Helheim_fastflow.mat"),
+            "data_size": {"u":1000, "v":1000, "s":1000, "H":1000, "C":None, "vel":1000}}
+    hp["data"] = {"ISSM": issm}
+    experiment = pinn.PINN(params=hp)
+    experiment.compile()
+    # the first step includes tracing
+    experiment.train(1)
+    start = time.perf_counter()
+    experiment.train(steps)
+    train_time = time.perf_counter() - start
+
+    X = np.random.default_rng(0).uniform(experiment.params.nn.input_lb, experiment.params.nn.input_ub, (100000, 2))
+    experiment.predict(X)
+    start = time.perf_counter()
+    experiment.predict(X)
+    predict_time = time.perf_counter() - start
+    return {"intra_op": intra_op, "inter_op": inter_op, "cpus": len(os.sched_getaffinity(0)),
+            "steps_per_s": steps / train_time, "predict_points_per_s": X.shape[0] / predict_time}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intra_op", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--inter_op", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--pin", action="store_true", help="pin each run to the first intra_op cpus")
+    parser.add_argument("--num_collocation_points", type=int, default=5000)
+    parser.add_argument("--num_neurons", type=int, default=20)
+    parser.add_argument("--num_layers", type=int, default=6)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--output", default="", help="save the results to a json file")
+    parser.add_argument("--child", nargs=2, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        intra_op, inter_op = args.child
+        cpus = sorted(os.sched_getaffinity(0))[:intra_op] if args.pin else []
+        result = run(intra_op, inter_op, cpus, args.steps, args.num_collocation_points, args.num_neurons, args.num_layers)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for inter_op in args.inter_op:
+        for intra_op in args.intra_op:
+            cmd = [sys.executable, __file__, "--child", str(intra_op), str(inter_op), "--steps", str(args.steps),
+                   "--num_collocation_points", str(args.num_collocation_points),
+                   "--num_neurons", str(args.num_neurons), "--num_layers", str(args.num_layers)] + (["--pin"] if args.pin else [])
+            out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'intra_op':>10}{'inter_op':>10}{'cpus':>6}{'steps/s':>10}{'speedup':>10}{'predict pts/s':>16}")
+    baseline = results[0]["steps_per_s"]
+    for r in results:
+        print(f"{r['intra_op']:>10}{r['inter_op']:>10}{r['cpus']:>6}{r['steps_per_s']:>10.2f}"
+              f"{r['steps_per_s']/baseline:>10.2f}{r['predict_points_per_s']:>16.0f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
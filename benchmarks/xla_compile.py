@@ -0,0 +1,72 @@
+""" Compare the time per training step of PINN with and without XLA (`jit_compile`) on CPU
+
+Usage:
+    python benchmarks/xla_compile.py --steps 100
+"""
+import argparse
+import os
+import time
+import deepxde as dde
+import pinnicle as pinn
+
+dde.config.set_default_float('float64')
+
+repoPath = os.path.join(os.path.dirname(__file__), "..", "examples")
+appDataPath = os.path.join(repoPath, "dataset")
+
+# data used by each equation
+data_size = {"SSA": {"u":1000, "v":1000, "s":1000, "H":1000, "C":None, "vel":1000},
+             "MOLHO": {"u":1000, "v":1000, "s":1000, "H":1000, "C":None, "vel":1000},
+             "MC": {"u":1000, "v":1000, "a":1000, "H":1000, "vel":1000}}
+
+
+def build(equation, jit_compile, num_collocation_points, num_neurons, num_layers):
+    """ set up a PINN of the given equation on the Helheim example
+    """
+    hp = {}
+    hp["epochs"] = 1
+    hp["learning_rate"] = 0.001
+    hp["loss_functions"] = "MSE"
+    hp["is_save"] = False
+    hp["jit_compile"] = jit_compile
+    hp["num_neurons"] = num_neurons
+    hp["num_layers"] = num_layers
+    hp["shapefile"] = os.path.join(appDataPath, "fastflow_CF.exp")
+    hp["num_collocation_points"] = num_collocation_points
+    hp["equations"] = {equation: {"scalar_variables": {"B": 1.26802073401e+08}}}
+    issm = {"data_path": os.path.join(appDataPath, "Helheim_fastflow.mat"), "data_size": data_size[equation]}
+    hp["data"] = {"ISSM": issm}
+    hp["additional_loss"] = {"vel": {"name": "vel log", "function": "VEL_LOG", "weight": 1.0e-5}}
+    return pinn.PINN(params=hp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--equations", nargs="+", default=["SSA", "MOLHO", "MC"])
+    parser.add_argument("--num_collocation_points", type=int, default=5000)
+    parser.add_argument("--num_neurons", type=int, default=20)
+    parser.add_argument("--num_layers", type=int, default=6)
+    parser.add_argument("--steps", type=int, default=100)
+    args = parser.parse_args()
+
+    results = []
+    for equation in args.equations:
+        for jit_compile in [False, True]:
+            experiment = build(equation, jit_compile, args.num_collocation_points, args.num_neurons, args.num_layers)
+            experiment.compile()
+            # the first step includes tracing and compilation
+            start = time.perf_counter()
+            experiment.train(1)
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            experiment.train(args.steps)
+            results.append((equation, jit_compile, first, (time.perf_counter() - start) / args.steps))
+
+    print(f"{'equation':<10}{'jit_compile':<14}{'first step (s)':>16}{'ms/step':>10}{'speedup':>10}")
+    for equation, jit_compile, first, t in results:
+        baseline = [r[3] for r in results if r[0] == equation and not r[1]][0]
+        print(f"{equation:<10}{str(jit_compile):<14}{first:>16.2f}{1000*t:>10.2f}{baseline/t:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,6 @@ import numpy as np
 import deepxde as dde
 
 dde.config.set_default_float('float64')
-dde.config.disable_xla_jit()
 dde.config.set_random_seed(1234)
 
 # General parameters
@@ -15,6 +14,8 @@ hp["loss_function"] = "MSE"
 hp["save_path"] = "./Models/Helheim_test"
 hp["is_save"] = False
 hp["is_plot"] = True
+# compile the training step, the losses and the predictions with XLA
+hp["jit_compile"] = True
 
 # NN
 hp["activation"] = "tanh"
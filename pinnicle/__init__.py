@@ -6,3 +6,4 @@ from . import nn
 from . import domain
 
 from .pinn import PINN
+from .sweep import Sweep, SuccessiveHalving
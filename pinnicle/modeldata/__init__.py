@@ -1,3 +1,6 @@
+from .cache import DataCache
 from .data import DataBase, Data
 from .issm_data import ISSMmdData
 from .general_mat_data import MatData
+from .minibatch import MiniBatchPDE, MiniBatchPointSetBC, MiniBatchPointSetOperatorBC
+from .ensemble import EnsemblePDE, EnsembleMiniBatchPDE
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+
+class DataCache:
+    """ on-disk cache of the loaded data, each entry is a folder of `.npy` files, one for each array in "X_dict",
+        "data_dict", "mask_dict" and "mesh_dict" of a `DataBase`, which are memory-mapped when loaded again.
+        The key of an entry is the path, size and modification time of the data file, with the source and the `name_map`,
+        so a changed file is loaded again. The total size is bounded by `max_size`, the least recently used entries
+        are removed first
+
+    Args:
+        path (str): folder of the cache
+        max_size (int): maximum number of bytes of all the entries
+    """
+    # bump when the content of an entry changes, so the old entries are not used
+    _VERSION = 1
+    _GROUPS = ["X_dict", "data_dict", "mask_dict", "mesh_dict"]
+
+    def __init__(self, path, max_size=2**30):
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, parameters):
+        """ the key of the data file of `parameters`, a `SingleDataParameter`
+        """
+        stat = os.stat(parameters.data_path)
+        info = {"path": os.path.abspath(parameters.data_path), "size": stat.st_size, "mtime": stat.st_mtime_ns,
+                "source": parameters.source, "name_map": parameters.name_map, "version": self._VERSION}
+        return hashlib.sha256(json.dumps(info, sort_keys=True).encode()).hexdigest()[:32]
+
+    def load(self, key):
+        """ the dicts of the entry `key`, with the arrays memory-mapped read-only, None if not in the cache
+        """
+        folder = os.path.join(self.path, key)
+        meta_file = os.path.join(folder, "meta.json")
+        if not os.path.isfile(meta_file):
+            return None
+        with open(meta_file, "r") as f:
+            meta = json.load(f)
+        data = {g: {k: np.load(os.path.join(folder, f"{g}.{k}.npy"), mmap_mode="r") for k in meta["names"][g]}
+                for g in self._GROUPS}
+        # the access time for eviction
+        os.utime(meta_file)
+        return data
+
+    def save(self, key, data):
+        """ add the dicts `data` as the entry `key`, then remove the least recently used entries above `max_size`
+
+        Returns:
+            False if the data can not be cached, i.e. not numeric, or larger than `max_size`
+        """
+        arrays = {g: {k: np.asarray(v) for k, v in data.get(g, {}).items()} for g in self._GROUPS}
+        if any(v.dtype.hasobject for d in arrays.values() for v in d.values()):
+            return False
+        size = sum(v.nbytes for d in arrays.values() for v in d.values())
+        if size > self.max_size:
+            return False
+
+        # written to a temporary folder, then renamed, so a partial entry is never loaded
+        folder = os.path.join(self.path, key)
+        tmp = folder + f".tmp{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        for g, d in arrays.items():
+            for k, v in d.items():
+                np.save(os.path.join(tmp, f"{g}.{k}.npy"), v)
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"names": {g: list(d) for g, d in arrays.items()}, "size": size, "created": time.time()}, f)
+        try:
+            os.rename(tmp, folder)
+        except OSError:
+            # the same entry is saved by another process
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=key)
+        return True
+
+    def entries(self):
+        """ list of (key, size, last access time) of all the entries, the least recently used first
+        """
+        entries = []
+        for key in os.listdir(self.path):
+            meta_file = os.path.join(self.path, key, "meta.json")
+            if ".tmp" in key or not os.path.isfile(meta_file):
+                continue
+            try:
+                with open(meta_file, "r") as f:
+                    size = json.load(f)["size"]
+                entries.append((key, size, os.path.getmtime(meta_file)))
+            except (OSError, ValueError):
+                # removed by another process
+                continue
+        return sorted(entries, key=lambda e: e[2])
+
+    def evict(self, keep=None):
+        """ remove the least recently used entries until the total size is not larger than `max_size`
+        """
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        for key, size, _ in entries:
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+            total -= size
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from ..parameter import DataParameter, SingleDataParameter
 from ..physics import Constants
+from .cache import DataCache
 import numpy as np
 
 
@@ -44,6 +45,14 @@ class DataBase(ABC):
         """
         pass
 
+    def set_data(self, X_dict, data_dict, mask_dict={}, mesh_dict={}):
+        """ use the dicts loaded elsewhere, e.g. shared between the workers of a `Sweep`, instead of `load_data`
+        """
+        self.X_dict = dict(X_dict)
+        self.data_dict = dict(data_dict)
+        self.mask_dict = dict(mask_dict)
+        self.mesh_dict = dict(mesh_dict)
+
     @abstractmethod
     def prepare_training_data(self):
         """ prepare training data according to the `data_size`
@@ -70,11 +79,29 @@ class Data(Constants):
         """
         return np.vstack([self.data[k].get_ice_coordinates(mask_name=mask_name) for k in self.data])
 
-    def load_data(self):
-        """ laod all the data in `self.data`
+    def load_data(self, preloaded={}):
+        """ laod all the data in `self.data`, through the cache in `data_cache_path` if it is set
+
+        Args:
+            preloaded (dict): dicts of "X_dict", "data_dict", "mask_dict" and "mesh_dict" already loaded
+                for some of the keys in `self.data`, these data are not read from the files again
         """
+        cache = DataCache(self.parameters.data_cache_path, self.parameters.data_cache_size) if self.parameters.data_cache_path else None
         for k in self.data:
-            self.data[k].load_data()
+            if k in preloaded:
+                self.data[k].set_data(**preloaded[k])
+            elif cache is not None:
+                # the arrays from the cache are read-only
+                key = cache.key(self.data[k].parameters)
+                cached = cache.load(key)
+                if cached is not None:
+                    self.data[k].set_data(**cached)
+                else:
+                    self.data[k].load_data()
+                    cache.save(key, {"X_dict": self.data[k].X_dict, "data_dict": self.data[k].data_dict,
+                                     "mask_dict": self.data[k].mask_dict, "mesh_dict": self.data[k].mesh_dict})
+            else:
+                self.data[k].load_data()
 
     def prepare_training_data(self):
         """ merge all `X` and `sol` in `self.data` to `self.X` and `self.sol` with the keys
@@ -0,0 +1,52 @@
+import deepxde as dde
+from deepxde.backend import tf
+from .minibatch import MiniBatchPDE
+
+
+class EnsembleLosses:
+    """ losses of an ensemble network, see `nn.EnsembleFNN`, which evaluates all the members on the same points.
+        The pdes and the operators are evaluated on the outputs of all the members together, then each loss term
+        is the mean over all the members, so that the members are trained independently in one step
+
+    Args:
+        num_members (int): number of the networks in the ensemble
+        the others are passed to the PDE data class
+    """
+    def __init__(self, *args, num_members=1, **kwargs):
+        self.num_members = num_members
+        super().__init__(*args, **kwargs)
+
+    def losses(self, targets, outputs, loss_fn, inputs, model, aux=None):
+        n = tf.shape(inputs)[0]
+        # the derivatives are taken w.r.t. the repeated inputs of all the members, so the outputs are evaluated again
+        # from them, instead of reading them from the state of the network
+        inputs, outputs = model.net.forward(inputs)
+        f = []
+        if self.pde is not None:
+            f = self.pde(inputs, outputs)
+            if not isinstance(f, (list, tuple)):
+                f = [f]
+        if not isinstance(loss_fn, (list, tuple)):
+            loss_fn = [loss_fn] * (len(f) + len(self.bcs))
+
+        bcs_start = [0]
+        for num in self.num_bcs:
+            bcs_start.append(bcs_start[-1] + num)
+        members = range(self.num_members)
+        errors = [tf.concat([fi[k*n+bcs_start[-1]:(k+1)*n] for k in members], 0) for fi in f]
+        # the bc points are the same for all the members, only shifted by k*n in the outputs
+        errors += [tf.concat([bc.error(self.train_x, inputs, outputs, k*n+bcs_start[i], k*n+bcs_start[i+1]) for k in members], 0)
+                   for i, bc in enumerate(self.bcs)]
+        return [loss_fn[i](tf.zeros_like(e), e) for i, e in enumerate(errors)]
+
+
+class EnsemblePDE(EnsembleLosses, dde.data.PDE):
+    """ `dde.data.PDE` for an ensemble network
+    """
+    pass
+
+
+class EnsembleMiniBatchPDE(EnsembleLosses, MiniBatchPDE):
+    """ `MiniBatchPDE` for an ensemble network
+    """
+    pass
@@ -55,6 +55,8 @@ class MatData(DataBase, Constants):
         # prepare x,y coordinates
         X_temp = self.get_ice_coordinates()
         max_data_size = X_temp.shape[0]
+        # downsample once for all the variables
+        idx_dict = down_sample(X_temp, {k:data_size[k] for k in self.data_dict if (k in data_size) and (data_size[k] is not None)})
 
         # go through all keys in data_dict
         for k in self.data_dict:
@@ -64,7 +66,7 @@ class MatData(DataBase, Constants):
                     # apply ice mask
                     sol_temp = self.data_dict[k].flatten()[:,None]
                     # random choose to a downscale sampling of the scatter data
-                    idx = down_sample(X_temp, data_size[k])
+                    idx = idx_dict[k]
                     self.X[k] = X_temp[idx, :]
                     self.sol[k] = sol_temp[idx, :]
                 else:
@@ -1,14 +1,80 @@
 from . import DataBase
 from ..parameter import SingleDataParameter
 from ..physics import Constants
-from ..utils import plot_dict_data, load_mat
+from ..utils import plot_dict_data, load_mat_fields
 import numpy as np
 
 
+class LazyDict(dict):
+    """ dict of the data, the keys in `keys` are loaded by `loader(names)` when they are first accessed, each is only
+        loaded once. Listing or iterating over the keys loads all of them, so that all the variables in the file are seen
+    """
+    def __init__(self, loader, keys, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loader = loader
+        # the keys not tried yet
+        self.lazy_keys = [k for k in keys if not dict.__contains__(self, k)]
+
+    def load(self, keys=None):
+        """ load the `keys` not tried yet, all of them if None
+        """
+        keys = [k for k in self.lazy_keys if (keys is None) or (k in keys)]
+        if keys:
+            self.lazy_keys = [k for k in self.lazy_keys if k not in keys]
+            self.loader(keys)
+
+    def __missing__(self, key):
+        self.load([key])
+        if not dict.__contains__(self, key):
+            raise KeyError(key)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        self.load([key])
+        return dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        self.load([key])
+        return dict.get(self, key, default)
+
+    def __iter__(self):
+        self.load()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self.load()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.load()
+        return dict.keys(self)
+
+    def values(self):
+        self.load()
+        return dict.values(self)
+
+    def items(self):
+        self.load()
+        return dict.items(self)
+
+
 class ISSMmdData(DataBase, Constants):
     """ data loaded from model in ISSM
     """
     _DATA_TYPE = "ISSM"
+    # the fields of `md` read for the coordinates, the masks and the mesh
+    _MESH_FIELDS = ["mesh/x", "mesh/y", "mask/ice_levelset", "mesh/vertexonboundary", "mesh/edges", "mesh/elements",
+                    "mesh/lat", "mesh/long"]
+    # the fields of `md` read for each variable
+    _FIELDS = {"u": ["inversion/vx_obs"],
+               "v": ["inversion/vy_obs"],
+               "s": ["geometry/surface"],
+               "a": ["smb/mass_balance", "balancethickness/thickening_rate"],
+               "H": ["geometry/thickness"],
+               "C": ["friction/C", "friction/coefficient", "materials/rho_ice", "materials/rho_water", "constants/g",
+                     "geometry/thickness", "geometry/base"],
+               "B": ["materials/rheology_B"],
+               "vel": ["inversion/vx_obs", "inversion/vy_obs"]}
     def __init__(self, parameters=SingleDataParameter()):
         Constants.__init__(self)
         super().__init__(parameters)
@@ -37,49 +103,85 @@ class ISSMmdData(DataBase, Constants):
         return iice
 
     def load_data(self):
-        """ load ISSM model from a `.mat` file
+        """ load ISSM model from a `.mat` file, only the coordinates, the masks, the mesh and the variables in `data_size`
+            are read, all the variables if `data_size` is empty, the others are read when they are accessed in `data_dict`
         """
-        # Reading matlab data
-        data = load_mat(self.parameters.data_path)
-        # get the model
-        md = data['md']
-        # create the output dict
+        md = load_mat_fields(self.parameters.data_path, ["md/"+f for f in self._MESH_FIELDS])
         # x,y coordinates
-        self.X_dict['x'] = md['mesh']['x']
-        self.X_dict['y'] = md['mesh']['y']
-        # data
-        self.data_dict['u'] = md['inversion']['vx_obs']/self.yts
-        self.data_dict['v'] = md['inversion']['vy_obs']/self.yts
-        self.data_dict['s'] = md['geometry']['surface']
-        self.data_dict['a'] = (md['smb']['mass_balance'] - md['balancethickness']['thickening_rate'])/self.yts
-        self.data_dict['H'] = md['geometry']['thickness']
-        # check the friction law
-        if 'C' in md['friction']:
-            self.data_dict['C'] = md['friction']['C'] # Weertman
-        else:
-            # convert Budd to Weertman type friction coefficient
-            C_b = md['friction']['coefficient'] # Budd
-            rho_ice = md['materials']['rho_ice']
-            rho_w = md['materials']['rho_water']
-            g = md['constants']['g']
-            base = md['geometry']['base']
-            N = rho_ice*g*self.data_dict['H'] + rho_w*g*base
-            N[np.where(N <= 0, True, False)] = 1
-            self.data_dict['C'] = C_b*np.sqrt(N)
-
-        self.data_dict['B'] = md['materials']['rheology_B']
-        self.data_dict['vel'] = np.sqrt(self.data_dict['u']**2.0+self.data_dict['v']**2.0)
-        # clean up is any of the keys are empty
-        self.data_dict = {k:self.data_dict[k] for k in self.data_dict if self.data_dict[k].shape != ()}
+        self.X_dict['x'] = md['md/mesh/x']
+        self.X_dict['y'] = md['md/mesh/y']
         # ice mask
-        self.mask_dict['icemask'] = md['mask']['ice_levelset']
+        self.mask_dict['icemask'] = md['md/mask/ice_levelset']
         # B.C.
-        self.mask_dict['DBC_mask'] = md['mesh']['vertexonboundary']
+        self.mask_dict['DBC_mask'] = md['md/mesh/vertexonboundary']
         # mesh information
-        self.mesh_dict['edges'] = md['mesh']['edges']
-        self.mesh_dict['elements'] = md['mesh']['elements']
-        self.mesh_dict['lat'] = md['mesh']['lat']
-        self.mesh_dict['long'] = md['mesh']['long']
+        self.mesh_dict['edges'] = md['md/mesh/edges']
+        self.mesh_dict['elements'] = md['md/mesh/elements']
+        self.mesh_dict['lat'] = md['md/mesh/lat']
+        self.mesh_dict['long'] = md['md/mesh/long']
+        # data
+        self.data_dict = LazyDict(self.load_variables, self._FIELDS)
+        self.data_dict.load([k for k in self.parameters.data_size if k in self._FIELDS] or None)
+
+    def load_variables(self, names):
+        """ read the variables in `names` from the `.mat` file to `data_dict`, the variables not available in the
+            file are skipped. It is the loader of the `LazyDict`, which only calls it for the variables not loaded yet
+
+        Args:
+            names (list): names of the variables, keys of `_FIELDS`
+        """
+        # in the order of `_FIELDS`
+        names = [k for k in self._FIELDS if k in names]
+        if not names:
+            return
+        md = load_mat_fields(self.parameters.data_path, sorted({"md/"+f for k in names for f in self._FIELDS[k]}))
+        md = {k[3:]:md[k] for k in md}
+        for k in names:
+            try:
+                value = self._get_variable(k, md)
+            except KeyError:
+                continue
+            # skip the empty fields
+            if np.shape(value) != ():
+                self.data_dict[k] = value
+
+    def _get_variable(self, name, md):
+        """ compute the variable `name` from the fields `md` of the model
+        """
+        if name == 'u':
+            return md['inversion/vx_obs']/self.yts
+        elif name == 'v':
+            return md['inversion/vy_obs']/self.yts
+        elif name == 's':
+            return md['geometry/surface']
+        elif name == 'a':
+            return (md['smb/mass_balance'] - md['balancethickness/thickening_rate'])/self.yts
+        elif name == 'H':
+            return md['geometry/thickness']
+        elif name == 'C':
+            # check the friction law
+            if 'friction/C' in md:
+                return md['friction/C'] # Weertman
+            # convert Budd to Weertman type friction coefficient
+            C_b = md['friction/coefficient'] # Budd
+            rho_ice = md['materials/rho_ice']
+            rho_w = md['materials/rho_water']
+            g = md['constants/g']
+            base = md['geometry/base']
+            N = rho_ice*g*md['geometry/thickness'] + rho_w*g*base
+            N[np.where(N <= 0, True, False)] = 1
+            return C_b*np.sqrt(N)
+        elif name == 'B':
+            return md['materials/rheology_B']
+        elif name == 'vel':
+            return np.sqrt(md['inversion/vx_obs']**2.0+md['inversion/vy_obs']**2.0)/self.yts
+        raise KeyError(name)
+
+    def set_data(self, X_dict, data_dict, mask_dict={}, mesh_dict={}):
+        """ use the dicts loaded elsewhere, the variables not in `data_dict` are still read from the file when accessed
+        """
+        super().set_data(X_dict, data_dict, mask_dict, mesh_dict)
+        self.data_dict = LazyDict(self.load_variables, self._FIELDS, self.data_dict)
 
     def plot(self, data_names=[], vranges={}, axs=None, resolution=200, **kwargs):
         """ use `utils.plot_dict_data` to plot the ISSM data
@@ -100,6 +202,7 @@ class ISSMmdData(DataBase, Constants):
             data_names = list(self.data_dict.keys())
         else:
             # compare with data_dict, find all avaliable
+            self.data_dict.load(data_names)
             data_names = [k for k in data_names if k in self.data_dict]
 
         # get the subdict of the data to plot
@@ -119,6 +222,8 @@ class ISSMmdData(DataBase, Constants):
         # initialize
         self.X = {}
         self.sol = {}
+        # read the variables which are not loaded yet, in one pass over the file
+        self.data_dict.load(list(data_size))
 
         # prepare x,y coordinates
         iice = self.get_ice_indices()
@@ -130,10 +235,10 @@ class ISSMmdData(DataBase, Constants):
         idbc = np.asarray(DBC>0).nonzero()
         X_bc = np.hstack((self.X_dict['x'][idbc].flatten()[:,None], self.X_dict['y'][idbc].flatten()[:,None]))
 
-        # go through all keys in data_dict
-        for k in self.data_dict:
+        # go through all keys in data_dict, only the variables in data_size are read from the file
+        for k in self._FIELDS:
             # if datasize has the key, then add to X and sol
-            if k in data_size:
+            if (k in data_size) and (k in self.data_dict):
                 if data_size[k] is not None:
                     # apply ice mask
                     sol_temp = self.data_dict[k][iice].flatten()[:,None]
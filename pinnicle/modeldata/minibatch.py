@@ -0,0 +1,146 @@
+import numpy as np
+import deepxde as dde
+from deepxde.backend import backend_name, tf
+from deepxde.data.sampler import BatchSampler
+
+
+class MiniBatchValues:
+    """ target values of a point set, only the current mini-batch is held by the backend.
+        In tensorflow, the batch is assigned to a `tf.Variable`, so that the compiled losses read the new values at every step.
+        The values of the test points are kept in `test_values`, which are used while `testing` is True
+    """
+    def __init__(self, points, values, batch_size):
+        self.points = np.array(points, dtype=dde.config.real(np))
+        self.all_values = np.array(values, dtype=dde.config.real(np))
+        self.batch_size = min(batch_size, self.points.shape[0])
+        self.sampler = BatchSampler(self.points.shape[0], shuffle=True)
+        self.testing = False
+        if backend_name == "tensorflow":
+            self.values = tf.Variable(self.all_values[:self.batch_size], trainable=False)
+            self.test_values = tf.Variable(self.all_values[:self.batch_size], trainable=False)
+        else:
+            self.values = dde.backend.as_tensor(self.all_values[:self.batch_size])
+            self.test_values = self.values
+
+    def next_batch(self):
+        """ draw the next batch, update `values`, and return the points of the batch
+        """
+        idx = self.sampler.get_next(self.batch_size)
+        if backend_name == "tensorflow":
+            self.values.assign(self.all_values[idx])
+        else:
+            self.values = dde.backend.as_tensor(self.all_values[idx])
+        return self.points[idx]
+
+    def fix_test(self):
+        """ keep the values of the current batch for the test points
+        """
+        if backend_name == "tensorflow":
+            self.test_values.assign(self.values)
+        else:
+            self.test_values = self.values
+
+    def targets(self):
+        """ the values of the current batch, or of the test points while `testing`
+        """
+        return self.test_values if self.testing else self.values
+
+
+class MiniBatchPointSetBC(dde.icbc.PointSetBC):
+    """ PointSetBC which draws `batch_size` points at every training step
+
+    Args:
+        points: the points where the values are given
+        values: 2D array of the values
+        component (int): the output component of the nn
+        batch_size (int): number of points per step
+    """
+    def __init__(self, points, values, component=0, batch_size=1000):
+        super().__init__(points[:1], values[:1], component=component)
+        self.batch = MiniBatchValues(points, values, batch_size)
+        self.points = self.batch.points
+
+    def collocation_points(self, X):
+        return self.batch.next_batch()
+
+    def error(self, X, inputs, outputs, beg, end, aux_var=None):
+        return outputs[beg:end, self.component:self.component + 1] - self.batch.targets()
+
+
+class MiniBatchPointSetOperatorBC(dde.icbc.PointSetOperatorBC):
+    """ PointSetOperatorBC which draws `batch_size` points at every training step
+
+    Args:
+        points: the points where the values are given
+        values: 2D array of the values
+        func: the operator, same as in `dde.icbc.PointSetOperatorBC`
+        batch_size (int): number of points per step
+    """
+    def __init__(self, points, values, func, batch_size=1000):
+        super().__init__(points[:1], values[:1], func)
+        self.batch = MiniBatchValues(points, values, batch_size)
+        self.points = self.batch.points
+
+    def collocation_points(self, X):
+        return self.batch.next_batch()
+
+    def error(self, X, inputs, outputs, beg, end, aux_var=None):
+        return self.func(inputs, outputs, X)[beg:end] - self.batch.targets()
+
+
+class MiniBatchPDE(dde.data.PDE):
+    """ PDE data, which draws a new batch of the collocation points from a pool of `num_domain` points,
+        and a new batch of each mini-batch point set at every training step. The number of points in each
+        step is fixed, so the compiled training step is not retraced. The test points are the batch drawn at
+        the beginning of the training, the point sets keep their values for the test losses.
+
+    Args:
+        batch_size (int): number of collocation points per step, if None, use all the collocation points
+        the others are the same as `dde.data.PDE`
+    """
+    def __init__(self, geometry, pde, bcs, num_domain=0, batch_size=None, **kwargs):
+        self.collocation_batch_size = batch_size
+        self.collocation_sampler = None
+        super().__init__(geometry, pde, bcs, num_domain=num_domain, **kwargs)
+
+    def train_next_batch(self, batch_size=None):
+        # the pool of the collocation points, regenerated if train_x_all is reset by a resampler
+        if self.train_x_all is None:
+            self.collocation_sampler = None
+        pool = self.train_points()
+        if (self.collocation_batch_size is None) or (self.collocation_batch_size >= pool.shape[0]):
+            x_pde = pool
+        else:
+            if (self.collocation_sampler is None) or (self.collocation_sampler.num_samples != pool.shape[0]):
+                self.collocation_sampler = BatchSampler(pool.shape[0], shuffle=True)
+            x_pde = pool[self.collocation_sampler.get_next(self.collocation_batch_size)]
+
+        # the points of the data terms
+        self.train_x_bc = None
+        self.bc_points()
+        self.train_x = self.train_x_bc
+        if self.pde is not None:
+            self.train_x = np.vstack((self.train_x, x_pde))
+        self.train_y = self.soln(self.train_x) if self.soln else None
+        if self.auxiliary_var_fn is not None:
+            self.train_aux_vars = self.auxiliary_var_fn(self.train_x).astype(dde.config.real(np))
+        return self.train_x, self.train_y, self.train_aux_vars
+
+    def test(self):
+        # the test points are the current batch, see `dde.data.PDE.test`, they are only generated
+        # at the first call, the later calls keep them and their values
+        if self.test_x is None:
+            for bc in self.bcs:
+                if isinstance(getattr(bc, "batch", None), MiniBatchValues):
+                    bc.batch.fix_test()
+        return super().test()
+
+    def losses_test(self, targets, outputs, loss_fn, inputs, model, aux=None):
+        batches = [bc.batch for bc in self.bcs if isinstance(getattr(bc, "batch", None), MiniBatchValues)]
+        for b in batches:
+            b.testing = True
+        try:
+            return super().losses_test(targets, outputs, loss_fn, inputs, model, aux=aux)
+        finally:
+            for b in batches:
+                b.testing = False
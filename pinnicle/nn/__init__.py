@@ -1,2 +1,3 @@
 from .helper import *
 from .nn import *
+from .ensemble import EnsembleFNN
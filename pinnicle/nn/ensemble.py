@@ -0,0 +1,58 @@
+import deepxde as dde
+from deepxde.backend import backend_name, tf
+
+
+class EnsembleFNN(dde.nn.NN):
+    """ `num_members` independent fully connected networks, the weights of each layer are stacked in one tensor,
+        so that all the members are evaluated by batched matmuls in one pass.
+
+        The inputs of shape (N, d) are repeated for all the members, the outputs have the shape (num_members*N, out),
+        where the rows [k*N, (k+1)*N) are from the member k. The derivatives of the outputs of each member are taken
+        w.r.t. its own copy of the inputs, use `forward` to get the repeated inputs with the outputs
+
+    Args:
+        layer_sizes (list): the sizes of the layers of each member, the same as `dde.nn.FNN`
+        activation (str): activation function of the hidden layers
+        kernel_initializer (str): initializer of the weights, each member is initialized independently
+        num_members (int): number of the networks in the ensemble
+    """
+    def __init__(self, layer_sizes, activation, kernel_initializer, num_members=1):
+        if backend_name != "tensorflow":
+            raise NotImplementedError(f"Ensemble networks are not implemented for the backend {backend_name}")
+        super().__init__()
+        self.num_members = num_members
+        self.activation = dde.nn.activations.get(activation)
+        initializer = dde.nn.initializers.get(kernel_initializer)
+        # initialize the members one by one, so that the fan-in and fan-out are the same as a single network,
+        # an unseeded keras initializer returns the same values at every call, so each member needs a new one
+        config = initializer.get_config()
+        config["seed"] = None
+        init = lambda shape, dtype=None: tf.stack([type(initializer).from_config(config)(shape[1:], dtype=dtype)
+                                                   for _ in range(shape[0])])
+
+        self.kernels = []
+        self.biases = []
+        for i, (n_in, n_out) in enumerate(zip(layer_sizes[:-1], layer_sizes[1:])):
+            self.kernels.append(self.add_weight(name=f"kernel_{i}", shape=(num_members, n_in, n_out), initializer=init))
+            self.biases.append(self.add_weight(name=f"bias_{i}", shape=(num_members, 1, n_out), initializer="zeros"))
+
+    def call(self, inputs, training=False):
+        return self.forward(inputs, training=training)[1]
+
+    def forward(self, inputs, training=False):
+        """ the inputs repeated for all the members, with shape (num_members*N, d), and the outputs
+        """
+        n = tf.shape(inputs)[0]
+        x = tf.tile(inputs, [self.num_members, 1])
+        y = x
+        if self._input_transform is not None:
+            y = self._input_transform(y)
+        y = tf.reshape(y, [self.num_members, n, y.shape[-1]])
+        for i, (w, b) in enumerate(zip(self.kernels, self.biases)):
+            y = tf.matmul(y, w) + b
+            if i < len(self.kernels) - 1:
+                y = self.activation(y)
+        y = tf.reshape(y, [self.num_members * n, y.shape[-1]])
+        if self._output_transform is not None:
+            y = self._output_transform(x, y)
+        return x, y
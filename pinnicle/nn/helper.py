@@ -1,3 +1,5 @@
+import numpy as np
+
 def minmax_scale(x, lb, ub, scale=2.0, offset=1.0):
     """
     min-max scale
@@ -9,3 +11,28 @@ def up_scale(x, lb, ub, scale=0.5, offset=1.0):
     reverse min-max scale
     """
     return lb + scale*(x + offset)*(ub - lb)
+
+def remap_scaling(weights, input_lb, input_ub, output_lb, output_ub, new_input_lb, new_input_ub, new_output_lb, new_output_ub):
+    """
+    change the min-max scalings of a fully connected network, the first and the last layers are
+    rescaled, so that the network gives the same outputs with the new scalings.
+    weights: list of NumPy arrays [kernel, bias] of each layer, the kernels have the shape (..., in, out),
+    the biases have the shape (..., out) or (..., 1, out)
+    """
+    weights = [np.array(w, dtype=float) for w in weights]
+    input_lb, input_ub, new_input_lb, new_input_ub = map(np.asarray, (input_lb, input_ub, new_input_lb, new_input_ub))
+    output_lb, output_ub, new_output_lb, new_output_ub = map(np.asarray, (output_lb, output_ub, new_output_lb, new_output_ub))
+
+    # inputs: the old scaled input is a*z + c, where z is the new scaled input
+    a = (new_input_ub - new_input_lb) / (input_ub - input_lb)
+    c = minmax_scale(new_input_lb, input_lb, input_ub) + a
+    kernel, bias = weights[0], weights[1]
+    weights[1] = bias + np.einsum("i,...ij->...j", c, kernel).reshape(bias.shape)
+    weights[0] = kernel * a[:, None]
+
+    # outputs: the new scaled output is r*o + s, where o is the old scaled output
+    r = (output_ub - output_lb) / (new_output_ub - new_output_lb)
+    s = minmax_scale(output_lb, new_output_lb, new_output_ub) + r
+    weights[-2] = weights[-2] * r
+    weights[-1] = weights[-1] * r + s
+    return weights
@@ -1,5 +1,6 @@
 import deepxde as dde
 from .helper import minmax_scale, up_scale
+from .ensemble import EnsembleFNN
 from ..parameter import NNParameter
 
 class FNN:
@@ -41,6 +42,9 @@ class FNN:
                         [self.parameters.num_neurons] * self.parameters.num_layers + \
                         [self.parameters.output_size]
 
+        if self.parameters.is_ensemble():
+            return EnsembleFNN(layer_size, self.parameters.activation, self.parameters.initializer,
+                    num_members=self.parameters.ensemble_size)
         return dde.nn.FNN(layer_size, self.parameters.activation, self.parameters.initializer)
 
     def createPFNN(self):
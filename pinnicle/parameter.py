@@ -95,6 +95,10 @@ class DataParameter(ParameterBase):
         """ default parameters
         """
         self.data = {}
+        # folder of the cache of the loaded data files, see modeldata.DataCache, empty for no cache
+        self.data_cache_path = ""
+        # maximum number of bytes in the cache, the least recently used data are removed first
+        self.data_cache_size = 2**30
 
     def check_consistency(self):
         pass
@@ -173,6 +177,16 @@ class NNParameter(ParameterBase):
         # parallel neural network
         self.is_parallel = False
 
+        # number of independent networks trained together, 1 for a single network
+        self.ensemble_size = 1
+
+        # initialize the weights from the checkpoints of a trained model, see PINN.warm_start
+        self.warm_start = ""
+        # the step of the checkpoint, None for the latest, "best" for the lowest loss
+        self.warm_start_step = None
+        # number of the first layers which are not trained
+        self.freeze_layers = 0
+
         #  scaling parameters
         self.input_lb = None
         self.input_ub = None
@@ -186,7 +200,20 @@ class NNParameter(ParameterBase):
         # out size of nn equals to variables in physics
         if self.output_size != len(self.output_variables):
             raise ValueError("'output_size' does not match the number of 'output_variables'")
-        pass
+        # ensemble
+        if (not isinstance(self.ensemble_size, int)) or (self.ensemble_size < 1):
+            raise ValueError("'ensemble_size' should be a positive integer")
+        if self.is_ensemble() and self.is_parallel:
+            raise ValueError("The ensemble mode is not implemented for the parallel neural network")
+        # transfer learning
+        if (not isinstance(self.freeze_layers, int)) or (self.freeze_layers < 0):
+            raise ValueError("'freeze_layers' should be a non-negative integer")
+
+    def is_ensemble(self):
+        """
+        if more than one network are trained together
+        """
+        return self.ensemble_size > 1
 
     def is_input_scaling(self):
         """
@@ -248,6 +275,8 @@ class EquationParameter(ParameterBase):
     """
     subclasses = {}
     def __init__(self, param_dict={}):
+        # options shared by all the equations, `set_default` of the subclasses will not overwrite them
+        self.set_shared_default()
         super().__init__(param_dict)
 
     def __init_subclass__(cls, **kwargs):
@@ -277,7 +306,15 @@ class EquationParameter(ParameterBase):
         # scalar variables: name:value
         self.scalar_variables = {}
 
+    def set_shared_default(self):
+        """ default values of the options shared by all the equations
+        """
+        # engine to compute the first order derivatives: 'component', 'forward', or 'vectorized'
+        self.derivative_engine = "component"
+
     def check_consistency(self):
+        if self.derivative_engine not in ["component", "forward", "vectorized"]:
+            raise ValueError(f"Derivative engine {self.derivative_engine} is not defined")
         if (len(self.output)) != (len(self.output_lb)):
             raise ValueError("Size of 'output' does not match the size of 'output_lb'")
         if (len(self.output)) != (len(self.output_ub)):
@@ -334,8 +371,33 @@ class TrainingParameter(ParameterBase):
         self.additional_loss = {} 
         # learning rate
         self.learning_rate = 0
+        # learning rate schedule, a dict of LearningRateScheduleParameter, e.g. {"name":"cosine", "decay_steps":10000}, None for constant
+        self.learning_rate_schedule = None
         # list of the weights
         self.loss_weights = []
+        # adaptive balancing of the loss weights, "gradnorm" or "softadapt", None for fixed weights
+        # utils.LossWeightBalancer(period=loss_balancing_period, method=loss_balancing, ...)
+        self.loss_balancing = None
+        self.loss_balancing_period = 100
+        # moving average of the weights: w = alpha*w + (1-alpha)*w_new
+        self.loss_balancing_alpha = 0.9
+        # inverse temperature of softadapt
+        self.loss_balancing_beta = 10.0
+        # mini-batch training: number of collocation points drawn from num_collocation_points at each step, None for all
+        self.collocation_batch_size = None
+        # number of data points at each step, a dict keyed by the data names, e.g. {"u":1000, "vel":1000}, the others use all
+        self.data_batch_size = {}
+        # list of training stages, each a dict of TrainingStageParameter, run in order by PINN.train(),
+        # each stage has its own optimizer, epochs, loss weights and number of collocation points
+        self.stages = []
+        # compile the training step and the predictions with XLA
+        self.jit_compile = False
+        # number of threads of the backend, inside one op and between independent ops, 0 for the default of the backend,
+        # set before the graph is built, see utils.set_threads
+        self.num_intra_op_threads = 0
+        self.num_inter_op_threads = 0
+        # pin the process to these cpus, e.g. [0, 1, 2, 3], empty for all the cpus
+        self.cpu_affinity = []
         # setting the callbacks
         self.has_callbacks = False
         # dde.callbacks.EarlyStopping(min_delta=min_delta, patience=patience)
@@ -343,8 +405,42 @@ class TrainingParameter(ParameterBase):
         self.patience = None
         # dde.callbacks.PDEPointResampler(period=period)
         self.period = None
-        # dde.callbacks.ModelCheckpoint(filepath, verbose=1, save_better_only=True)
+        # residual-based adaptive resampling of the collocation points, "RAD" or "RAR"
+        # utils.ResidualAdaptiveResampler(period=adaptive_period, method=adaptive_sampling, ...)
+        self.adaptive_sampling = None
+        self.adaptive_period = 100
+        # number of candidate points, None for 10 times of num_collocation_points
+        self.adaptive_num_candidates = None
+        # RAD: density |r|^k / mean(|r|^k) + c
+        self.adaptive_k = 1.0
+        self.adaptive_c = 1.0
+        # RAR: number of points added at each resampling
+        self.adaptive_num_add = 100
+        # resumable checkpoints in save_path/checkpoints, see PINN.load_checkpoint
+        # utils.Checkpointer(period=checkpoint_period, min_interval=checkpoint_min_interval, better_only=checkpoint_better_only)
         self.checkpoint = False
+        # number of steps between two checks, and the minimum number of seconds between two checkpoints
+        self.checkpoint_period = 1000
+        self.checkpoint_min_interval = 0.0
+        # only save when the training loss is improved
+        self.checkpoint_better_only = False
+        # retention: keep the last checkpoint_keep_last checkpoints (None for all), and the best one
+        self.checkpoint_keep_last = 3
+        self.checkpoint_keep_best = True
+        # stream the losses, learning rate and throughput to save_path/metrics.jsonl during the training, see History.load
+        # utils.MetricsLogger(period=metrics_period, buffer_size=metrics_buffer_size, flush_interval=metrics_flush_interval)
+        # the losses of a record are evaluated again, about the cost of the forward part of one step, unless deepxde evaluated
+        # them at this step, i.e. every check_every steps of the stages, and the last step of the training
+        self.metrics_log = False
+        self.metrics_period = 100
+        # number of records written at once, and the maximum number of seconds a record is buffered
+        self.metrics_buffer_size = 100
+        self.metrics_flush_interval = 10.0
+        # profiling, nothing is added to the training if not set
+        # utils.StepProfiler(period=profile_period): shares of each loss term and the optimizer in the step time, saved to save_path/profile.json
+        self.profile_period = None
+        # utils.TraceWindow: TensorFlow profiler trace of the steps [start, stop), e.g. [500, 520], saved to save_path/trace
+        self.profile_trace = None
         # path to save the results
         self.save_path = ""
         # if save the results and history
@@ -353,7 +449,31 @@ class TrainingParameter(ParameterBase):
         self.is_plot = False
 
     def check_consistency(self):
-        pass
+        if self.has_AdaptiveResampler():
+            if self.adaptive_sampling.upper() not in ["RAD", "RAR"]:
+                raise ValueError(f"'adaptive_sampling' should be 'RAD' or 'RAR', but {self.adaptive_sampling} is given")
+            if self.has_PDEPointResampler():
+                raise ValueError("'period' and 'adaptive_sampling' can not be used together")
+        if self.is_minibatch():
+            sizes = list(self.data_batch_size.values()) + ([self.collocation_batch_size] if self.collocation_batch_size is not None else [])
+            if not all(isinstance(b, int) and b > 0 for b in sizes):
+                raise ValueError(f"the batch sizes should be positive integers, but {sizes} are given")
+        if self.has_LossWeightBalancer():
+            if self.loss_balancing.lower() not in ["gradnorm", "softadapt"]:
+                raise ValueError(f"'loss_balancing' should be 'gradnorm' or 'softadapt', but {self.loss_balancing} is given")
+        if self.has_StepProfiler():
+            if (not isinstance(self.profile_period, int)) or (self.profile_period <= 0):
+                raise ValueError(f"'profile_period' should be a positive integer, but {self.profile_period} is given")
+        if self.has_TraceWindow():
+            if (not isinstance(self.profile_trace, (list, tuple))) or (len(self.profile_trace) != 2) or \
+                    (not 0 <= self.profile_trace[0] < self.profile_trace[1]):
+                raise ValueError(f"'profile_trace' should be the steps [start, stop), but {self.profile_trace} is given")
+        for name in ["num_intra_op_threads", "num_inter_op_threads"]:
+            n = getattr(self, name)
+            if (not isinstance(n, int)) or (n < 0):
+                raise ValueError(f"'{name}' should be a non-negative integer, but {n} is given")
+        if not all(isinstance(c, int) and c >= 0 for c in self.cpu_affinity):
+            raise ValueError(f"'cpu_affinity' should be a list of cpu ids, but {self.cpu_affinity} is given")
 
     def check_callbacks(self):
         """ check if any of the following variable is given from setting
@@ -364,12 +484,37 @@ class TrainingParameter(ParameterBase):
         # PDEPointResampler
         if self.has_PDEPointResampler():
             return True
+        # ResidualAdaptiveResampler
+        if self.has_AdaptiveResampler():
+            return True
         # ModelCheckpoint
         if self.has_ModelCheckpoint():
             return True
+        # MetricsLogger
+        if self.has_MetricsLogger():
+            return True
+        # StepProfiler
+        if self.has_StepProfiler():
+            return True
+        # TraceWindow
+        if self.has_TraceWindow():
+            return True
+        # LossWeightBalancer
+        if self.has_LossWeightBalancer():
+            return True
         # otherwise
         return False
 
+    def is_minibatch(self):
+        """ check if any of the collocation points or data are trained in mini-batches
+        """
+        return (self.collocation_batch_size is not None) or bool(self.data_batch_size)
+
+    def has_AdaptiveResampler(self):
+        """ check if param has the adaptive_sampling method for residual-based resampler
+        """
+        return self.adaptive_sampling is not None
+
     def has_EarlyStopping(self):
         """ check if param has the min_delta or patience for early stopping
         """
@@ -389,6 +534,16 @@ class TrainingParameter(ParameterBase):
 
         return has_es
 
+    def has_LossWeightBalancer(self):
+        """ check if param has the loss_balancing method for adaptive loss weights
+        """
+        return self.loss_balancing is not None
+
+    def has_MetricsLogger(self):
+        """ check if param has metrics_log=True for streaming the training metrics
+        """
+        return self.metrics_log
+
     def has_ModelCheckpoint(self):
         """ check if param has checkpoint=True for checkpointing
         """
@@ -402,6 +557,16 @@ class TrainingParameter(ParameterBase):
         else:
             return True
 
+    def has_StepProfiler(self):
+        """ check if param has profile_period for timing the loss terms
+        """
+        return self.profile_period is not None
+
+    def has_TraceWindow(self):
+        """ check if param has the steps of profile_trace for the TensorFlow profiler
+        """
+        return self.profile_trace is not None
+
     def update(self):
         """ convert dict to class LossFunctionParameter
         """
@@ -409,10 +574,115 @@ class TrainingParameter(ParameterBase):
         if self.additional_loss:
             self.additional_loss = {k:LossFunctionParameter(self.additional_loss[k]) for k in self.additional_loss}
 
+        # update learning rate schedule
+        if self.learning_rate_schedule is not None:
+            self.learning_rate_schedule = LearningRateScheduleParameter(self.learning_rate_schedule)
+
+        # update training stages
+        if self.stages:
+            self.stages = [TrainingStageParameter(s) for s in self.stages]
+
         #  add callback setttings if given any of them
         self.has_callbacks = self.check_callbacks()
 
 
+class TrainingStageParameter(ParameterBase):
+    """ parameter of one training stage
+    """
+    def __init__(self, param_dict={}):
+        super().__init__(param_dict)
+
+    def set_default(self):
+        # optimization method, e.g. "adam", "L-BFGS"
+        self.optimizer = "adam"
+        # maximum number of steps of this stage
+        self.epochs = 0
+        # learning rate, None for the learning_rate in TrainingParameter
+        self.learning_rate = None
+        # learning rate decay in deepxde, e.g. ["inverse time", 1000, 0.5]
+        self.decay = None
+        # learning rate schedule of this stage, a dict of LearningRateScheduleParameter, starts at the beginning of the stage
+        self.learning_rate_schedule = None
+        # stop the stage if the total loss has not decreased by a relative min_delta in patience steps
+        self.min_delta = None
+        self.patience = None
+        # stop the stage after max_time seconds
+        self.max_time = None
+        # number of steps between two evaluations of the losses and checks of the plateau, L-BFGS restarts at each check
+        self.check_every = 1000
+
+        # curriculum, e.g. data only, then the pdes with increasing weights, then the additional losses
+        # factor of all the pde_weights in this stage, 0 for fitting the data only, None for unchanged
+        self.pde_weight_scale = None
+        # weights of the loss terms by their names in this stage, e.g. {"vel log": 0}, applied after pde_weight_scale
+        self.loss_weights = {}
+        # number of the collocation points, resampled at the beginning of the stage, None for unchanged
+        self.num_collocation_points = None
+
+    def update(self):
+        if self.learning_rate_schedule is not None:
+            self.learning_rate_schedule = LearningRateScheduleParameter(self.learning_rate_schedule)
+
+    def check_consistency(self):
+        if (self.decay is not None) and (self.learning_rate_schedule is not None):
+            raise ValueError("'decay' and 'learning_rate_schedule' can not be used together")
+        if (not isinstance(self.epochs, int)) or (self.epochs <= 0):
+            raise ValueError(f"'epochs' of a training stage should be a positive integer, but {self.epochs} is given")
+        if (not isinstance(self.check_every, int)) or (self.check_every <= 0):
+            raise ValueError(f"'check_every' should be a positive integer, but {self.check_every} is given")
+        if (self.pde_weight_scale is not None) and (self.pde_weight_scale < 0):
+            raise ValueError(f"'pde_weight_scale' should be non-negative, but {self.pde_weight_scale} is given")
+        if not isinstance(self.loss_weights, dict):
+            raise ValueError("'loss_weights' of a training stage should be a dict of the names and the weights")
+        if (self.num_collocation_points is not None) and \
+                ((not isinstance(self.num_collocation_points, int)) or (self.num_collocation_points <= 0)):
+            raise ValueError(f"'num_collocation_points' should be a positive integer, but {self.num_collocation_points} is given")
+
+    def has_loss_weights(self):
+        """ check if the stage changes the loss weights
+        """
+        return (self.pde_weight_scale is not None) or bool(self.loss_weights)
+
+    def has_plateau(self):
+        """ check if the stage has the min_delta or patience to stop at a plateau of the loss
+        """
+        has_plateau = (self.min_delta is not None) or (self.patience is not None)
+        # update the setting with partially None
+        if has_plateau:
+            if self.min_delta is None:
+                self.min_delta = 0
+            if self.patience is None:
+                self.patience = 0
+        return has_plateau
+
+
+class LearningRateScheduleParameter(ParameterBase):
+    """ parameter of the learning rate schedule, see utils.LearningRateSchedule
+    """
+    def __init__(self, param_dict={}):
+        super().__init__(param_dict)
+
+    def set_default(self):
+        # "constant", "exponential", "step", "cosine" or "inverse time"
+        self.name = "constant"
+        # number of steps of the decay
+        self.decay_steps = 1000
+        # decay rate of "exponential", "step" and "inverse time"
+        self.decay_rate = 0.5
+        # final learning rate of "cosine", as a fraction of the initial learning rate
+        self.alpha = 0.0
+        # number of steps of the linear warmup
+        self.warmup_steps = 0
+
+    def check_consistency(self):
+        if self.name not in ["constant", "exponential", "step", "cosine", "inverse time"]:
+            raise ValueError(f"Unknown learning rate schedule {self.name}")
+        if self.decay_steps <= 0:
+            raise ValueError(f"'decay_steps' should be positive, but {self.decay_steps} is given")
+        if self.warmup_steps < 0:
+            raise ValueError(f"'warmup_steps' should be non-negative, but {self.warmup_steps} is given")
+
+
 class LossFunctionParameter(ParameterBase):
     """ parameter of customize loss function
     """
@@ -53,10 +53,10 @@ class MC(EquationBase): #{{{
         u, v, a, H = nn_output_var[:, uid:uid+1], nn_output_var[:, vid:vid+1], nn_output_var[:, aid:aid+1], nn_output_var[:, Hid:Hid+1]
     
         # spatial derivatives
-        u_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=uid, j=xid)
-        H_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=Hid, j=xid)
-        v_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=vid, j=yid)
-        H_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=Hid, j=yid)
+        u_x = self.jacobian(nn_input_var, nn_output_var, i=uid, j=xid)
+        H_x = self.jacobian(nn_input_var, nn_output_var, i=Hid, j=xid)
+        v_y = self.jacobian(nn_input_var, nn_output_var, i=vid, j=yid)
+        H_y = self.jacobian(nn_input_var, nn_output_var, i=Hid, j=yid)
     
         # residual
         f = H*u_x + H_x*u + H*v_y + H_y*v - a
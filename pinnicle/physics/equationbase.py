@@ -1,7 +1,41 @@
 from abc import ABC, abstractmethod
+import deepxde as dde
+from deepxde.backend import backend_name, tf
 from ..parameter import EquationParameter
 from . import Constants
 
+def full_jacobian(nn_input_var, nn_output_var, engine="forward"):
+    """ compute the full Jacobian of the shape (n_points, n_outputs, n_inputs) in one pass, used by `Physics.pdes`
+
+    Args:
+        nn_input_var: global input to the nn
+        nn_output_var: global output from the nn
+        engine: 'forward' computes one Jacobian-vector product per input, using the 
+            double reverse-mode trick, cheapest when there are fewer inputs than outputs.
+            'vectorized' computes all the vector-Jacobian products in one batched
+            reverse-mode pass with `tf.vectorized_map`
+    """
+    if backend_name not in ["tensorflow", "tensorflow.compat.v1"]:
+        raise NotImplementedError(f"Full Jacobian is not implemented for the backend {backend_name}")
+
+    if engine == "forward":
+        # g(v) = J^T v is linear in v, then d(g^T e_j)/dv = J e_j is the j-th column of J
+        v = tf.zeros_like(nn_output_var)
+        g = tf.gradients(nn_output_var, nn_input_var, grad_ys=v)[0]
+        n_points = tf.shape(nn_input_var)[0]
+        n_inputs = nn_input_var.shape[1]
+        columns = [tf.gradients(g, v, grad_ys=tf.one_hot(tf.fill([n_points], j), n_inputs, dtype=nn_input_var.dtype))[0]
+                   for j in range(n_inputs)]
+        return tf.stack(columns, axis=2)
+    elif engine == "vectorized":
+        # rows of J = e_i^T J for all the outputs, vectorized over i
+        eye = tf.eye(nn_output_var.shape[1], dtype=nn_output_var.dtype)
+        rows = tf.vectorized_map(lambda e: tf.gradients(nn_output_var, nn_input_var,
+                                                        grad_ys=tf.broadcast_to(e, tf.shape(nn_output_var)))[0], eye)
+        return tf.transpose(rows, [1, 0, 2])
+    else:
+        raise ValueError(f"Derivative engine {engine} is not defined")
+
 class EquationBase(ABC, Constants):
     """ base class of all the equations
     """
@@ -23,6 +57,9 @@ class EquationBase(ABC, Constants):
         # get the setting parameters 
         self.parameters = parameters
 
+        # (nn_input_var, nn_output_var, full Jacobian), only set by `Physics.pdes` during the call
+        self.J_full = None
+
         # update parameters in the equation accordingly
         self.update_parameters(self.parameters)
 
@@ -73,6 +110,8 @@ class EquationBase(ABC, Constants):
         self.residuals = parameters.residuals
         # pde weights
         self.pde_weights = parameters.pde_weights
+        # engine to compute the first order derivatives
+        self.derivative_engine = parameters.derivative_engine
 
     def update_scalars(self, scalar_variables: dict):
         """ update scalars in the equations
@@ -81,6 +120,23 @@ class EquationBase(ABC, Constants):
             for key, value in scalar_variables.items():
                 setattr(self, key, value)
 
+    def jacobian(self, nn_input_var, nn_output_var, i, j):
+        """ first order derivative d(nn_output_var[:, i])/d(nn_input_var[:, j]), sliced from the full Jacobian
+            if it is computed for these tensors by `Physics.pdes`, otherwise from `dde.grad.jacobian`,
+            which is cached by deepxde in each step
+
+        Args:
+            nn_input_var: global input to the nn
+            nn_output_var: global output from the nn
+            i: global id of the output variable
+            j: global id of the input variable
+        """
+        if self.J_full is not None:
+            x, y, J = self.J_full
+            if (x is nn_input_var) and (y is nn_output_var):
+                return J[:, i, j:j+1]
+        return dde.grad.jacobian(nn_output_var, nn_input_var, i=i, j=j)
+
     @abstractmethod
     def pde(self, nn_input_var, nn_output_var):
         """ pde function used in deepxde
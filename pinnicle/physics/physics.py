@@ -1,5 +1,6 @@
 from ..parameter import PhysicsParameter
-from . import EquationBase
+from . import EquationBase, full_jacobian
+import deepxde as dde
 import itertools
 
 
@@ -45,11 +46,23 @@ class Physics:
         return list(global_var.keys())
 
     def pdes(self, nn_input_var, nn_output_var):
-        """ a wrapper of all the equations used in the PINN
+        """ a wrapper of all the equations used in the PINN, the equations with a full Jacobian `derivative_engine`
+            share the full Jacobian computed once in this call, the others use `dde.grad.jacobian`
         """
-        eq = []
+        engines = {}
         for p in self.equations:
-            eq += p.pde(nn_input_var, nn_output_var) 
+            if p.derivative_engine != "component":
+                if p.derivative_engine not in engines:
+                    engines[p.derivative_engine] = full_jacobian(nn_input_var, nn_output_var, engine=p.derivative_engine)
+                p.J_full = (nn_input_var, nn_output_var, engines[p.derivative_engine])
+        # the tensors are not kept after the call
+        try:
+            eq = []
+            for p in self.equations:
+                eq += p.pde(nn_input_var, nn_output_var) 
+        finally:
+            for p in self.equations:
+                p.J_full = None
         return eq
 
     def vel_mag(self, nn_input_var, nn_output_var, X):
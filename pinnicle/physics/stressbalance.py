@@ -1,4 +1,6 @@
 import deepxde as dde
+import deepxde.backend as bkd
+import numpy as np
 from . import EquationBase, Constants
 from ..parameter import EquationParameter
 
@@ -54,12 +56,12 @@ class SSA(EquationBase): #{{{
         u, v, H, C = nn_output_var[:, uid:uid+1], nn_output_var[:, vid:vid+1], nn_output_var[:, Hid:Hid+1], nn_output_var[:, Cid:Cid+1]
     
         # spatial derivatives
-        u_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=uid, j=xid)
-        v_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=vid, j=xid)
-        s_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=sid, j=xid)
-        u_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=uid, j=yid)
-        v_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=vid, j=yid)
-        s_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=sid, j=yid)
+        u_x = self.jacobian(nn_input_var, nn_output_var, i=uid, j=xid)
+        v_x = self.jacobian(nn_input_var, nn_output_var, i=vid, j=xid)
+        s_x = self.jacobian(nn_input_var, nn_output_var, i=sid, j=xid)
+        u_y = self.jacobian(nn_input_var, nn_output_var, i=uid, j=yid)
+        v_y = self.jacobian(nn_input_var, nn_output_var, i=vid, j=yid)
+        s_y = self.jacobian(nn_input_var, nn_output_var, i=sid, j=yid)
     
         eta = 0.5*self.B *(u_x**2.0 + v_y**2.0 + 0.25*(u_y+v_x)**2.0 + u_x*v_y+1.0e-15)**(0.5*(1.0-self.n)/self.n)
         # stress tensor
@@ -108,16 +110,25 @@ class MOLHOEquationParameter(EquationParameter, Constants):
                 'B':1.26802073401e+08   # -8 degree C, cuffey
                 }
 
+        # number of Gauss points for the vertical integration
+        self.num_gauss_points = 5
+
+    def check_consistency(self):
+        super().check_consistency()
+        if (not isinstance(self.num_gauss_points, int)) or (self.num_gauss_points < 1):
+            raise ValueError("num_gauss_points should be a positive integer")
+
 class MOLHO(EquationBase): #{{{
     """ MOLHO on 2D problem with uniform B
     """
     _EQUATION_TYPE = 'MOLHO' 
-    def __init__(self, parameters=EquationParameter()):
+    def __init__(self, parameters=MOLHOEquationParameter()):
         super().__init__(parameters)
 
-        # gauss points for integration
-        self.constants = {"gauss_x":[0.5, 0.23076534494715845, 0.7692346550528415, 0.04691007703066802, 0.9530899229693319],
-                "gauss_weights":[0.5688888888888889,0.4786286704993665,0.4786286704993665,0.2369268850561891,0.2369268850561891]}
+        # Gauss-Legendre points and weights, mapped from [-1, 1] to [0, 1] for the integration in zeta
+        gauss_x, gauss_weights = np.polynomial.legendre.leggauss(parameters.num_gauss_points)
+        self.constants = {"gauss_x": 0.5*(gauss_x + 1.0),
+                "gauss_weights": 0.5*gauss_weights}
 
     def pde(self, nn_input_var, nn_output_var):
         """ residual of MOLHO 2D PDEs
@@ -146,34 +157,30 @@ class MOLHO(EquationBase): #{{{
         vshear = v - vb
     
         # spatial derivatives
-        u_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=uid, j=xid)
-        v_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=vid, j=xid)
-        ub_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=ubid, j=xid)
-        vb_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=vbid, j=xid)
-        s_x = dde.grad.jacobian(nn_output_var, nn_input_var, i=sid, j=xid)
-
-        u_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=uid, j=yid)
-        v_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=vid, j=yid)
-        ub_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=ubid, j=yid)
-        vb_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=vbid, j=yid)
-        s_y = dde.grad.jacobian(nn_output_var, nn_input_var, i=sid, j=yid)
+        u_x = self.jacobian(nn_input_var, nn_output_var, i=uid, j=xid)
+        v_x = self.jacobian(nn_input_var, nn_output_var, i=vid, j=xid)
+        ub_x = self.jacobian(nn_input_var, nn_output_var, i=ubid, j=xid)
+        vb_x = self.jacobian(nn_input_var, nn_output_var, i=vbid, j=xid)
+        s_x = self.jacobian(nn_input_var, nn_output_var, i=sid, j=xid)
+
+        u_y = self.jacobian(nn_input_var, nn_output_var, i=uid, j=yid)
+        v_y = self.jacobian(nn_input_var, nn_output_var, i=vid, j=yid)
+        ub_y = self.jacobian(nn_input_var, nn_output_var, i=ubid, j=yid)
+        vb_y = self.jacobian(nn_input_var, nn_output_var, i=vbid, j=yid)
+        s_y = self.jacobian(nn_input_var, nn_output_var, i=sid, j=yid)
     
-        # compute mus
-        mu1 = 0.0
-        mu2 = 0.0
-        mu3 = 0.0
-        mu4 = 0.0
-
-        for i,zeta in enumerate(self.constants["gauss_x"]):
-            shear_comp = 1.0 - zeta**(self.n+1.0)
-            epsilon_eff2 = (ub_x + (u_x-ub_x)*shear_comp)**2.0 + (vb_y + (v_y-vb_y)*shear_comp)**2.0 + (0.5*(ub_y+vb_x+(u_y-ub_y+v_x-vb_x)*shear_comp))**2.0 \
-                    + (0.5*(self.n+1)/H*(ushear)*(1-shear_comp))**2.0 + (0.5*(self.n+1)/H*(vshear)*(1-shear_comp))**2.0 + (ub_x + (u_x-ub_x)*shear_comp)*(vb_y + (v_y-vb_y)*shear_comp)
-
-            mu = 0.5*self.B*(epsilon_eff2 + 1.0e-15)**(0.5*(1.0-self.n)/self.n)
-            mu1 += 0.5*H*mu*self.constants["gauss_weights"][i]
-            mu2 += 0.5*H*mu*self.constants["gauss_weights"][i]*(shear_comp)
-            mu3 += 0.5*H*mu*self.constants["gauss_weights"][i]*(shear_comp**2.0)
-            mu4 += 0.5*H*mu*self.constants["gauss_weights"][i]*(((self.n+1.0)/H*zeta**self.n)**2.0)
+        # compute mus, the Gauss points are on the second axis, in the shape of (1, num_gauss_points)
+        zeta = np.asarray(self.constants["gauss_x"], dtype=dde.config.real(np))[None, :]
+        shear_comp = 1.0 - zeta**(self.n+1.0)
+        epsilon_eff2 = (ub_x + (u_x-ub_x)*shear_comp)**2.0 + (vb_y + (v_y-vb_y)*shear_comp)**2.0 + (0.5*(ub_y+vb_x+(u_y-ub_y+v_x-vb_x)*shear_comp))**2.0 \
+                + (0.5*(self.n+1)/H*(ushear)*(1-shear_comp))**2.0 + (0.5*(self.n+1)/H*(vshear)*(1-shear_comp))**2.0 + (ub_x + (u_x-ub_x)*shear_comp)*(vb_y + (v_y-vb_y)*shear_comp)
+        mu = 0.5*self.B*(epsilon_eff2 + 1.0e-15)**(0.5*(1.0-self.n)/self.n)
+
+        # weighted sums over the Gauss points for mu1, mu2, mu3 and mu4 in one matmul
+        quad_weights = self.constants["gauss_weights"][:, None] * np.hstack([np.ones_like(zeta.T), shear_comp.T, shear_comp.T**2.0, ((self.n+1.0)*zeta.T**self.n)**2.0])
+        Hmu = H*bkd.matmul(mu, bkd.as_tensor(quad_weights, dtype=mu.dtype))
+        mu1, mu2, mu3 = Hmu[:, 0:1], Hmu[:, 1:2], Hmu[:, 2:3]
+        mu4 = Hmu[:, 3:4]/H**2.0
 
         # stress tensor
         B11 = mu1*(4.0*ub_x+2.0*vb_y) + mu2*(4.0*(u_x-ub_x)+2.0*(v_y-vb_y))
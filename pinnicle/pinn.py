@@ -1,19 +1,28 @@
 import os
+import random
+import re
+import time
 import deepxde as dde
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from deepxde.backend import backend_name, tf
 
-from .utils import save_dict_to_json, load_dict_from_json, History, plot_solutions, data_misfit
-from .nn import FNN
+from .utils import save_dict_to_json, load_dict_from_json, History, plot_solutions, data_misfit, ResidualAdaptiveResampler, LossWeightBalancer, LearningRateSchedule, \
+        Checkpointer, CheckpointWriter, MetricsLogger, StepProfiler, TraceWindow, StageStopper, \
+        list_checkpoints, load_checkpoint_file, set_threads
+from .nn import FNN, EnsembleFNN, remap_scaling
 from .physics import Physics
 from .domain import Domain
 from .parameter import Parameters
-from .modeldata import Data
+from .modeldata import Data, MiniBatchPDE, MiniBatchPointSetBC, MiniBatchPointSetOperatorBC, EnsemblePDE, EnsembleMiniBatchPDE
 
 
 class PINN:
     """ a basic PINN model
     """
-    def __init__(self, params={}, loadFrom=""):
+    def __init__(self, params={}, loadFrom="", preloaded_data={}):
+        # data already loaded, keyed by the names in params["data"], see `Data.load_data`
+        self.preloaded_data = preloaded_data
         # load setup parameters
         if os.path.exists(loadFrom):
             # overwrite params with saved params.json file
@@ -33,8 +42,15 @@ class PINN:
             os.makedirs(path, exist_ok=True)
         return path
 
-    def compile(self, opt=None, loss=None, lr=None, loss_weights=None):
+    def compile(self, opt=None, loss=None, lr=None, loss_weights=None, jit_compile=None, decay=None, lr_schedule=None, initial_step=None):
         """ compile the model  
+
+        Args:
+            decay: learning rate decay passed to deepxde, e.g. ("inverse time", 1000, 0.5)
+            lr_schedule (LearningRateScheduleParameter): if None and no decay is given, use the setting in `TrainingParameter`
+            initial_step (int): the step where the schedule starts, if None, continue from the current step of the model
+            jit_compile (bool): if True, compile the training step, the losses and the predictions with XLA,
+                if False, the setting of deepxde (`dde.config.xla_jit`) is used, if None, use the setting in `TrainingParameter`
         """
         # load from params
         if opt is None:
@@ -49,8 +65,133 @@ class PINN:
         if loss_weights is None:
             loss_weights = self.params.training.loss_weights
 
+        if jit_compile is None:
+            jit_compile = self.params.training.jit_compile
+
+        if (lr_schedule is None) and (decay is None):
+            lr_schedule = self.params.training.learning_rate_schedule
+
+        # create the optimizer here, so that its state can be saved in the checkpoints,
+        # the external optimizers have no learning rate
+        if (backend_name == "tensorflow") and isinstance(opt, str) and not dde.optimizers.is_external_optimizer(opt):
+            if lr_schedule is not None:
+                if initial_step is None:
+                    initial_step = self.model.train_state.step
+                schedule = LearningRateSchedule(lr, name=lr_schedule.name, decay_steps=lr_schedule.decay_steps,
+                        decay_rate=lr_schedule.decay_rate, alpha=lr_schedule.alpha, warmup_steps=lr_schedule.warmup_steps,
+                        initial_step=initial_step)
+                opt = dde.optimizers.get(opt, learning_rate=schedule)
+            else:
+                opt = dde.optimizers.get(opt, learning_rate=lr, decay=decay)
+
+        # XLA in deepxde compiles nested functions, which are recompiled at every step, so with `jit_compile`
+        # the model is compiled without XLA, then the functions are replaced in `_jit_compile_model`.
+        # The setting of deepxde is restored afterwards
+        xla_jit = jit_compile and (backend_name == "tensorflow") and dde.config.xla_jit
+        if xla_jit:
+            dde.config.disable_xla_jit()
+
         # compile the model
-        self.model.compile(opt, loss=loss, lr=lr, loss_weights=loss_weights)
+        try:
+            self.model.compile(opt, loss=loss, lr=lr, loss_weights=loss_weights, decay=decay)
+        finally:
+            if xla_jit:
+                dde.config.enable_xla_jit()
+
+        # the weights are updated in place during the training by the LossWeightBalancer
+        if self.params.training.has_LossWeightBalancer():
+            if backend_name == "tensorflow":
+                self.model.loss_weights = tf.Variable(loss_weights, dtype=dde.config.real(tf), trainable=False)
+            else:
+                self.model.loss_weights = list(loss_weights)
+
+        if jit_compile:
+            self._jit_compile_model(lr, decay)
+
+    def evaluate_residuals(self, X, chunk_size=None):
+        """ evaluate the residuals of all the equations in one pass per chunk
+
+        Args:
+            X: NumPy array of the inputs, with shape (N, number of input variables)
+            chunk_size (int): number of points evaluated at once, if None, evaluate all the points together
+        Returns:
+            dict of NumPy arrays with shape (N, 1), keyed by the names in `physics.residuals`,
+            in the ensemble mode, the root mean square of the residuals of all the members
+        """
+        X = np.asarray(X, dtype=dde.config.real(np))
+        if chunk_size is None:
+            chunk_size = max(X.shape[0], 1)
+        elif chunk_size < 1:
+            raise ValueError(f"chunk_size should be a positive integer, but {chunk_size} is given")
+
+        if backend_name == "tensorflow":
+            # trace the pdes once, instead of once per call of `model.predict`
+            if self._residual_function is None:
+                input_spec = tf.TensorSpec(shape=[None, X.shape[1]], dtype=X.dtype)
+                self._residual_function = tf.function(self._residuals,
+                        input_signature=[input_spec], jit_compile=self.params.training.jit_compile)
+            operator = lambda x: [r.numpy() for r in self._residual_function(x)]
+        else:
+            operator = lambda x: self.model.predict(x, operator=self.physics.pdes)
+
+        chunks = [operator(X[i:i+chunk_size]) for i in range(0, X.shape[0], chunk_size)]
+        return {name: np.vstack([c[k] for c in chunks]) for k, name in enumerate(self.physics.residuals)}
+
+    def load_checkpoint(self, path="", step=None):
+        """ resume from a checkpoint saved by `save_checkpoint` or during the training, restore the weights, the optimizer
+            state, the step counter, the random states, the collocation points, the loss weights and the loss history
+
+        Args:
+            path (Path, str): folder of the checkpoints, if "", use the `checkpoints` folder in `save_path`
+            step (int, str): the step to load, "best" for the checkpoint with the lowest loss, None for the latest
+        """
+        arrays, meta = self._read_checkpoint(self._checkpoint_path(path), step)
+
+        # the model needs to be compiled to restore the optimizer
+        if self.model.train_step is None:
+            self.compile()
+
+        # network
+        self._build_net()
+        if len(self.model.net.weights) != len([k for k in arrays if k.startswith("net_")]):
+            raise ValueError("The network in the checkpoint does not match the current network")
+        for i, v in enumerate(self.model.net.weights):
+            v.assign(arrays[f"net_{i}"])
+        # optimizer
+        opt = self.model.opt_name
+        if meta["num_optimizer_variables"] > 0 and hasattr(opt, "variables"):
+            self._build_optimizer(opt, self.model.net.trainable_variables + self.model.external_trainable_variables)
+            if len(opt.variables) != meta["num_optimizer_variables"]:
+                raise ValueError("The optimizer in the checkpoint does not match the compiled optimizer")
+            for i, v in enumerate(opt.variables):
+                v.assign(arrays[f"optimizer_{i}"])
+        # loss weights
+        if hasattr(self.model.loss_weights, "assign"):
+            self.model.loss_weights.assign(arrays["loss_weights"])
+        elif self.model.loss_weights is not None:
+            self.model.loss_weights = list(arrays["loss_weights"])
+        self.loss_weights_history = meta["loss_weights_history"]
+
+        # step counter and loss history
+        self.model.train_state.step = meta["step"]
+        self.model.train_state.epoch = meta.get("epoch", meta["step"])
+        self.model.losshistory.steps = meta["history"]["steps"]
+        self.model.losshistory.loss_train = [np.array(l) for l in meta["history"]["loss_train"]]
+        self.model.losshistory.loss_test = [np.array(l) for l in meta["history"]["loss_test"]]
+        self.model.losshistory.metrics_test = [[] for _ in meta["history"]["steps"]]
+        if meta["history"]["steps"]:
+            self.history = History(self.model.losshistory, self.loss_names,
+                    loss_weights=self.loss_weights_history if self.params.training.has_LossWeightBalancer() else None)
+
+        # collocation points
+        self.dde_data.anchors = arrays["anchors"] if "anchors" in arrays else None
+        self.dde_data.train_x_all = arrays["collocation_points"]
+        self.dde_data.train_x, self.dde_data.train_y, self.dde_data.train_aux_vars = None, None, None
+        self.dde_data.train_next_batch()
+
+        # random states
+        np.random.set_state(("MT19937", arrays["numpy_random_keys"], *meta["numpy_random"]))
+        random.setstate((meta["python_random"][0], tuple(int(k) for k in arrays["python_random_keys"]), meta["python_random"][1]))
 
     def load_model(self, path="", epochs=-1, subfolder="pinn", name="model"):
         """laod the neural network from saved model
@@ -87,6 +228,82 @@ class PINN:
         path = self.check_path(path)
         plot_solutions(self, path=path, **kwargs)
 
+    def predict(self, X, chunk_size=None, max_memory=2**30, num_workers=1, out=None, return_std=False):
+        """ predict the outputs of the neural network chunk by chunk, in the ensemble mode, the mean of all the members
+
+        Args:
+            X: NumPy array of the inputs, with shape (N, number of input variables)
+            chunk_size (int): number of points predicted at once, if None, determined by `max_memory`
+            max_memory (int): estimated memory in bytes used by the network to predict one chunk
+            num_workers (int): number of threads predicting the chunks
+            out: preallocated NumPy array with shape (N, number of output variables), or the path
+                to a `.npy` file, which is created as a memory-mapped array. If None, a new array is allocated
+            return_std (bool): also return the standard deviation of the members, only in the ensemble mode
+        Returns:
+            the array of predictions, `out` if given, and the array of the standard deviations if `return_std`
+        """
+        num_members = self.params.nn.ensemble_size
+        if return_std and num_members == 1:
+            raise ValueError("The standard deviation is only available in the ensemble mode, set 'ensemble_size' > 1")
+        X = np.asarray(X, dtype=dde.config.real(np))
+        shape = (X.shape[0], self.params.nn.output_size)
+        if chunk_size is None:
+            chunk_size = max(int(max_memory // self._predict_bytes_per_point()), 1)
+        elif chunk_size < 1:
+            raise ValueError(f"chunk_size should be a positive integer, but {chunk_size} is given")
+
+        # output array
+        if out is None:
+            out = np.empty(shape, dtype=X.dtype)
+        elif isinstance(out, (str, os.PathLike)):
+            out = np.lib.format.open_memmap(out, mode="w+", dtype=X.dtype, shape=shape)
+        elif out.shape != shape:
+            raise ValueError(f"the shape of out {out.shape} does not match the predictions {shape}")
+
+        std = np.empty(shape, dtype=X.dtype) if return_std else None
+
+        def _predict_chunk(i):
+            y = self.model.predict(X[i:i+chunk_size])
+            if num_members > 1:
+                # the rows of each member are stacked
+                y = y.reshape(num_members, -1, shape[1])
+                if return_std:
+                    std[i:i+chunk_size] = np.std(y, axis=0)
+                y = np.mean(y, axis=0)
+            out[i:i+chunk_size] = y
+
+        starts = list(range(0, X.shape[0], chunk_size))
+        if starts:
+            # the first chunk traces the network, before the threads share it
+            _predict_chunk(starts[0])
+            if num_workers > 1:
+                with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                    list(executor.map(_predict_chunk, starts[1:]))
+            else:
+                for i in starts[1:]:
+                    _predict_chunk(i)
+
+        if isinstance(out, np.memmap):
+            out.flush()
+        if return_std:
+            return out, std
+        return out
+
+    def save_checkpoint(self, path=""):
+        """ save a resumable checkpoint of the current state, see `load_checkpoint`
+
+        Args:
+            path (Path, str): folder of the checkpoints, if "", use the `checkpoints` folder in `save_path`
+        """
+        arrays, meta = self._checkpoint_state()
+        losses = self.model.train_state.loss_train
+        loss = float(np.sum(losses)) if losses is not None else np.inf
+        meta["loss"] = loss
+        # through the queue of the writer, after the checkpoints from the `Checkpointer` callback
+        writer = self._checkpoint_writer(path)
+        writer.submit(self.model.train_state.step, loss, arrays, meta)
+        writer.flush()
+
     def save_history(self, path=""):
         """ save training history
         """
@@ -96,8 +313,8 @@ class PINN:
     def save_model(self, path="", subfolder="pinn", name="model"):
         """save the neural network to the hard disk
         """
-        path = self.check_path(path)
-        self.model.save(f"{path}/{subfolder}/{name}")
+        path = self.check_path(os.path.join(self.check_path(path, loadOnly=True), subfolder))
+        self.model.save(f"{path}/{name}")
 
     def save_setting(self, path=""):
         """ save settings from self.params.param_dict
@@ -108,6 +325,9 @@ class PINN:
     def setup(self):
         """ setup the model according to `self.params` from the constructor
         """
+        # Step 1: threads and cpus, before any op is run
+        set_threads(self.params.training.num_intra_op_threads, self.params.training.num_inter_op_threads, self.params.training.cpu_affinity)
+
         # Step 2: set physics, all the rest steps depend on what pdes are included in the model
         self.physics = Physics(self.params.physics)
         # assign default physic.input_var, output_var, outout_lb, and output_ub to nn
@@ -120,7 +340,7 @@ class PINN:
         #self.model_data = DataBase.create(self.params.data.source, parameters=self.params.data)
         self.model_data = Data(self.params.data)
         # load from data file
-        self.model_data.load_data()
+        self.model_data.load_data(preloaded=self.preloaded_data)
         # update according to the setup: data_size
         self.model_data.prepare_training_data()
 
@@ -129,13 +349,28 @@ class PINN:
 
         # Step 5: set up deepxde training data object using PDE + data
         #  deepxde data object
-        self.dde_data = dde.data.PDE(
-                self.domain.geometry,
-                self.physics.pdes,
-                self.training_data,  # all the data loss will be evaluated
-                num_domain=self.params.domain.num_collocation_points, # collocation points
-                num_boundary=0,  # no need to set for data misfit, unless add calving front boundary, etc.
-                num_test=None)
+        # in the ensemble mode, each loss term is averaged over all the members
+        ensemble = {"num_members": self.params.nn.ensemble_size} if self.params.nn.is_ensemble() else {}
+        if self.params.training.is_minibatch():
+            # draw a batch of the collocation points and data at each step
+            self.dde_data = (EnsembleMiniBatchPDE if ensemble else MiniBatchPDE)(
+                    self.domain.geometry,
+                    self.physics.pdes,
+                    self.training_data,
+                    num_domain=self.params.domain.num_collocation_points, # pool of collocation points
+                    batch_size=self.params.training.collocation_batch_size,
+                    num_boundary=0,
+                    num_test=None,
+                    **ensemble)
+        else:
+            self.dde_data = (EnsemblePDE if ensemble else dde.data.PDE)(
+                    self.domain.geometry,
+                    self.physics.pdes,
+                    self.training_data,  # all the data loss will be evaluated
+                    num_domain=self.params.domain.num_collocation_points, # collocation points
+                    num_boundary=0,  # no need to set for data misfit, unless add calving front boundary, etc.
+                    num_test=None,
+                    **ensemble)
 
         # Step 6: set up neural networks
         # automate the input scaling according to the domain, this step need to be done before setting up NN
@@ -145,25 +380,45 @@ class PINN:
 
         # Step 7: setup the deepxde PINN model
         self.model = dde.Model(self.dde_data, self.nn.net)
+        # traced on the first call of `evaluate_residuals`
+        self._residual_function = None
+        # history of the loss weights, if they are updated during the training
+        self.loss_weights_history = {}
+        # background writers of the checkpoints, keyed by the folder
+        self._checkpoint_writers = {}
+
+        # Step 8: transfer learning from another model
+        if self.params.nn.warm_start:
+            self.warm_start(self.params.nn.warm_start, step=self.params.nn.warm_start_step,
+                    freeze_layers=self.params.nn.freeze_layers)
+        elif self.params.nn.freeze_layers:
+            self._freeze_layers(self.params.nn.freeze_layers)
 
     def train(self, iterations=0):
-        """ train the model
+        """ train the model, if `stages` are given in `TrainingParameter` and `iterations` is not set,
+            run all the stages in order, each compiled with its own optimizer
         """
+        stages = self.params.training.stages if iterations == 0 else []
         if iterations == 0:
             iterations = self.params.training.epochs
         # save settings before training
         if self.params.training.is_save:
             self.save_setting()
 
-        # get callback function list
+        # get callback function list, shared by all the stages
         callbacks = self.update_callbacks()
 
         # start training
-        self._loss_history, self._train_state = self.model.train(iterations=iterations,
-                display_every=10000, disregard_previous_best=True, callbacks=callbacks)
+        if stages:
+            for stage in stages:
+                self._train_stage(stage, callbacks)
+        else:
+            self._loss_history, self._train_state = self.model.train(iterations=iterations,
+                    display_every=10000, disregard_previous_best=True, callbacks=callbacks)
         
         # prepare history
-        self.history = History(self._loss_history, self.loss_names)
+        self.history = History(self._loss_history, self.loss_names, 
+                loss_weights=self.loss_weights_history if self.params.training.has_LossWeightBalancer() else None)
 
         # save history and model variables after training
         if self.params.training.is_save: 
@@ -186,16 +441,35 @@ class PINN:
             # early stop
             if params.has_EarlyStopping():
                 callbacks.append(dde.callbacks.EarlyStopping(min_delta=params.min_delta, patience=params.patience))
-            # check points will be saved to
+            # resumable checkpoints, written in the background
             if params.has_ModelCheckpoint():
-                path = self.check_path("")
-                subfolder = "pinn"
-                name = "model"
-                cpPath = f"{path}/{subfolder}/{name}"
-                callbacks.append(dde.callbacks.ModelCheckpoint(cpPath, save_better_only=True))
+                callbacks.append(Checkpointer(self._checkpoint_state, self._checkpoint_writer(),
+                    period=params.checkpoint_period, min_interval=params.checkpoint_min_interval,
+                    better_only=params.checkpoint_better_only))
+            # streaming metrics, appended to save_path/metrics.jsonl
+            if params.has_MetricsLogger():
+                callbacks.append(MetricsLogger(os.path.join(self.check_path(""), "metrics.jsonl"), self.loss_names,
+                    period=params.metrics_period, buffer_size=params.metrics_buffer_size,
+                    flush_interval=params.metrics_flush_interval))
+            # profiling of the training steps
+            if params.has_StepProfiler():
+                callbacks.append(StepProfiler(self.loss_names, params.loss_functions, period=params.profile_period,
+                    filename=os.path.join(self.check_path(""), "profile.json")))
+            if params.has_TraceWindow():
+                callbacks.append(TraceWindow(os.path.join(self.check_path(""), "trace"), *params.profile_trace))
             # resampler of the collocation points
             if params.has_PDEPointResampler():
                 callbacks.append(dde.callbacks.PDEPointResampler(period=params.period))
+            # residual-based adaptive resampler of the collocation points
+            if params.has_AdaptiveResampler():
+                callbacks.append(ResidualAdaptiveResampler(self.evaluate_residuals, period=params.adaptive_period,
+                    method=params.adaptive_sampling, num_candidates=params.adaptive_num_candidates,
+                    k=params.adaptive_k, c=params.adaptive_c, num_add=params.adaptive_num_add))
+            # adaptive loss weights
+            if params.has_LossWeightBalancer():
+                callbacks.append(LossWeightBalancer(self.loss_names, period=params.loss_balancing_period,
+                    method=params.loss_balancing, alpha=params.loss_balancing_alpha, beta=params.loss_balancing_beta,
+                    history=self.loss_weights_history))
             return callbacks
         else:
             return None
@@ -204,7 +478,7 @@ class PINN:
         """ update data set used for the training, the order follows 'output_variables'
         """
         # loop through all the PDEs, find those avaliable in the training data, add to the PointSetBC
-        training_temp = [dde.icbc.PointSetBC(training_data.X[d], training_data.sol[d], component=i) 
+        training_temp = [self._point_set_bc(d, training_data.X[d], training_data.sol[d], component=i) 
                   for i,d in enumerate(self.params.nn.output_variables) if d in training_data.sol]
 
         # the names of the loss: the order of data follows 'output_variables'
@@ -227,15 +501,15 @@ class PINN:
                         # get the index in output of nn
                         i = self.params.nn.output_variables.index(d)
                         # training data
-                        training_temp.append(dde.icbc.PointSetBC(training_data.X[d], training_data.sol[d], component=i))
+                        training_temp.append(self._point_set_bc(d, training_data.X[d], training_data.sol[d], component=i))
                     # if the variable is not part of the output from nn
                     # currently, only implement 'vel'
                     elif d == "vel":
-                        training_temp.append(dde.icbc.PointSetOperatorBC(training_data.X[d], training_data.sol[d], self.physics.vel_mag))
+                        training_temp.append(self._point_set_bc(d, training_data.X[d], training_data.sol[d], func=self.physics.vel_mag))
                     elif d == "sx":
-                        training_temp.append(dde.icbc.PointSetOperatorBC(training_data.X[d], training_data.sol[d], self.physics.surf_x))
+                        training_temp.append(self._point_set_bc(d, training_data.X[d], training_data.sol[d], func=self.physics.surf_x))
                     elif d == "sy":
-                        training_temp.append(dde.icbc.PointSetOperatorBC(training_data.X[d], training_data.sol[d], self.physics.surf_y))
+                        training_temp.append(self._point_set_bc(d, training_data.X[d], training_data.sol[d], func=self.physics.surf_y))
                     else:
                         raise ValueError(f"{d} is not found in the output_variable of the nn, and not defined")
 
@@ -260,6 +534,328 @@ class PINN:
         # setup the model
         self.setup()
         
+    def warm_start(self, path, step=None, freeze_layers=0):
+        """ initialize the network from the checkpoint of another model, e.g. trained on the data of another year or
+            a neighbouring glacier. The first and last layers are rescaled to the input and output scalings of this
+            model, so that the network starts from the same function. The outputs are matched by their names, those
+            not in the other model keep their initial weights. The other layers need to have the same sizes.
+            A model saved by `save_model`, without checkpoints, is also accepted, its scalings are not saved with the
+            weights, so they are computed again by setting up that model from its `params.json`, which needs its data
+            files. Its output scalings can differ slightly if they were widened by the random samples of the data
+
+        Args:
+            path (Path, str): folder of the checkpoints, or the `save_path` of the other model
+            step (int, str): the step of the checkpoint, "best" for the lowest loss, None for the latest
+            freeze_layers (int): number of the first layers which are not trained afterwards
+        """
+        if os.path.isfile(os.path.join(path, "checkpoints.json")) or os.path.isfile(os.path.join(path, "checkpoints", "checkpoints.json")):
+            if not os.path.isfile(os.path.join(path, "checkpoints.json")):
+                path = os.path.join(path, "checkpoints")
+            arrays, meta = self._read_checkpoint(path, step)
+            if "nn" not in meta:
+                raise ValueError(f"The checkpoints in {path} do not have the scalings of the network")
+            source = meta["nn"]
+            weights = [arrays[f"net_{i}"] for i in range(len([k for k in arrays if k.startswith("net_")]))]
+        else:
+            weights, source = self._read_saved_model(path, step)
+        nn = self.params.nn
+        if source["input_variables"] != list(nn.input_variables):
+            raise ValueError(f"The input variables {source['input_variables']} do not match {nn.input_variables}")
+        if not isinstance(self.model.net, (dde.nn.FNN, EnsembleFNN)):
+            raise ValueError(f"Warm start is not implemented for {type(self.model.net).__name__}")
+
+        self._build_net()
+        variables = self.model.net.weights
+        # the outputs in both the models
+        columns = [i for i, v in enumerate(nn.output_variables) if v in source["output_variables"]]
+        source_columns = [source["output_variables"].index(nn.output_variables[i]) for i in columns]
+        weights[-2] = weights[-2][..., source_columns]
+        weights[-1] = weights[-1][..., source_columns]
+        if [w.shape for w in weights[:-2]] != [tuple(v.shape) for v in variables[:-2]] or \
+                weights[-2].shape[:-1] != tuple(variables[-2].shape[:-1]):
+            raise ValueError("The layers of the network do not match the checkpoint")
+
+        weights = remap_scaling(weights, source["input_lb"], source["input_ub"],
+                np.array(source["output_lb"])[source_columns], np.array(source["output_ub"])[source_columns],
+                nn.input_lb, nn.input_ub, np.array(nn.output_lb)[columns], np.array(nn.output_ub)[columns])
+        for v, w in zip(variables[:-2], weights[:-2]):
+            v.assign(w.astype(v.dtype))
+        for v, w in zip(variables[-2:], weights[-2:]):
+            value = v.numpy()
+            value[..., columns] = w
+            v.assign(value)
+
+        if freeze_layers:
+            self._freeze_layers(freeze_layers)
+
+    def _read_saved_model(self, path, step=None):
+        """ the weights and the scalings of the network saved by `save_model` in the folder `path`,
+            the model is set up again from the `params.json` in `path` to compute its scalings
+        """
+        params = load_dict_from_json(path, "params.json")
+        folder = os.path.join(path, "pinn")
+        files = {}
+        if os.path.isdir(folder):
+            for f in os.listdir(folder):
+                match = re.fullmatch(r"model-(\d+)\.(weights\.h5|ckpt)", f)
+                if match:
+                    files[int(match.group(1))] = os.path.join(folder, f)
+        if not params or not files:
+            raise ValueError(f"No checkpoint or saved model is found in {path}")
+        if step is None:
+            step = max(files)
+        elif step not in files:
+            raise ValueError(f"The saved model in {path} has no weights at step {step}, only {sorted(files)}")
+
+        # the scalings are only computed by the setup, the other settings are not used
+        params = dict(params, is_save=False, warm_start="", freeze_layers=0, save_path=os.path.join(path, "warm_start"))
+        source = PINN(params)
+        source._build_net()
+        source.model.net.load_weights(files[step])
+        return [v.numpy() for v in source.model.net.weights], source._nn_scalings()
+
+    def _nn_scalings(self):
+        """ the variables and the scalings of the network, json serializable
+        """
+        nn = self.params.nn
+        return {"input_variables": list(nn.input_variables), "output_variables": list(nn.output_variables),
+                "input_lb": np.array(nn.input_lb, dtype=float).tolist(), "input_ub": np.array(nn.input_ub, dtype=float).tolist(),
+                "output_lb": np.array(nn.output_lb, dtype=float).tolist(), "output_ub": np.array(nn.output_ub, dtype=float).tolist()}
+
+    def _build_net(self):
+        """ create the weights of the network, which are only created at the first call
+        """
+        if not self.model.net.weights:
+            self.model.net(self.dde_data.train_x_all[:1].astype(dde.config.real(np)))
+
+    def _checkpoint_path(self, path=""):
+        """ folder of the checkpoints, default to the `checkpoints` folder in `save_path`
+        """
+        if path == "":
+            path = os.path.join(self.params.training.save_path, "checkpoints")
+        return path
+
+    def _build_optimizer(self, opt, var_list):
+        """ create the slots of the optimizer, if not yet created. The Keras 3 optimizers have `built`, those of
+            Keras 2 (TensorFlow 2.11 to 2.15) have `_built`, and without `build` one step with zero gradients is applied,
+            the values of the slots are restored afterwards
+        """
+        if getattr(opt, "built", getattr(opt, "_built", False)):
+            return
+        if hasattr(opt, "build"):
+            opt.build(var_list)
+        else:
+            opt.apply_gradients([(tf.zeros_like(v), v) for v in var_list])
+
+    def _checkpoint_state(self):
+        """ collect the state of the training as a dict of NumPy arrays and a json serializable dict
+        """
+        arrays = {f"net_{i}": v.numpy() for i, v in enumerate(self.model.net.weights)}
+        opt = self.model.opt_name
+        opt_variables = opt.variables if hasattr(opt, "variables") else []
+        arrays.update({f"optimizer_{i}": v.numpy() for i, v in enumerate(opt_variables)})
+        if self.model.loss_weights is not None:
+            arrays["loss_weights"] = np.array(self.model.loss_weights, dtype=float)
+        arrays["collocation_points"] = np.array(self.dde_data.train_x_all)
+        if self.dde_data.anchors is not None:
+            arrays["anchors"] = np.array(self.dde_data.anchors)
+
+        # random states
+        np_state = np.random.get_state()
+        arrays["numpy_random_keys"] = np.array(np_state[1])
+        py_state = random.getstate()
+        arrays["python_random_keys"] = np.array(py_state[1], dtype=np.uint64)
+
+        history = self.model.losshistory
+        # with the scalings of the network, used by `warm_start`
+        meta = {"step": int(self.model.train_state.step),
+                "epoch": int(self.model.train_state.epoch),
+                "num_optimizer_variables": len(opt_variables),
+                "history": {"steps": [int(s) for s in history.steps],
+                    "loss_train": [np.array(l, dtype=float).tolist() for l in history.loss_train],
+                    "loss_test": [np.array(l, dtype=float).tolist() for l in history.loss_test]},
+                "loss_weights_history": self.loss_weights_history,
+                "nn": self._nn_scalings(),
+                "numpy_random": [int(np_state[2]), int(np_state[3]), float(np_state[4])],
+                "python_random": [py_state[0], py_state[2]]}
+        return arrays, meta
+
+    def _checkpoint_writer(self, path=""):
+        """ the background writer of the checkpoints in `path`, created once per folder
+        """
+        path = self._checkpoint_path(path)
+        if path not in self._checkpoint_writers:
+            params = self.params.training
+            self._checkpoint_writers[path] = CheckpointWriter(path, keep_last=params.checkpoint_keep_last,
+                    keep_best=params.checkpoint_keep_best)
+        return self._checkpoint_writers[path]
+
+    def _freeze_layers(self, num_layers):
+        """ exclude the weights of the first `num_layers` layers from the training
+        """
+        net = self.model.net
+        if isinstance(net, EnsembleFNN):
+            layers = [[k, b] for k, b in zip(net.kernels, net.biases)]
+        elif isinstance(net, dde.nn.FNN):
+            layers = [[d] for d in net.denses if isinstance(d, tf.keras.layers.Dense)]
+        else:
+            raise ValueError(f"Freezing layers is not implemented for {type(net).__name__}")
+        if num_layers > len(layers):
+            raise ValueError(f"Can not freeze {num_layers} layers of a network with {len(layers)} layers")
+        for layer in layers[:num_layers]:
+            for l in layer:
+                l.trainable = False
+
+    def _jit_compile_model(self, lr, decay=None):
+        """ replace the training step, losses and predictions in the deepxde model by XLA compiled functions.
+            The python functions behind deepxde's `tf.function` are called directly, since a nested 
+            `tf.function` in an XLA cluster is recompiled at every step
+        """
+        if backend_name != "tensorflow":
+            raise ValueError(f"jit_compile is not supported by the backend {backend_name}")
+
+        outputs = self.model.outputs.python_function
+        outputs_losses_train = self.model.outputs_losses_train.python_function
+        outputs_losses_test = self.model.outputs_losses_test.python_function
+
+        self.model.outputs = tf.function(outputs, jit_compile=True)
+        self.model.outputs_losses_train = tf.function(outputs_losses_train, jit_compile=True)
+        self.model.outputs_losses_test = tf.function(outputs_losses_test, jit_compile=True)
+
+        # external optimizers, e.g. L-BFGS, run their own loop on top of outputs_losses_train
+        if not dde.optimizers.is_external_optimizer(self.model.opt_name):
+            opt = dde.optimizers.get(self.model.opt_name, learning_rate=lr, decay=decay)
+
+            @tf.function(jit_compile=True)
+            def train_step(inputs, targets, auxiliary_vars):
+                with tf.GradientTape() as tape:
+                    losses = outputs_losses_train(inputs, targets, auxiliary_vars)[1]
+                    total_loss = tf.math.reduce_sum(losses)
+                trainable_variables = self.model.net.trainable_variables + self.model.external_trainable_variables
+                grads = tape.gradient(total_loss, trainable_variables)
+                opt.apply_gradients(zip(grads, trainable_variables))
+
+            self.model.train_step = train_step
+
+    def _point_set_bc(self, name, X, sol, component=0, func=None):
+        """ data misfit term of `name`, in mini-batches if `data_batch_size` is set for it
+
+        Args:
+            func: the operator applied to the nn outputs, if None, compare the output `component` directly
+        """
+        batch_size = self.params.training.data_batch_size.get(name, None)
+        if func is None:
+            if batch_size is None:
+                return dde.icbc.PointSetBC(X, sol, component=component)
+            return MiniBatchPointSetBC(X, sol, component=component, batch_size=batch_size)
+        else:
+            if batch_size is None:
+                return dde.icbc.PointSetOperatorBC(X, sol, func)
+            return MiniBatchPointSetOperatorBC(X, sol, func, batch_size=batch_size)
+
+    def _predict_bytes_per_point(self):
+        """ estimate the memory used by the network to predict one point: the inputs, the outputs
+            and the hidden layers, each with the pre-activations, activations and transforms
+        """
+        nn = self.params.nn
+        if isinstance(nn.num_neurons, list):
+            width = sum(nn.num_neurons)
+        else:
+            width = nn.num_neurons * nn.num_layers
+        if nn.is_parallel:
+            width *= nn.output_size
+        return 2 * nn.ensemble_size * (nn.input_size + width + nn.output_size) * np.dtype(dde.config.real(np)).itemsize
+
+    def _residuals(self, x):
+        """ the residuals of all the equations at x, in the ensemble mode, the root mean square over the members,
+            so that the residuals of opposite signs do not cancel
+        """
+        num_members = self.params.nn.ensemble_size
+        if num_members == 1:
+            return self.physics.pdes(x, self.model.net(x, training=False))
+        x, y = self.model.net.forward(x)
+        residuals = self.physics.pdes(x, y)
+        return [tf.sqrt(tf.reduce_mean(tf.square(tf.reshape(r, [num_members, -1, 1])), axis=0)) for r in residuals]
+
+    def _read_checkpoint(self, path, step=None):
+        """ read the arrays and the metadata of the checkpoint at `step` in the folder `path`
+        """
+        index = list_checkpoints(path)
+        if not index["checkpoints"]:
+            raise ValueError(f"No checkpoint is found in {path}")
+        if step is None:
+            step = index["checkpoints"][-1]["step"]
+        elif step == "best":
+            step = index["best"]
+        records = [r for r in index["checkpoints"] if r["step"] == step]
+        if not records:
+            raise ValueError(f"Checkpoint at step {step} is not found in {path}")
+        return load_checkpoint_file(os.path.join(path, records[0]["file"]))
+
+    def _train_stage(self, stage, callbacks):
+        """ compile the model with the optimizer and the loss weights of the stage, then train for `stage.epochs` steps,
+            or until the plateau or wall-clock criterion of `StageStopper` is met, the losses are checked every `stage.check_every` steps.
+            The optimizers of deepxde are trained in one call, L-BFGS in calls of `stage.check_every` iterations.
+            The step counter, loss history and checkpoints of deepxde continue from the previous stage
+        """
+        # keep the current weights, in case they are updated during the training
+        loss_weights = None
+        if self.params.training.has_LossWeightBalancer() and self.model.loss_weights is not None:
+            loss_weights = [float(w) for w in np.array(self.model.loss_weights)]
+        # curriculum: the weights of this stage, from the weights in TrainingParameter
+        if stage.has_loss_weights():
+            loss_weights = list(self.params.training.loss_weights)
+            if stage.pde_weight_scale is not None:
+                for i in range(len(self.physics.residuals)):
+                    loss_weights[i] *= stage.pde_weight_scale
+            for name, w in stage.loss_weights.items():
+                if name not in self.loss_names:
+                    raise ValueError(f"Loss term {name} is not found in {self.loss_names}")
+                loss_weights[self.loss_names.index(name)] = w
+        # resample the collocation points, the test points follow the new training points
+        if stage.num_collocation_points is not None:
+            self.dde_data.num_domain = stage.num_collocation_points
+            self.dde_data.anchors = None
+            self.dde_data.resample_train_points(pde_points=True, bc_points=False)
+            self.dde_data.test_x, self.dde_data.test_y, self.dde_data.test_aux_vars = None, None, None
+        lr = stage.learning_rate if stage.learning_rate is not None else self.params.training.learning_rate
+        if stage.learning_rate_schedule is not None:
+            # the schedule of the stage starts at the beginning of the stage
+            self.compile(opt=stage.optimizer, lr=lr, loss_weights=loss_weights, lr_schedule=stage.learning_rate_schedule, initial_step=0)
+        else:
+            self.compile(opt=stage.optimizer, lr=lr, loss_weights=loss_weights, decay=stage.decay)
+
+        # the losses are evaluated every `check_every` steps, where the criteria of the stage are checked
+        plateau = stage.has_plateau()
+        stopper = StageStopper(period=stage.check_every, max_time=stage.max_time,
+                min_delta=stage.min_delta if plateau else None, patience=stage.patience if plateau else None)
+        if not dde.optimizers.is_external_optimizer(stage.optimizer):
+            # in one call, stopped by `StageStopper`
+            self._loss_history, self._train_state = self.model.train(iterations=stage.epochs,
+                    display_every=stage.check_every, disregard_previous_best=True, callbacks=(callbacks or []) + [stopper])
+            return
+
+        # the L-BFGS of deepxde in tensorflow calls no epoch callbacks, and does not check `model.stop_training`,
+        # so it runs in calls of `check_every` iterations, and the criteria are checked between the calls
+        lbfgs_options = dict(dde.optimizers.LBFGS_options)
+        stopper.set_model(self.model)
+        stopper.on_train_begin()
+        start_step = self.model.train_state.step
+        try:
+            while self.model.train_state.step - start_step < stage.epochs:
+                iterations = min(stage.check_every, stage.epochs - (self.model.train_state.step - start_step))
+                dde.optimizers.LBFGS_options["maxiter"] = iterations
+                dde.optimizers.LBFGS_options["maxfun"] = int(iterations * 1.25)
+                previous_step = self.model.train_state.step
+                self._loss_history, self._train_state = self.model.train(iterations=iterations,
+                        display_every=stage.check_every, disregard_previous_best=True, callbacks=callbacks)
+                # stopped by a callback, the criteria of the stage, or L-BFGS converged
+                if self.model.stop_training or stopper.timeout() or stopper.plateau() or \
+                        (self.model.train_state.step - previous_step < iterations):
+                    break
+        finally:
+            dde.optimizers.LBFGS_options.update(lbfgs_options)
+
     def _update_nn_parameters(self):
         """ assign physic.input_var, output_var, output_lb, and output_ub to nn
         """
@@ -0,0 +1,373 @@
+import copy
+import gc
+import itertools
+import os
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from .parameter import Parameters
+from .modeldata import Data
+from .utils import share_arrays, attach_arrays, set_threads
+
+
+def set_param(params, key, value):
+    """ set `value` in the nested dict `params`, `key` is the path separated by ".", e.g. "equations.SSA.scalar_variables.B"
+    """
+    keys = key.split(".")
+    d = params
+    for k in keys[:-1]:
+        d = d.setdefault(k, {})
+    d[keys[-1]] = value
+
+
+class Sweep:
+    """ run PINN trials over a search space on a local process pool. The data files in the base parameters are loaded
+        once, and shared with the workers through shared memory, so that the trials only prepare their training data
+
+    Args:
+        params (dict): the base parameters of all the trials
+        space (dict): the key is the path of a parameter, separated by ".", e.g. "num_neurons", "data.ISSM.data_size",
+            or "equations.SSA.scalar_variables.B", the value is
+            - a list of the candidate values, used by "grid" and "random"
+            - a tuple (low, high) of a uniform distribution, only for "random", integers if both are int
+        method (str): "grid" for all the combinations, "random" for `num_trials` random samples
+        num_trials (int): number of the trials of "random"
+        num_workers (int): number of the processes, if None, use all the CPUs divided by `num_threads`
+        num_threads (int): number of the intra-op threads of each worker
+        seed (int): seed of the random search
+    """
+    def __init__(self, params, space, method="grid", num_trials=10, num_workers=None, num_threads=1, seed=None):
+        if method not in ["grid", "random"]:
+            raise ValueError(f"Unknown search method {method}, use 'grid' or 'random'")
+        self.params = params
+        self.space = space
+        self.method = method
+        self.num_trials = num_trials
+        self.num_threads = num_threads
+        self.num_workers = num_workers if num_workers else max(1, (os.cpu_count() or 1) // num_threads)
+        self.seed = seed
+        self.results = None
+
+    def run(self, iterations=0):
+        """ train all the trials, and return the summary table sorted by the final training loss
+
+        Args:
+            iterations (int): number of the training steps of each trial, if 0, use the settings in the parameters
+        """
+        trials = self.trials()
+        base_data = Parameters(self.params).data.data
+        model_data = Data(Parameters(self.params).data)
+        model_data.load_data()
+        preloaded = {k: {"X_dict": d.X_dict, "data_dict": d.data_dict, "mask_dict": d.mask_dict, "mesh_dict": d.mesh_dict}
+                     for k, d in model_data.data.items()}
+        blocks, descriptors = share_arrays(preloaded)
+        del model_data, preloaded
+
+        results = []
+        try:
+            with ProcessPoolExecutor(max_workers=self.num_workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker, initargs=(descriptors, self.num_threads)) as executor:
+                futures = []
+                for i, overrides in enumerate(trials):
+                    params = self.trial_params(i, overrides)
+                    # only the data files which are not changed by the trial are shared
+                    trial_data = Parameters(params).data.data
+                    keys = [k for k in trial_data if (k in base_data) and _same_file(trial_data[k], base_data[k])]
+                    futures.append(executor.submit(_run_trial, i, overrides, params, keys, iterations))
+                for f in as_completed(futures):
+                    results.append(f.result())
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        self.results = self.summary(results)
+        return self.results
+
+    def save_summary(self, path="", filename="sweep.csv"):
+        """ save the summary table of the last `run` to a csv file
+        """
+        if path == "":
+            path = Parameters(self.params).training.save_path
+        os.makedirs(path, exist_ok=True)
+        self.results.to_csv(os.path.join(path, filename), index=False)
+
+    def summary(self, results):
+        """ one row per trial, with the values from the search space, the losses and the timing
+        """
+        rows = []
+        for r in sorted(results, key=lambda r: r["trial"]):
+            row = {"trial": r["trial"]}
+            row.update({k: (str(v) if isinstance(v, (dict, list)) else v) for k, v in r["overrides"].items()})
+            row.update({k: v for k, v in r.items() if k not in ["trial", "overrides"]})
+            rows.append(row)
+        table = pd.DataFrame(rows)
+        if "loss" in table:
+            table = table.sort_values("loss", na_position="last", kind="stable").reset_index(drop=True)
+        return table
+
+    def trial_params(self, trial, overrides):
+        """ the parameters of one trial, each trial is saved in its own folder under `save_path`
+        """
+        params = copy.deepcopy(self.params)
+        for k, v in overrides.items():
+            set_param(params, k, copy.deepcopy(v))
+        params["save_path"] = os.path.join(Parameters(self.params).training.save_path, f"trial-{trial}")
+        return params
+
+    def trials(self):
+        """ list of the overrides of all the trials, as dicts of {key: value}
+        """
+        keys = list(self.space)
+        if self.method == "grid":
+            for k in keys:
+                if not isinstance(self.space[k], list):
+                    raise ValueError(f"Grid search needs a list of the values of {k}")
+            return [dict(zip(keys, values)) for values in itertools.product(*[self.space[k] for k in keys])]
+
+        rng = np.random.default_rng(self.seed)
+        trials = []
+        for _ in range(self.num_trials):
+            overrides = {}
+            for k in keys:
+                s = self.space[k]
+                if isinstance(s, list):
+                    overrides[k] = s[rng.integers(len(s))]
+                elif isinstance(s, tuple) and len(s) == 2:
+                    if all(isinstance(b, int) for b in s):
+                        overrides[k] = int(rng.integers(s[0], s[1], endpoint=True))
+                    else:
+                        overrides[k] = float(rng.uniform(s[0], s[1]))
+                else:
+                    raise ValueError(f"Random search needs a list or a (low, high) tuple of {k}")
+            trials.append(overrides)
+        return trials
+
+
+class SuccessiveHalving(Sweep):
+    """ asynchronous successive halving (ASHA) over the trials of a search space. The trials are trained in rounds,
+        rung k ends at `min_iterations`*`reduction_factor`^k steps, capped by `max_iterations`. Whenever a worker is free,
+        the best trial in the top 1/`reduction_factor` of a rung, which is not promoted yet, continues to the next rung,
+        starting from the highest rung; if there is none, a new trial starts at rung 0. Each worker is its own process,
+        as in `Sweep`, and keeps the models of the trials it trained. A promoted trial resumes in the worker keeping its
+        model if that worker is free, otherwise in any free worker from the checkpoint saved at the end of its last rung.
+        The models of the trials which can no longer be promoted are dropped from the workers.
+        The data files are loaded once and shared with the workers
+
+    Args:
+        min_iterations (int): number of the training steps of rung 0
+        max_iterations (int): number of the training steps of the last rung
+        reduction_factor (int): only the top 1/reduction_factor of each rung are promoted
+        num_workers (int): number of the trials trained at the same time
+        the others are the same as `Sweep`
+    """
+    def __init__(self, params, space, method="random", num_trials=10, min_iterations=100, max_iterations=1000,
+            reduction_factor=3, num_workers=None, num_threads=1, seed=None):
+        super().__init__(params, space, method=method, num_trials=num_trials, num_workers=num_workers,
+                num_threads=num_threads, seed=seed)
+        if not (0 < min_iterations <= max_iterations):
+            raise ValueError("min_iterations should be positive and not larger than max_iterations")
+        if reduction_factor < 2:
+            raise ValueError("reduction_factor should be at least 2")
+        self.min_iterations = min_iterations
+        self.max_iterations = max_iterations
+        self.reduction_factor = reduction_factor
+        # training steps at the end of each rung
+        self.budgets = []
+        budget = min_iterations
+        while budget < max_iterations:
+            self.budgets.append(budget)
+            budget *= reduction_factor
+        self.budgets.append(max_iterations)
+
+        # the worker which keeps the model of each trial, and the losses at the end of each rung: rungs[k][trial] = loss
+        self.owners = {}
+        self.rungs = [{} for _ in self.budgets]
+        self.promoted = [set() for _ in self.budgets]
+
+    def next_job(self, pending):
+        """ the next (trial, rung) to train: promote a trial if possible, otherwise start a pending trial
+
+        Args:
+            pending (list): the trials not started yet
+        """
+        for k in reversed(range(len(self.budgets)-1)):
+            finished = sorted(self.rungs[k], key=lambda t: self.rungs[k][t])
+            top = finished[:len(finished)//self.reduction_factor]
+            candidates = [t for t in top if t not in self.promoted[k] and np.isfinite(self.rungs[k][t])]
+            if candidates:
+                self.promoted[k].add(candidates[0])
+                return candidates[0], k+1
+        if pending:
+            return pending.pop(0), 0
+        return None
+
+    def eliminated(self, num_trials):
+        """ the trials which finished their last rung, or can not be promoted from their highest rung any more:
+            at most n_k trials finish rung k, with n_0 = `num_trials` and n_(k+1) = n_k // `reduction_factor`,
+            so a trial ranked n_k // `reduction_factor` or lower in rung k is never in the top of the rung
+        """
+        eliminated = set()
+        size = num_trials
+        for k in range(len(self.budgets)):
+            finished = sorted(self.rungs[k], key=lambda t: self.rungs[k][t])
+            size //= self.reduction_factor
+            for rank, t in enumerate(finished):
+                if t in self.promoted[k]:
+                    continue
+                if (k == len(self.budgets)-1) or (rank >= size) or (not np.isfinite(self.rungs[k][t])):
+                    eliminated.add(t)
+        return eliminated
+
+    def run(self):
+        """ run the scheduler until no trial can be promoted, return the summary table,
+            sorted by the highest rung reached, then by the loss at this rung
+        """
+        trials = self.trials()
+        base_data = Parameters(self.params).data.data
+        model_data = Data(Parameters(self.params).data)
+        model_data.load_data()
+        preloaded = {k: {"X_dict": d.X_dict, "data_dict": d.data_dict, "mask_dict": d.mask_dict, "mesh_dict": d.mesh_dict}
+                     for k, d in model_data.data.items()}
+        blocks, descriptors = share_arrays(preloaded)
+        del model_data, preloaded
+
+        params = [self.trial_params(i, overrides) for i, overrides in enumerate(trials)]
+        self.owners = {}
+        self.rungs = [{} for _ in self.budgets]
+        self.promoted = [set() for _ in self.budgets]
+        errors = {}
+        steps = {}
+        evicted = set()
+        pending = list(range(len(trials)))
+        # one process for each worker, so that the promoted trials can be sent to the process keeping their models
+        workers = [ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                   initializer=_init_worker, initargs=(descriptors, self.num_threads)) for _ in range(self.num_workers)]
+        try:
+            running = {}
+            while True:
+                busy = {w for _, _, w in running.values()}
+                while len(busy) < self.num_workers:
+                    job = self.next_job(pending)
+                    if job is None:
+                        break
+                    trial, rung = job
+                    # the worker keeping the model, if free, otherwise the model is loaded from its checkpoint
+                    owner = self.owners.get(trial)
+                    w = owner if (owner is not None) and (owner not in busy) else min(set(range(self.num_workers)) - busy)
+                    if (owner is not None) and (owner != w):
+                        workers[owner].submit(_evict_trials, [trial])
+                    self.owners[trial] = w
+                    busy.add(w)
+                    data = Parameters(params[trial]).data.data
+                    keys = [k for k in data if (k in base_data) and _same_file(data[k], base_data[k])]
+                    running[workers[w].submit(_train_rung, trial, params[trial], keys, self.budgets[rung],
+                            resume_step=steps.get(trial) if rung > 0 else None,
+                            checkpoint=(rung < len(self.budgets)-1))] = (trial, rung, w)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in done:
+                    trial, rung, _ = running.pop(f)
+                    try:
+                        self.rungs[rung][trial], steps[trial] = f.result()
+                    except Exception as e:
+                        # a failed trial is not promoted
+                        errors[trial] = repr(e)
+                        self.rungs[rung][trial] = np.inf
+                # free the memory of the models which are not trained any more
+                for trial in self.eliminated(len(trials)) - evicted:
+                    if trial in self.owners:
+                        workers[self.owners[trial]].submit(_evict_trials, [trial])
+                    evicted.add(trial)
+        finally:
+            for executor in workers:
+                executor.shutdown()
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        results = []
+        for i, overrides in enumerate(trials):
+            rung = max(k for k in range(len(self.budgets)) if i in self.rungs[k])
+            result = {"trial": i, "overrides": overrides, "rung": rung, "steps": steps.get(i, 0),
+                      "loss": self.rungs[rung][i]}
+            result.update({f"loss_rung{k}": self.rungs[k][i] for k in range(len(self.budgets)) if i in self.rungs[k]})
+            if i in errors:
+                result["error"] = errors[i]
+            results.append(result)
+        table = self.summary(results)
+        self.results = table.sort_values(["rung", "loss"], ascending=[False, True], kind="stable").reset_index(drop=True)
+        return self.results
+
+
+def _same_file(p1, p2):
+    """ if two `SingleDataParameter` load the same variables from the same file
+    """
+    return (p1.source, p1.data_path, p1.name_map) == (p2.source, p2.data_path, p2.name_map)
+
+
+# the data shared by the parent process, attached once in each worker
+_worker_data = {}
+
+
+def _init_worker(descriptors, num_threads):
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    set_threads(num_intra_op_threads=num_threads)
+    _worker_data["blocks"], _worker_data["preloaded"] = attach_arrays(descriptors)
+
+
+def _train_rung(trial, params, keys, budget, resume_step=None, checkpoint=False):
+    """ build the model of `trial` if it is not in this worker, and load its checkpoint at `resume_step` if given,
+        then train it up to `budget` steps, and save a checkpoint if `checkpoint`,
+        return the total training loss and the number of steps
+    """
+    from .pinn import PINN
+    models = _worker_data.setdefault("models", {})
+    if trial not in models:
+        experiment = PINN(params, preloaded_data={k: _worker_data["preloaded"][k] for k in keys})
+        experiment.compile()
+        if resume_step is not None:
+            experiment.load_checkpoint(step=resume_step)
+        models[trial] = experiment
+    experiment = models[trial]
+    iterations = budget - experiment.model.train_state.step
+    if iterations > 0:
+        experiment.train(iterations)
+    if checkpoint:
+        experiment.save_checkpoint()
+    return float(sum(experiment.history.history[name][-1] for name in experiment.loss_names)), int(experiment.model.train_state.step)
+
+
+def _evict_trials(trials):
+    """ drop the models of `trials` from this worker
+    """
+    models = _worker_data.setdefault("models", {})
+    for trial in trials:
+        models.pop(trial, None)
+    gc.collect()
+
+
+def _run_trial(trial, overrides, params, keys, iterations):
+    from .pinn import PINN
+    result = {"trial": trial, "overrides": overrides}
+    try:
+        t0 = time.time()
+        experiment = PINN(params, preloaded_data={k: _worker_data["preloaded"][k] for k in keys})
+        experiment.compile()
+        t1 = time.time()
+        experiment.train(iterations)
+        t2 = time.time()
+        losses = np.array(experiment.model.train_state.loss_train, dtype=float)
+        result["loss"] = float(np.sum(losses))
+        result.update({name: float(l) for name, l in zip(experiment.loss_names, losses)})
+        result["steps"] = int(experiment.model.train_state.step)
+        result["setup_time"] = t1 - t0
+        result["train_time"] = t2 - t1
+    except Exception as e:
+        # one failed configuration does not stop the sweep
+        result["error"] = repr(e)
+    return result
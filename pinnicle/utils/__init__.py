@@ -1,4 +1,9 @@
 from .helper import *
-from .history import History
+from .history import History, load_metrics_stream
 from .data_misfit import get
 from .plotting import plot_solutions, plot_dict_data, plot_data, plot_nn, plot_similarity, plot_residuals, tripcolor_similarity, tripcolor_residuals
+from .callbacks import ResidualAdaptiveResampler, LossWeightBalancer, Checkpointer, MetricsLogger, StepProfiler, TraceWindow, StageStopper, current_losses
+from .schedules import LearningRateSchedule
+from .checkpoint import CheckpointWriter, list_checkpoints, load_checkpoint_file
+from .shared import share_arrays, attach_arrays
+from .synthetic import synthetic_glacier, write_synthetic_issm, write_mat73, write_exp
@@ -0,0 +1,561 @@
+import json
+import os
+import time
+import numpy as np
+import deepxde as dde
+from deepxde.backend import backend_name, tf
+
+
+def current_losses(model):
+    """ the weighted training losses of the current step, from the last evaluation of deepxde if it is at this step,
+        i.e. at the `display_every` steps and the last step of `model.train`, otherwise they are evaluated on the current
+        training points, which costs one more forward pass with the residuals of the pdes, about the loss part of a step
+    """
+    state = model.train_state
+    history = model.losshistory
+    if (state.loss_train is not None) and history.steps and (history.steps[-1] == state.step):
+        return np.array(state.loss_train, dtype=float)
+    return np.array(model._outputs_losses(True, state.X_train, state.y_train, state.train_aux_vars)[1], dtype=float)
+
+
+class ResidualAdaptiveResampler(dde.callbacks.Callback):
+    """ residual-based adaptive resampling of the collocation points, every `period` steps, the pde
+        residuals are evaluated on a pool of random candidate points from the domain, then
+
+        - "RAD": redraw all the collocation points from the candidates, with probability
+          proportional to |r|^k / mean(|r|^k) + c
+        - "RAR": add the `num_add` candidates with the largest residuals to the collocation points
+
+    Args:
+        residual_function: function of the inputs, returns a dict or list of the residuals of all the pdes
+        period (int): number of steps between two resamplings
+        method (str): "RAD" or "RAR"
+        num_candidates (int): number of candidate points, if None, 10 times the number of collocation points
+        k (float): exponent of the residuals in "RAD"
+        c (float): constant added to the normalized density in "RAD", larger values are closer to uniform sampling
+        num_add (int): number of points added at each resampling in "RAR"
+    """
+    def __init__(self, residual_function, period=100, method="RAD", num_candidates=None, k=1.0, c=1.0, num_add=100):
+        super().__init__()
+        self.residual_function = residual_function
+        self.period = period
+        self.method = method.upper()
+        self.num_candidates = num_candidates
+        self.k = k
+        self.c = c
+        self.num_add = num_add
+
+        self.epochs_since_last_resample = 0
+
+    def on_epoch_end(self):
+        self.epochs_since_last_resample += 1
+        if self.epochs_since_last_resample < self.period:
+            return
+        self.epochs_since_last_resample = 0
+        self.resample()
+
+    def residual_magnitude(self, X):
+        """ sum of the absolute residuals of all the pdes at X, each normalized by its mean,
+            so that the equations with different units contribute equally
+        """
+        residuals = self.residual_function(X)
+        if isinstance(residuals, dict):
+            residuals = list(residuals.values())
+        err = np.zeros(X.shape[0])
+        for r in residuals:
+            r = np.abs(np.ravel(r))
+            err += r / max(np.mean(r), np.finfo(r.dtype).tiny)
+        return err
+
+    def resample(self):
+        """ evaluate the residuals on new candidates, and update the collocation points of `model.data`
+        """
+        data = self.model.data
+        num_candidates = self.num_candidates if self.num_candidates else 10 * data.num_domain
+        candidates = data.geom.random_points(num_candidates)
+        err = self.residual_magnitude(candidates)
+
+        if self.method == "RAD":
+            density = err**self.k / np.mean(err**self.k) + self.c
+            idx = np.random.choice(num_candidates, size=min(data.num_domain, num_candidates), replace=False,
+                    p=density/np.sum(density))
+            data.replace_with_anchors(candidates[idx])
+        elif self.method == "RAR":
+            idx = np.argsort(err)[-self.num_add:]
+            data.add_anchors(candidates[idx])
+        else:
+            raise ValueError(f"Unknown adaptive resampling method {self.method}, use 'RAD' or 'RAR'")
+
+
+class LossWeightBalancer(dde.callbacks.Callback):
+    """ adaptive balancing of the loss weights, every `period` steps, the weights of all the loss terms are
+        updated by a moving average w = alpha*w + (1-alpha)*w_new, where w_new is computed by
+
+        - "gradnorm": gradient-norm balancing, the gradient of each weighted loss term with respect to the
+          trainable variables has the same norm, equals to the mean of the current weighted norms
+        - "softadapt": the initial weights scaled by the softmax of beta times the relative decrease
+          rate of each loss term, the terms decreasing slowly get larger weights
+
+    Args:
+        names (list): names of the loss terms
+        period (int): number of steps between two updates
+        method (str): "gradnorm" or "softadapt"
+        alpha (float): coefficient of the moving average
+        beta (float): inverse temperature of "softadapt", applied to the relative change of the losses
+        history (dict): the updated weights are appended to history[name], and the steps to history["steps"]
+    """
+    def __init__(self, names, period=100, method="gradnorm", alpha=0.9, beta=10.0, history=None):
+        super().__init__()
+        self.names = names
+        self.period = period
+        self.method = method.lower()
+        self.alpha = alpha
+        self.beta = beta
+        self.history = history if history is not None else {}
+        for k in ["steps"] + list(names):
+            self.history.setdefault(k, [])
+
+        if self.method not in ["gradnorm", "softadapt"]:
+            raise ValueError(f"Unknown loss balancing method {self.method}, use 'gradnorm' or 'softadapt'")
+        if self.method == "gradnorm" and backend_name != "tensorflow":
+            raise ValueError(f"'gradnorm' is not supported by the backend {backend_name}")
+
+        self.initial_weights = None
+        self.previous_losses = None
+        self.epochs_since_last_update = 0
+        self._gradient_norms = None
+        self._loss_weights = None
+
+    def on_train_begin(self):
+        # a new compile, e.g. in the next stage, creates new loss weights and losses, the initial weights
+        # are those of the new compile, and the compiled gradient norms use the new losses
+        if self.model.loss_weights is not self._loss_weights:
+            self._loss_weights = self.model.loss_weights
+            self.initial_weights = self.get_weights()
+            self.previous_losses = None
+            self._gradient_norms = None
+        if not self.history["steps"]:
+            self.record()
+
+    def on_epoch_end(self):
+        self.epochs_since_last_update += 1
+        if self.epochs_since_last_update < self.period:
+            return
+        self.epochs_since_last_update = 0
+        self.update()
+
+    def get_weights(self):
+        """ current loss weights of the model as a NumPy array
+        """
+        weights = self.model.loss_weights
+        if hasattr(weights, "numpy"):
+            return weights.numpy()
+        return np.array(weights, dtype=float)
+
+    def set_weights(self, weights):
+        """ update the loss weights of the model in place, so that the compiled losses use the new values
+        """
+        if hasattr(self.model.loss_weights, "assign"):
+            self.model.loss_weights.assign(weights)
+        else:
+            self.model.loss_weights[:] = list(weights)
+
+    def record(self):
+        """ append the current weights to the history
+        """
+        self.history["steps"].append(int(self.model.train_state.step))
+        for name, w in zip(self.names, self.get_weights()):
+            self.history[name].append(float(w))
+
+    def update(self):
+        """ compute the new weights and update the model
+        """
+        weights = self.get_weights()
+        if self.method == "gradnorm":
+            new_weights = self._gradnorm_weights(weights)
+        else:
+            new_weights = self._softadapt_weights(weights)
+        if new_weights is None:
+            return
+        self.set_weights(self.alpha*weights + (1.0-self.alpha)*new_weights)
+        self.record()
+
+    def _gradnorm_weights(self, weights):
+        """ weights making the gradient norms of all the weighted loss terms equal
+        """
+        if self._gradient_norms is None:
+            outputs_losses = getattr(self.model.outputs_losses_train, "python_function", self.model.outputs_losses_train)
+
+            @tf.function
+            def gradient_norms(inputs, targets, auxiliary_vars):
+                trainable_variables = self.model.net.trainable_variables + self.model.external_trainable_variables
+                with tf.GradientTape(persistent=True) as tape:
+                    losses = outputs_losses(inputs, targets, auxiliary_vars)[1]
+                    losses = [losses[i] for i in range(len(self.names))]
+                return tf.stack([tf.linalg.global_norm(tape.gradient(l, trainable_variables)) for l in losses])
+            self._gradient_norms = gradient_norms
+
+        state = self.model.train_state
+        # norms of the weighted terms
+        norms = self._gradient_norms(state.X_train, state.y_train, state.train_aux_vars).numpy()
+        valid = (norms > 0) & (weights > 0)
+        if not np.any(valid):
+            return None
+        new_weights = weights.copy()
+        new_weights[valid] = np.mean(norms[valid]) * weights[valid] / norms[valid]
+        return new_weights
+
+    def _softadapt_weights(self, weights):
+        """ initial weights scaled by the softmax of the relative decrease rate of the unweighted losses
+        """
+        state = self.model.train_state
+        losses = self.model._outputs_losses(True, state.X_train, state.y_train, state.train_aux_vars)[1]
+        losses = np.array(losses, dtype=float)[:len(self.names)]
+        losses = np.divide(losses, weights, out=np.zeros_like(losses), where=weights != 0)
+        previous, self.previous_losses = self.previous_losses, losses
+        if previous is None:
+            return None
+        rate = np.divide(losses - previous, previous, out=np.zeros_like(losses), where=previous != 0)
+        s = np.exp(self.beta * (rate - np.max(rate)))
+        return self.initial_weights * len(s) * s / np.sum(s)
+
+
+class StageStopper(dde.callbacks.Callback):
+    """ stop a training stage after `max_time` seconds, or if the total training loss has not decreased by a relative
+        `min_delta` in `patience` steps. The wall-clock is checked at every step, the loss every `period` steps, where
+        deepxde evaluates the losses if `display_every` is `period`. The criteria can also be checked between the calls
+        of `model.train` by `timeout` and `plateau`
+
+    Args:
+        period (int): number of steps between two checks of the loss
+        max_time (float): maximum number of seconds of the stage, None for no limit
+        min_delta (float): minimum relative decrease of the loss, None for no plateau check
+        patience (int): number of steps without decrease before stopping, None for no plateau check
+    """
+    def __init__(self, period=1000, max_time=None, min_delta=None, patience=None):
+        super().__init__()
+        self.period = period
+        self.max_time = max_time
+        self.min_delta = min_delta if min_delta is not None else 0
+        self.patience = patience
+
+        self.start_time = None
+        self.best_loss = np.inf
+        self.best_step = 0
+
+    def on_train_begin(self):
+        self.start_time = time.time()
+        self.best_loss = np.inf
+        self.best_step = self.model.train_state.step
+
+    def on_epoch_end(self):
+        if self.timeout() or ((self.model.train_state.step % self.period == 0) and self.plateau()):
+            self.model.stop_training = True
+
+    def timeout(self):
+        """ if `max_time` seconds passed since the beginning of the stage
+        """
+        return (self.max_time is not None) and (time.time() - self.start_time >= self.max_time)
+
+    def plateau(self):
+        """ update the best loss with the last loss evaluated by deepxde, and check if it has not decreased in `patience` steps
+        """
+        if self.patience is None:
+            return False
+        state = self.model.train_state
+        loss = float(np.sum(state.loss_train))
+        if loss < self.best_loss * (1.0 - self.min_delta):
+            self.best_loss, self.best_step = loss, state.step
+            return False
+        return state.step - self.best_step >= self.patience
+
+
+class Checkpointer(dde.callbacks.Callback):
+    """ save resumable checkpoints through a `CheckpointWriter`, the state is collected on the training thread,
+        and written to the disk in the background. Every `period` steps, a checkpoint is saved if at least
+        `min_interval` seconds passed since the last one, and, if `better_only`, the training loss is improved.
+        The last state is always saved at the end of the training
+
+    Args:
+        state_function: function without arguments, returns (arrays, meta) of the current state
+        writer (CheckpointWriter): the background writer
+        period (int): number of steps between two checks
+        min_interval (float): minimum number of seconds between two checkpoints
+        better_only (bool): only save the checkpoints with a lower training loss
+    """
+    def __init__(self, state_function, writer, period=1000, min_interval=0.0, better_only=False):
+        super().__init__()
+        self.state_function = state_function
+        self.writer = writer
+        self.period = period
+        self.min_interval = min_interval
+        self.better_only = better_only
+
+        self.best_loss = np.inf
+        self.last_time = -np.inf
+        self.last_step = None
+        self.epochs_since_last_check = 0
+
+    def on_epoch_end(self):
+        self.epochs_since_last_check += 1
+        if self.epochs_since_last_check < self.period:
+            return
+        self.epochs_since_last_check = 0
+        if time.time() - self.last_time < self.min_interval:
+            return
+        loss = self.current_loss()
+        if self.better_only and not loss < self.best_loss:
+            return
+        self.save(loss)
+
+    def on_train_end(self):
+        if self.last_step != self.model.train_state.step:
+            self.save(self.current_loss())
+        self.writer.flush()
+
+    def current_loss(self):
+        """ total training loss, of the current step if `better_only` or the best checkpoint is kept, see `current_losses`,
+            otherwise the last loss evaluated by deepxde, as in `dde.callbacks.ModelCheckpoint`
+        """
+        if self.better_only or self.writer.keep_best:
+            return float(np.sum(current_losses(self.model)))
+        losses = self.model.train_state.loss_train
+        return float(np.sum(losses)) if losses is not None else np.inf
+
+    def save(self, loss):
+        """ collect the state and send it to the writer
+        """
+        arrays, meta = self.state_function()
+        meta["loss"] = loss
+        self.writer.submit(self.model.train_state.step, loss, arrays, meta)
+        self.best_loss = min(self.best_loss, loss)
+        self.last_time = time.time()
+        self.last_step = self.model.train_state.step
+
+
+class MetricsLogger(dde.callbacks.Callback):
+    """ stream the training metrics to an append-only JSON lines file, one record every `period` steps with the step,
+        the wall time, the weighted training loss of each term, the learning rate and the throughput in points/s.
+        The records are buffered, and written to the file every `buffer_size` records, or `flush_interval` seconds,
+        and at the end of the training, so the file can be read by `History.load` while the training is running.
+        The losses are reused from deepxde if it evaluated them at the step of the record, otherwise each record costs
+        one more evaluation of the losses, about the forward and residual part of one training step, see `current_losses`
+
+    Args:
+        filename (str): path of the .jsonl file, the records are appended if it exists
+        names (list): names of the loss terms
+        period (int): number of steps between two records
+        buffer_size (int): number of records written at once
+        flush_interval (float): maximum number of seconds a record is kept in the buffer
+    """
+    def __init__(self, filename, names, period=100, buffer_size=100, flush_interval=10.0):
+        super().__init__()
+        self.filename = filename
+        self.names = names
+        self.period = period
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+
+        self.buffer = []
+        self.last_flush = time.time()
+        self.last_time = None
+        self.last_step = None
+        self.epochs_since_last_record = 0
+
+    def on_train_begin(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+        self.epochs_since_last_record = 0
+        self.last_time = time.perf_counter()
+        self.last_step = self.model.train_state.step
+
+    def on_epoch_end(self):
+        self.epochs_since_last_record += 1
+        if self.epochs_since_last_record < self.period:
+            return
+        self.epochs_since_last_record = 0
+        self.record()
+        if (len(self.buffer) >= self.buffer_size) or (time.time() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def on_train_end(self):
+        if self.last_step != self.model.train_state.step:
+            self.record()
+        self.flush()
+
+    def flush(self):
+        """ append the buffered records to the file
+        """
+        if self.buffer:
+            with open(self.filename, "a") as f:
+                f.write("".join(json.dumps(r) + "\n" for r in self.buffer))
+            self.buffer = []
+        self.last_flush = time.time()
+
+    def learning_rate(self):
+        """ the current learning rate of the optimizer, None for the external optimizers, e.g. L-BFGS
+        """
+        opt = self.model.opt if self.model.opt is not None else self.model.opt_name
+        if hasattr(opt, "param_groups"):
+            return float(opt.param_groups[0]["lr"])
+        lr = getattr(opt, "learning_rate", None)
+        if hasattr(lr, "numpy"):
+            lr = lr.numpy()
+        return None if lr is None else float(lr)
+
+    def record(self):
+        """ add the metrics of the current step to the buffer, the throughput excludes the time of the previous record
+        """
+        now = time.perf_counter()
+        state = self.model.train_state
+        points = (state.step - self.last_step) * len(state.X_train)
+        losses = current_losses(self.model)
+        r = {"step": int(state.step), "time": time.time()}
+        r.update({k: float(l) for k, l in zip(self.names, losses)})
+        r["learning_rate"] = self.learning_rate()
+        r["points_per_s"] = points / (now - self.last_time) if now > self.last_time else None
+        self.buffer.append(r)
+        self.last_step = state.step
+        self.last_time = time.perf_counter()
+
+
+class StepProfiler(dde.callbacks.Callback):
+    """ split the time of the training steps into the loss terms, the optimizer update, and the rest of the training loop.
+        The steps are timed during the training, then every `period` steps, the following are timed on the current training
+        points, by `num_repeats` calls of their own compiled functions: the gradient of each loss term alone, where the other
+        loss functions return 0, so their pdes and operators are pruned from the graph; the gradient of all the terms; and
+        the training step, after which the variables of the network and the optimizer are restored. The time of all the terms
+        is shared by the terms in proportion to their own time. The records are kept in `records`, and saved to `filename`
+        at the end of the training
+
+    Args:
+        names (list): names of the loss terms
+        loss_functions (list): loss functions of the terms, the same as in `dde.Model.compile`
+        period (int): number of steps between two profiles
+        num_repeats (int): number of the timed calls of each function, the median is used
+        filename (str): path of the .json file of the records, not saved if empty
+    """
+    def __init__(self, names, loss_functions, period=1000, num_repeats=5, filename=""):
+        super().__init__()
+        if backend_name != "tensorflow":
+            raise NotImplementedError(f"StepProfiler is not implemented for the backend {backend_name}")
+        self.names = names
+        self.loss_functions = dde.losses.get(loss_functions)
+        self.period = period
+        self.num_repeats = num_repeats
+        self.filename = filename
+
+        self.records = []
+        self.step_times = []
+        self.epoch_start = None
+        self._gradients = None
+
+    def on_epoch_begin(self):
+        self.epoch_start = time.perf_counter()
+
+    def on_epoch_end(self):
+        self.step_times.append(time.perf_counter() - self.epoch_start)
+        if len(self.step_times) >= self.period:
+            self.profile()
+
+    def on_train_end(self):
+        if self.filename:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+            with open(self.filename, "w") as f:
+                json.dump(self.records, f, indent=2)
+
+    def gradient_function(self, term=None):
+        """ compiled function of the gradient of the loss term `term`, or of all the terms if None
+        """
+        zero = lambda y_true, y_pred: tf.zeros((), dtype=y_pred.dtype)
+        loss_fn = [f if (term is None) or (i == term) else zero for i, f in enumerate(self.loss_functions)]
+
+        @tf.function
+        def gradient(inputs, targets, auxiliary_vars):
+            trainable_variables = self.model.net.trainable_variables + self.model.external_trainable_variables
+            with tf.GradientTape() as tape:
+                self.model.net.auxiliary_vars = auxiliary_vars
+                outputs = self.model.net(inputs, training=True)
+                losses = self.model.data.losses_train(targets, outputs, loss_fn, inputs, self.model)
+                loss = tf.math.reduce_sum(tf.convert_to_tensor(losses))
+            return tape.gradient(loss, trainable_variables, unconnected_gradients="zero")
+        return gradient
+
+    def profile(self):
+        """ time the loss terms and the training step on the current training points, and add a record of the shares
+        """
+        if self._gradients is None:
+            self._gradients = [self.gradient_function(i) for i in range(len(self.names))] + [self.gradient_function()]
+
+        state = self.model.train_state
+        args = (state.X_train, state.y_train, state.train_aux_vars)
+        times = [self._time(f, args) for f in self._gradients]
+        # the training step changes the variables, which are restored afterwards
+        opt = self.model.opt_name
+        variables = self.model.net.variables + self.model.external_trainable_variables + list(getattr(opt, "variables", []))
+        values = [v.numpy() for v in variables]
+        step_time = self._time(self.model._train_step, args)
+        for v, value in zip(variables, values):
+            v.assign(value)
+
+        loop_time = float(np.median(self.step_times))
+        loss_time = times[-1]
+        optimizer_time = max(step_time - loss_time, 0.0)
+        other_time = max(loop_time - step_time, 0.0)
+        total = loss_time + optimizer_time + other_time
+        terms = dict(zip(self.names, times[:-1]))
+        shares = {k: t / sum(terms.values()) * loss_time / total for k, t in terms.items()}
+        shares["optimizer"] = optimizer_time / total
+        shares["other"] = other_time / total
+        self.records.append({"step": int(state.step), "loop_time": loop_time, "step_time": step_time, "loss_time": loss_time,
+                             "optimizer_time": optimizer_time, "terms": terms, "shares": shares})
+        self.step_times = []
+
+    def _time(self, f, args):
+        """ median time of `num_repeats` calls of f, after a call for tracing
+        """
+        f(*args)
+        t = []
+        for _ in range(self.num_repeats):
+            start = time.perf_counter()
+            f(*args)
+            t.append(time.perf_counter() - start)
+        return float(np.median(t))
+
+
+class TraceWindow(dde.callbacks.Callback):
+    """ capture a TensorFlow profiler trace of the steps in [start, stop), to be viewed in TensorBoard
+
+    Args:
+        logdir (str): folder of the trace
+        start (int): the first step of the trace
+        stop (int): the trace ends before this step
+    """
+    def __init__(self, logdir, start, stop):
+        super().__init__()
+        if backend_name != "tensorflow":
+            raise NotImplementedError(f"TraceWindow is not implemented for the backend {backend_name}")
+        self.logdir = logdir
+        self.start = start
+        self.stop = stop
+        self.tracing = False
+
+    def on_epoch_begin(self):
+        # the step counter is incremented at the end of each step
+        step = self.model.train_state.step
+        if (not self.tracing) and (self.start <= step < self.stop):
+            tf.profiler.experimental.start(self.logdir)
+            self.tracing = True
+
+    def on_epoch_end(self):
+        if self.tracing and (self.model.train_state.step >= self.stop):
+            self.end()
+
+    def on_train_end(self):
+        if self.tracing:
+            self.end()
+
+    def end(self):
+        """ stop the trace, and write it to `logdir`
+        """
+        tf.profiler.experimental.stop()
+        self.tracing = False
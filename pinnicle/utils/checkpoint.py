@@ -0,0 +1,111 @@
+import json
+import os
+import queue
+import threading
+import numpy as np
+
+
+def list_checkpoints(path, filename="checkpoints.json"):
+    """ load the index of the checkpoints in the folder `path`
+
+    Returns:
+        dict with "checkpoints": list of {"step", "loss", "file"} sorted by step, and "best": the step of the best checkpoint
+    """
+    index_file = os.path.join(path, filename)
+    if not os.path.isfile(index_file):
+        return {"checkpoints": [], "best": None}
+    with open(index_file, "r") as fp:
+        return json.load(fp)
+
+
+def load_checkpoint_file(filename):
+    """ load the arrays and the metadata of one checkpoint
+    """
+    with np.load(filename, allow_pickle=False) as data:
+        arrays = {k: data[k] for k in data.files if k != "meta"}
+        meta = json.loads(str(data["meta"]))
+    return arrays, meta
+
+
+class CheckpointWriter:
+    """ write checkpoints in a background thread, keep the last `keep_last` checkpoints, and the best one if `keep_best`.
+        The checkpoints are saved as `ckpt-{step}.npz` in `path`, with an index file `checkpoints.json`
+
+    Args:
+        path (str): folder of the checkpoints
+        keep_last (int): number of the latest checkpoints to keep, None to keep all
+        keep_best (bool): keep the checkpoint with the lowest loss
+    """
+    def __init__(self, path, keep_last=3, keep_best=True):
+        self.path = path
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.index = list_checkpoints(path)
+        self.error = None
+
+        self._queue = queue.Queue()
+        self._thread = None
+        # `write` can also be called directly, while the writer thread is running
+        self._lock = threading.Lock()
+
+    def submit(self, step, loss, arrays, meta):
+        """ queue one checkpoint, the arrays should not be modified afterwards
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._queue.put((int(step), float(loss), arrays, meta))
+
+    def flush(self):
+        """ wait until all the queued checkpoints are written, and raise the error from the writer thread if any
+        """
+        self._queue.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _run(self):
+        while True:
+            step, loss, arrays, meta = self._queue.get()
+            try:
+                self.write(step, loss, arrays, meta)
+            except Exception as e:
+                self.error = e
+            finally:
+                self._queue.task_done()
+
+    def write(self, step, loss, arrays, meta):
+        """ write one checkpoint, then apply the retention rules and update the index
+        """
+        with self._lock:
+            self._write(step, loss, arrays, meta)
+
+    def _write(self, step, loss, arrays, meta):
+        os.makedirs(self.path, exist_ok=True)
+        filename = f"ckpt-{step}.npz"
+        # write to a temporary file first, so that an interrupted write does not leave a broken checkpoint
+        tmp = os.path.join(self.path, f".{filename}.tmp")
+        with open(tmp, "wb") as fp:
+            np.savez(fp, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, os.path.join(self.path, filename))
+
+        records = [r for r in self.index["checkpoints"] if r["step"] != step]
+        records.append({"step": step, "loss": loss, "file": filename})
+        records.sort(key=lambda r: r["step"])
+        best = min(records, key=lambda r: r["loss"] if np.isfinite(r["loss"]) else np.inf)
+
+        # retention
+        keep = records if self.keep_last is None else records[-self.keep_last:]
+        if self.keep_best and best not in keep:
+            keep = [best] + keep
+        for r in records:
+            if r not in keep:
+                f = os.path.join(self.path, r["file"])
+                if os.path.isfile(f):
+                    os.remove(f)
+
+        self.index = {"checkpoints": keep, "best": best["step"] if best in keep else None}
+        tmp = os.path.join(self.path, ".checkpoints.json.tmp")
+        with open(tmp, "w") as fp:
+            json.dump(self.index, fp)
+        os.replace(tmp, os.path.join(self.path, "checkpoints.json"))
@@ -1,9 +1,11 @@
 import json
 import os
+import h5py
 import mat73
 import scipy.io
 from sklearn.neighbors import KDTree
 import numpy as np
+from deepxde.backend import backend_name, tf
 
 
 def is_file_ext(path, ext):
@@ -46,6 +48,53 @@ def load_dict_from_json(path, filename):
         data = {}
     return data
 
+def set_threads(num_intra_op_threads=0, num_inter_op_threads=0, cpu_affinity=[]):
+    """ set the number of threads of the backend and the cpus of this process. The threads of tensorflow can only be
+        changed before its runtime is initialized, i.e. before the first op is run, otherwise they are kept unchanged
+
+    Args:
+        num_intra_op_threads (Integer): number of threads used inside one op, 0 for the default of the backend
+        num_inter_op_threads (Integer): number of threads to run independent ops, 0 for the default of the backend
+        cpu_affinity (list): the cpus this process is pinned to, empty for no change
+    Returns:
+        True if all the settings are applied
+    """
+    if cpu_affinity:
+        os.sched_setaffinity(0, cpu_affinity)
+    applied = True
+    if backend_name == "tensorflow":
+        threading = tf.config.threading
+        for n, get, put in [(num_intra_op_threads, threading.get_intra_op_parallelism_threads, threading.set_intra_op_parallelism_threads),
+                            (num_inter_op_threads, threading.get_inter_op_parallelism_threads, threading.set_inter_op_parallelism_threads)]:
+            if n and (n != get()):
+                try:
+                    put(n)
+                except RuntimeError:
+                    applied = False
+    elif backend_name == "pytorch":
+        import torch
+        if num_intra_op_threads:
+            torch.set_num_threads(num_intra_op_threads)
+        if num_inter_op_threads and (num_inter_op_threads != torch.get_num_interop_threads()):
+            try:
+                torch.set_num_interop_threads(num_inter_op_threads)
+            except RuntimeError:
+                applied = False
+    if not applied:
+        print(f"threads of {backend_name} can not be changed after the runtime is initialized, "
+              f"keep intra_op={get_threads()[0]}, inter_op={get_threads()[1]}")
+    return applied
+
+def get_threads():
+    """ the number of intra-op and inter-op threads of the backend, 0 for the default of the backend
+    """
+    if backend_name == "tensorflow":
+        return tf.config.threading.get_intra_op_parallelism_threads(), tf.config.threading.get_inter_op_parallelism_threads()
+    elif backend_name == "pytorch":
+        import torch
+        return torch.get_num_threads(), torch.get_num_interop_threads()
+    return 0, 0
+
 def load_mat(file):
     """ load .mat file, if the file is in MATLAB 7.3 format use mat73.loadmat, otherwise use scipy.io.loadmat()
     """
@@ -55,6 +104,34 @@ def load_mat(file):
         data = scipy.io.loadmat(file)
     return data
 
+def load_mat_fields(file, paths):
+    """ load only the variables in `paths` from a .mat file, if the file is in MATLAB 7.3 format, only these datasets
+        are read from the HDF5 file, otherwise the whole file is loaded by scipy.io.loadmat()
+
+    Args:
+        file (str): path of the .mat file
+        paths (list): paths of the variables, with "/" between the names of the structs, e.g. "md/mesh/x"
+    Returns:
+        dict: {path: value} of the paths found in the file
+    """
+    try:
+        with h5py.File(file, "r") as f:
+            paths = [p for p in paths if p in f]
+        data = mat73.loadmat(file, only_include=paths) if paths else {}
+    except OSError:
+        data = scipy.io.loadmat(file)
+
+    fields = {}
+    for p in paths:
+        value = data
+        for k in p.split("/"):
+            if not isinstance(value, dict) or k not in value:
+                break
+            value = value[k]
+        else:
+            fields[p] = value
+    return fields
+
 def down_sample_core(points, resolution=100):
     """ downsample the given scatter points using `KDtree` with the nearest neighbors on a Cartisian grid
 
@@ -75,30 +152,78 @@ def down_sample_core(points, resolution=100):
     ind = np.unique(ink)
     return ind
 
-def down_sample(points, data_size):
-    """ downsample points to be a size of `data_size`, the strategy is to call `down_sample_core` with at least double resolution required, then randomly choose
+def grid_sample_core(points, resolution=100):
+    """ downsample the given scatter points on a Cartisian grid, each point is binned to its nearest grid node,
+        and the point nearest to the node is kept in each occupied cell. It is O(N) without a spatial index, O(N log N)
+        if the grid is much finer than the points, and gives a similar selection as `down_sample_core`, without the extra
+        points from the empty cells
 
     Args:
         points (np array), 2d coordinates, from get_ice_coordinates
-        data_size (Integer): number of data points needed
+        resolution (Integer): resolution of the downsample grid
     Returns:
         ind: indices of the downsample
     """
+    lower = points.min(axis=0)
+    spacing = (points.max(axis=0) - lower) / (resolution - 1)
+    spacing[spacing == 0] = 1
+    scaled = (points - lower) / spacing
+    nodes = np.rint(scaled)
+    cells = nodes[:,0].astype(np.int64) * resolution + nodes[:,1].astype(np.int64)
+    dist = np.sum((scaled - nodes)**2, axis=1)
+
+    if resolution**2 <= 4*points.shape[0]:
+        # O(N) with the minimum distance in each cell, then the first point of the ties
+        best = np.full(resolution**2, np.inf)
+        np.minimum.at(best, cells, dist)
+        ind = np.flatnonzero(dist == best[cells])
+        _, first = np.unique(cells[ind], return_index=True)
+        return np.sort(ind[first])
+
+    # sort by the cells, then by the distance to the node, keep the first point in each cell
+    order = np.lexsort((dist, cells))
+    first = np.ones(order.shape[0], dtype=bool)
+    first[1:] = cells[order[1:]] != cells[order[:-1]]
+    return np.sort(order[first])
+
+def down_sample(points, data_size):
+    """ downsample points to be a size of `data_size`, the strategy is to call `grid_sample_core` with at least double resolution required,
+        then randomly choose. If `data_size` is a dict, all the sizes are chosen from the same downsample, for the largest size
+
+    Args:
+        points (np array), 2d coordinates, from get_ice_coordinates
+        data_size (Integer or dict): number of data points needed, or a dict of them, e.g. for each variable
+    Returns:
+        ind: indices of the downsample, or a dict of them with the same keys as `data_size`
+    """
+    if isinstance(data_size, dict):
+        ind = _grid_down_sample(points, max(data_size.values(), default=0))
+        return {k: _random_choice(ind, data_size[k]) for k in data_size}
+    return _random_choice(_grid_down_sample(points, data_size), data_size)
+
+def _grid_down_sample(points, data_size):
+    """ `grid_sample_core` with the resolution doubled until there are at least `data_size` points
+    """
+    # no points needed
+    if data_size <= 0:
+        return np.arange(0)
     # if data_size is larger than the number of points, use all points
-    data_size = min(points.shape[0], data_size)
+    if data_size >= points.shape[0]:
+        return np.arange(points.shape[0])
 
-    # start with double resolution
+    # start with double resolution, the limit keeps the indices of the cells in int64
     resolution = 2*int(np.ceil(data_size**0.5))
-    ind = down_sample_core(points, resolution=resolution)
-    
-    while (resolution**2 < points.shape[0]) and (ind.shape[0]< data_size):
+    ind = grid_sample_core(points, resolution=resolution)
+    while (ind.shape[0] < data_size) and (resolution < 2**20):
         resolution *= 2
-        ind = down_sample_core(points, resolution=resolution)
+        ind = grid_sample_core(points, resolution=resolution)
+    return ind
 
-    if ind.shape[0] < data_size:
+def _random_choice(ind, data_size):
+    """ randomly choose `data_size` of `ind`, or all of them if not enough
+    """
+    if ind.shape[0] <= data_size:
         # not enough data, then just return all available data
         return ind
-    else:
-        # randomly choose 
-        idx = np.random.choice(ind, data_size, replace=False)
-        return idx
+    # randomly choose
+    return np.random.choice(ind, data_size, replace=False)
@@ -1,4 +1,6 @@
+import json
 import math
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 from deepxde.model import LossHistory
@@ -7,16 +9,25 @@ from . import save_dict_to_json, load_dict_from_json
 
 class History:
     """ class of the training history, based on deepxde LossHistory
-        only need steps and loss_train
+        only need steps and loss_train, and the loss weights if they are updated during the training
     """
-    def __init__(self, loss_history, names):
+    def __init__(self, loss_history=None, names=[], loss_weights=None):
         super().__init__()
-        self._loss_train = np.array(loss_history.loss_train)
+        # an empty history, e.g. to `load` from the files
+        if loss_history is None:
+            loss_history = LossHistory()
+        steps = np.array(loss_history.steps)
+        # each call of deepxde train records its first step again, only keep the last record of each step
+        keep = np.append(steps[1:] != steps[:-1], True) if len(steps) else np.array([], dtype=bool)
+        self._loss_train = np.array(loss_history.loss_train)[keep]
         self._names = names
         
         # put history of each term is a dict
         self.history = {k:list(self._loss_train[:,i]) for i,k in enumerate(names)}
-        self.history["steps"] = loss_history.steps
+        self.history["steps"] = [int(s) for s in steps[keep]]
+        # the loss weights with their own "steps"
+        if loss_weights:
+            self.history["loss_weights"] = loss_weights
 
     def save(self, path, filename="history.json"):
         """ save training history 
@@ -24,15 +35,19 @@ class History:
         save_dict_to_json(self.history, path, filename)
         
     def load(self, path, filename="history.json"):
-        """ load training history from folder or path
+        """ load training history from folder or path, a .jsonl file is the stream of `MetricsLogger`,
+            which can be read while the training is still running
         """
-        self.history = load_dict_from_json(path, filename)
+        if filename.endswith(".jsonl"):
+            self.history = load_metrics_stream(os.path.join(path, filename))
+        else:
+            self.history = load_dict_from_json(path, filename)
 
     def plot(self, path, figname="history.png", cols=4):
         """ plot the history 
         """
-        # subtract "step"
-        loss_keys = [k for k in self.history.keys() if k != "steps"]
+        # subtract "step", "loss_weights" and "metrics"
+        loss_keys = [k for k in self.history.keys() if k not in ["steps", "loss_weights", "metrics"]]
         n = len(loss_keys)   
 
         fig, axs = plt.subplots(math.ceil(n/cols), cols, figsize=(16,12))
@@ -45,3 +60,25 @@ class History:
         # if figname is set to nothing, then don't save the figure
         if figname != "":
             plt.savefig(path+figname)
+
+
+def load_metrics_stream(filename):
+    """ read the records of `MetricsLogger` to a history dict, the losses and "steps" as in `History`,
+        the time, learning rate and throughput in "metrics". A step recorded again, e.g. after resuming from
+        a checkpoint, keeps its last record, and an incomplete last line, still being written, is skipped
+    """
+    records = {}
+    if os.path.isfile(filename):
+        with open(filename, "r") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                r = json.loads(line)
+                records[r["step"]] = r
+    steps = sorted(records)
+    metrics = ["time", "learning_rate", "points_per_s"]
+    names = [k for k in records[steps[0]] if k not in ["step"] + metrics] if steps else []
+    history = {k: [records[s].get(k) for s in steps] for k in names}
+    history["steps"] = steps
+    history["metrics"] = {k: [records[s].get(k) for s in steps] for k in metrics}
+    return history
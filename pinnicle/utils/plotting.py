@@ -42,7 +42,7 @@ def plot_solutions(pinn, path="", X_ref=None, sol_ref=None, cols=None, resolutio
                          ((pinn.params.nn.input_ub[1] - pinn.params.nn.input_lb[1])/resolution)**2)**0.5
 
         # predicted solutions
-        sol_pred = pinn.model.predict(X_nn)
+        sol_pred = pinn.predict(X_nn)
         plot_data = {k+"_pred":np.reshape(sol_pred[:,i:i+1], X.shape) for i,k in enumerate(pinn.params.nn.output_variables)}
         vranges = {k+"_pred":[pinn.params.nn.output_lb[i], pinn.params.nn.output_ub[i]] for i,k in enumerate(pinn.params.nn.output_variables)}
         # take abs
@@ -134,7 +134,7 @@ def plot_nn(pinn, data_names=None, X_mask=None, axs=None, vranges={}, resolution
     dist = dist.reshape(X.shape)
 
     # get the predictions
-    sol_pred = pinn.model.predict(X_nn)
+    sol_pred = pinn.predict(X_nn)
     im_data = {k: np.reshape(sol_pred[:,i:i+1], X.shape) 
                for i,k in enumerate(nn_params.output_variables) if k in data_names}
     if not vranges:
@@ -225,7 +225,7 @@ def plot_data(X, Y, im_data, axs=None, vranges={}, **kwargs):
     
     return axs
 
-def triplot_solutions(pinn, feature, feat_title=none, cmap='jet', scale=1, figsize=(5, 4), colorbar_bins=10, mdata='issm'):
+def triplot_solutions(pinn, feature, feat_title=None, cmap='jet', scale=1, figsize=(5, 4), colorbar_bins=10, mdata='issm'):
     """ plotting reference solutions with given triangulation
         default triangulation from issm
     """
@@ -331,7 +331,7 @@ def triplot_pred(pinn, feature, feat_title=None, cmap='jet', scale=1, figsize=(5
     meshy = np.squeeze(xref[:, 1])
 
     # predictions
-    pred = pinn.model.predict(xref)
+    pred = pinn.predict(xref)
 
     # triangles / elements
     if pinn.model_data.data[mdata].mesh_dict == {}:
@@ -453,7 +453,7 @@ def plot_similarity(pinn, feature_name, feat_title=None, sim='MAE', cmap='jet',
     meshy = np.squeeze(xref[:, 1])
 
     # predictions
-    pred = pinn.model.predict(xref)
+    pred = pinn.predict(xref)
 
     # reference solution
     X_sol = pinn.model_data.data['ISSM'].data_dict
@@ -528,8 +528,8 @@ def plot_similarity(pinn, feature_name, feat_title=None, sim='MAE', cmap='jet',
     # save figure to path as defined
     return fig, axs
 
-def plot_residuals(pinn, cmap='RdBu', cbar_bins=10, cbar_limits=[-5e3, 5e3]):
-    """plotting the pde residuals
+def plot_residuals(pinn, cmap='RdBu', cbar_bins=10, cbar_limits=[-5e3, 5e3], chunk_size=None):
+    """plotting the pde residuals, `chunk_size` is passed to `pinn.evaluate_residuals`
     """
     input_names = pinn.nn.parameters.input_variables
     output_names = pinn.nn.parameters.output_variables
@@ -545,42 +545,33 @@ def plot_residuals(pinn, cmap='RdBu', cbar_bins=10, cbar_limits=[-5e3, 5e3]):
     Nr = len(pinn.physics.residuals)
     fig, axs = plt.subplots(1, len(pinn.physics.residuals), figsize=(5*Nr, 4))
     levels = np.linspace(cbar_limits[0], cbar_limits[-1], 500)
-    # counting the pde residuals
-    pde_dict = {} # counting the number of residuals per pde
-    for i in pinn.params.physics.equations.keys():
-        pde_dict[i] = 0
+    # all the residuals in one pass
+    residuals = pinn.evaluate_residuals(xref, chunk_size=chunk_size)
 
     for r in range(Nr):
-        # looping through the equation keys
-        for p in pinn.params.physics.equations.keys():
-            # check if the equation key is in the residual name
-            if p in pinn.physics.residuals[r]:
-                pde_dict[p] += 1
-                pde_pred = pinn.model.predict(xref, operator=pinn.physics.operator(p))
-                op_pred = pde_pred[pde_dict[p]-1] # operator predicton
-
-                if Nr <= 1:
-                    axes = axs.tricontourf(meshx, meshy, np.squeeze(op_pred), levels=levels, cmap=cmap, norm=colors.CenteredNorm())
-                    cb = plt.colorbar(axes, ax=axs)
-                    cb.ax.tick_params(labelsize=14)
-                    # adjusting the number of ticks
-                    colorbar_bins = ticker.MaxNLocator(nbins=cbar_bins)
-                    cb.locator = colorbar_bins
-                    cb.update_ticks()
-                    # setting the title
-                    axs.set_title(str(pinn.physics.residuals[r]), fontsize=14)
-                    axs.axis('off')
-                else:
-                    axes = axs[r].tricontourf(meshx, meshy, np.squeeze(op_pred), levels=levels, cmap=cmap, norm=colors.CenteredNorm())
-                    cb = plt.colorbar(axes, ax=axs[r])
-                    cb.ax.tick_params(labelsize=14)
-                    # adjusting the number of ticks
-                    colorbar_bins = ticker.MaxNLocator(nbins=cbar_bins)
-                    cb.locator = colorbar_bins
-                    cb.update_ticks()
-                    # title
-                    axs[r].set_title(str(pinn.physics.residuals[r]), fontsize=14)
-                    axs[r].axis('off')
+        op_pred = residuals[pinn.physics.residuals[r]] # operator predicton
+        if Nr <= 1:
+            axes = axs.tricontourf(meshx, meshy, np.squeeze(op_pred), levels=levels, cmap=cmap, norm=colors.CenteredNorm())
+            cb = plt.colorbar(axes, ax=axs)
+            cb.ax.tick_params(labelsize=14)
+            # adjusting the number of ticks
+            colorbar_bins = ticker.MaxNLocator(nbins=cbar_bins)
+            cb.locator = colorbar_bins
+            cb.update_ticks()
+            # setting the title
+            axs.set_title(str(pinn.physics.residuals[r]), fontsize=14)
+            axs.axis('off')
+        else:
+            axes = axs[r].tricontourf(meshx, meshy, np.squeeze(op_pred), levels=levels, cmap=cmap, norm=colors.CenteredNorm())
+            cb = plt.colorbar(axes, ax=axs[r])
+            cb.ax.tick_params(labelsize=14)
+            # adjusting the number of ticks
+            colorbar_bins = ticker.MaxNLocator(nbins=cbar_bins)
+            cb.locator = colorbar_bins
+            cb.update_ticks()
+            # title
+            axs[r].set_title(str(pinn.physics.residuals[r]), fontsize=14)
+            axs[r].axis('off')
 
     return fig, axs
 
@@ -609,7 +600,7 @@ def tripcolor_similarity(pinn, feature_name, feat_title=None, sim='MAE', cmap='j
     meshy = np.squeeze(xref[:, 1])
 
     # predictions
-    pred = pinn.model.predict(xref)
+    pred = pinn.predict(xref)
 
     # reference solution
     X_sol = pinn.model_data.data['ISSM'].data_dict
@@ -686,8 +677,8 @@ def tripcolor_similarity(pinn, feature_name, feat_title=None, sim='MAE', cmap='j
 
     return fig, axs
 
-def tripcolor_residuals(pinn, cmap='RdBu', colorbar_bins=10, cbar_limits=[-5e3, 5e3]):
-    """plot pde residuals with ISSM triangulation
+def tripcolor_residuals(pinn, cmap='RdBu', colorbar_bins=10, cbar_limits=[-5e3, 5e3], chunk_size=None):
+    """plot pde residuals with ISSM triangulation, `chunk_size` is passed to `pinn.evaluate_residuals`
     """
     input_names = pinn.nn.parameters.input_variables
     output_names = pinn.nn.parameters.output_variables
@@ -707,40 +698,33 @@ def tripcolor_residuals(pinn, cmap='RdBu', colorbar_bins=10, cbar_limits=[-5e3,
     Nr = len(pinn.physics.residuals)
     fig, axs = plt.subplots(1, len(pinn.physics.residuals), figsize=(5*Nr, 4))
 
-    pde_dict = {} # counting the number of residuals per pde
-    for i in pinn.params.physics.equations.keys():
-        pde_dict[i] = 0
+    # all the residuals in one pass
+    residuals = pinn.evaluate_residuals(xref, chunk_size=chunk_size)
 
     for r in range(Nr):
-        # looping through the equations keys
-        for p in pinn.params.physics.equations.keys():
-            if p in pinn.physics.residuals[r]:
-                pde_dict[p] += 1
-                pde_pred = pinn.model.predict(xref, operator=pinn.physics.operator(p))
-
-                op_pred = pde_pred[pde_dict[p]-1]
-                if Nr <= 1:
-                    axes = axs.tripcolor(triangles, np.squeeze(op_pred), cmap=cmap, norm=colors.CenteredNorm(clip=[cbar_limits[0], cbar_limits[-1]]))
-                    cb = plt.colorbar(axes, ax=axs)
-                    cb.ax.tick_params(labelsize=14)
-                    # adjusting the number of ticks
-                    num_bins = ticker.MaxNLocator(nbins=colorbar_bins)
-                    cb.locator = num_bins
-                    cb.update_ticks()
-                    # setting the title
-                    axs.set_title(str(pinn.physics.residuals[r]), fontsize=14)
-                    axs.axis('off')
-                else:
-                    axes = axs[r].tripcolor(triangles, np.squeeze(op_pred), cmap=cmap, norm=colors.CenteredNorm(clip=[cbar_limits[0], cbar_limits[-1]]))
-                    cb = plt.colorbar(axes, ax=axs[r])
-                    cb.ax.tick_params(labelsize=14)
-                    # adjusting the number of ticks
-                    num_bins = ticker.MaxNLocator(nbins=colorbar_bins)
-                    cb.locator = num_bins
-                    cb.update_ticks()
-                    # title
-                    axs[r].set_title(str(pinn.physics.residuals[r]), fontsize=14)
-                    axs[r].axis('off')
+        op_pred = residuals[pinn.physics.residuals[r]] # operator predicton
+        if Nr <= 1:
+            axes = axs.tripcolor(triangles, np.squeeze(op_pred), cmap=cmap, norm=colors.CenteredNorm(clip=[cbar_limits[0], cbar_limits[-1]]))
+            cb = plt.colorbar(axes, ax=axs)
+            cb.ax.tick_params(labelsize=14)
+            # adjusting the number of ticks
+            num_bins = ticker.MaxNLocator(nbins=colorbar_bins)
+            cb.locator = num_bins
+            cb.update_ticks()
+            # setting the title
+            axs.set_title(str(pinn.physics.residuals[r]), fontsize=14)
+            axs.axis('off')
+        else:
+            axes = axs[r].tripcolor(triangles, np.squeeze(op_pred), cmap=cmap, norm=colors.CenteredNorm(clip=[cbar_limits[0], cbar_limits[-1]]))
+            cb = plt.colorbar(axes, ax=axs[r])
+            cb.ax.tick_params(labelsize=14)
+            # adjusting the number of ticks
+            num_bins = ticker.MaxNLocator(nbins=colorbar_bins)
+            cb.locator = num_bins
+            cb.update_ticks()
+            # title
+            axs[r].set_title(str(pinn.physics.residuals[r]), fontsize=14)
+            axs[r].axis('off')
 
     return fig, axs
 
@@ -0,0 +1,60 @@
+import math
+from deepxde.backend import tf
+
+
+class LearningRateSchedule(tf.keras.optimizers.schedules.LearningRateSchedule):
+    """ learning rate schedule with an optional linear warmup
+
+    Args:
+        learning_rate (float): initial learning rate, reached at the end of the warmup
+        name (str): "constant", "exponential", "step", "cosine" or "inverse time"
+            - exponential: learning_rate * decay_rate^(t/decay_steps)
+            - step: learning_rate * decay_rate^floor(t/decay_steps)
+            - cosine: from learning_rate to alpha*learning_rate in decay_steps, then constant
+            - inverse time: learning_rate / (1 + decay_rate*t/decay_steps)
+        decay_steps (int): number of steps of the decay
+        decay_rate (float): decay rate of "exponential", "step" and "inverse time"
+        alpha (float): the final learning rate of "cosine", as a fraction of learning_rate
+        warmup_steps (int): number of steps to increase the learning rate linearly from 0,
+            the decay starts after the warmup, t = step - warmup_steps
+        initial_step (int): added to the step counter of the optimizer, so that a new optimizer
+            continues the schedule of a resumed training
+    """
+    def __init__(self, learning_rate, name="constant", decay_steps=1000, decay_rate=0.5, alpha=0.0, warmup_steps=0, initial_step=0):
+        super().__init__()
+        if name not in ["constant", "exponential", "step", "cosine", "inverse time"]:
+            raise ValueError(f"Unknown learning rate schedule {name}")
+        self.learning_rate = learning_rate
+        self.name = name
+        self.decay_steps = decay_steps
+        self.decay_rate = decay_rate
+        self.alpha = alpha
+        self.warmup_steps = warmup_steps
+        self.initial_step = initial_step
+
+    def __call__(self, step):
+        lr = tf.constant(self.learning_rate, dtype=tf.float32)
+        step = tf.cast(step, tf.float32) + float(self.initial_step)
+        t = tf.maximum(step - float(self.warmup_steps), 0.0)
+        p = t / float(self.decay_steps)
+
+        if self.name == "exponential":
+            decayed = lr * tf.pow(float(self.decay_rate), p)
+        elif self.name == "step":
+            decayed = lr * tf.pow(float(self.decay_rate), tf.floor(p))
+        elif self.name == "cosine":
+            cosine = 0.5 * (1.0 + tf.cos(math.pi * tf.minimum(p, 1.0)))
+            decayed = lr * ((1.0 - self.alpha) * cosine + self.alpha)
+        elif self.name == "inverse time":
+            decayed = lr / (1.0 + self.decay_rate * p)
+        else:
+            decayed = lr
+
+        if self.warmup_steps > 0:
+            return tf.where(step < self.warmup_steps, lr * (step + 1.0) / float(self.warmup_steps), decayed)
+        return decayed
+
+    def get_config(self):
+        return {"learning_rate": self.learning_rate, "name": self.name, "decay_steps": self.decay_steps,
+                "decay_rate": self.decay_rate, "alpha": self.alpha, "warmup_steps": self.warmup_steps,
+                "initial_step": self.initial_step}
@@ -0,0 +1,54 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def share_arrays(arrays):
+    """ copy the NumPy arrays in a nested dict to shared memory blocks
+
+    Args:
+        arrays (dict): nested dict, the leaves are NumPy arrays
+    Returns:
+        blocks (list): the `SharedMemory` blocks, the caller needs to close and unlink them when all the workers are done
+        descriptors (dict): same structure as `arrays`, pass to `attach_arrays` in the other processes
+    """
+    blocks = []
+
+    def _share(a):
+        if isinstance(a, dict):
+            return {k: _share(v) for k, v in a.items()}
+        a = np.asarray(a)
+        # empty arrays and objects can not be put in shared memory, they are sent as they are
+        if a.nbytes == 0 or a.dtype.hasobject:
+            return a
+        shm = shared_memory.SharedMemory(create=True, size=a.nbytes)
+        np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+        blocks.append(shm)
+        return ("shared_memory", shm.name, a.shape, a.dtype.str)
+
+    return blocks, _share(arrays)
+
+
+def attach_arrays(descriptors):
+    """ read-only NumPy views of the arrays shared by `share_arrays`, in a child process of the one which created the blocks
+
+    Returns:
+        blocks (list): the `SharedMemory` blocks, keep them alive as long as the arrays are used
+        arrays (dict): same structure as the arrays given to `share_arrays`
+    """
+    blocks = []
+
+    def _attach(d):
+        if isinstance(d, dict):
+            return {k: _attach(v) for k, v in d.items()}
+        if not (isinstance(d, tuple) and d and d[0] == "shared_memory"):
+            return d
+        _, name, shape, dtype = d
+        # the child processes started by `multiprocessing` share the resource tracker of the parent,
+        # so the blocks are only removed when the parent unlinks them
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        a = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        a.flags.writeable = False
+        return a
+
+    return blocks, _attach(descriptors)
@@ -0,0 +1,164 @@
+import os
+import time
+import h5py
+import numpy as np
+
+
+def synthetic_glacier(num_vertices=10000, length=50.0e3, width=20.0e3, front_width=12.0e3, max_velocity=2000.0,
+        thickness=1000.0, surface=1200.0, noise=0.0, jitter=0.0, friction_law="weertman", seed=None):
+    """ an ISSM `md`-like nested dict of a synthetic outlet glacier, flowing in x on a trapezoid, which narrows from
+        `width` at x=0 to `front_width` at the calving front x=`length`. The mesh is a structured triangular mesh,
+        the fields follow the units of ISSM, i.e. velocities in m/yr
+
+    Args:
+        num_vertices (Integer): approximate number of vertices
+        length, width, front_width (float): size of the glacier in m
+        max_velocity (float): velocity at the center of the front in m/yr
+        thickness (float): ice thickness at the inflow in m, 40% at the front
+        surface (float): surface elevation at the inflow in m
+        noise (float): standard deviation of the noise in the observed velocities, relative to `max_velocity`
+        jitter (float): random displacement of the interior vertices, relative to the mesh spacing
+        friction_law (str): "weertman" for `friction.C`, "budd" for `friction.coefficient`
+        seed (Integer): seed of the noise and the jitter
+    Returns:
+        dict: {"md": {...}} with the fields read by `ISSMmdData.load_data`
+        vertices: the outline of the domain, closed, as the vertices of the .exp file
+    """
+    rng = np.random.default_rng(seed)
+    yts = 3600.0*24*365
+    rho_ice, rho_water, g = 917.0, 1023.0, 9.81
+    # structured mesh in the coordinates (xi, eta) in [0, 1] x [-1, 1]
+    nx = max(2, int(round(np.sqrt(num_vertices * length / width))))
+    ny = max(2, int(round(num_vertices / nx)))
+    xi, eta = np.meshgrid(np.linspace(0, 1, nx), np.linspace(-1, 1, ny), indexing="ij")
+    if jitter > 0:
+        interior = (xi > 0) & (xi < 1) & (np.abs(eta) < 1)
+        xi = xi + interior * rng.uniform(-0.5, 0.5, xi.shape) * jitter / (nx - 1)
+        eta = eta + interior * rng.uniform(-1, 1, eta.shape) * jitter / (ny - 1)
+    xi, eta = xi.ravel(), eta.ravel()
+    x = xi * length
+    halfwidth = 0.5 * (width + (front_width - width) * xi)
+    y = 0.5 * width + eta * halfwidth
+    onboundary = (np.abs(eta) >= 1) | (xi <= 0) | (xi >= 1)
+
+    # two triangles in each cell, 1-based as in MATLAB
+    i, j = np.meshgrid(np.arange(nx-1), np.arange(ny-1), indexing="ij")
+    v00 = (i * ny + j).ravel()
+    v10, v01, v11 = v00 + ny, v00 + 1, v00 + ny + 1
+    elements = np.vstack([np.column_stack([v00, v10, v11]), np.column_stack([v00, v11, v01])]) + 1
+    edges = _mesh_edges(elements)
+
+    # fields: parabolic profile across the flow, accelerating to the front
+    shape = 1.0 - eta**2
+    vx = (0.05 + 0.95 * xi**2) * shape * max_velocity
+    vy = 0.025 * max_velocity * np.sin(np.pi * xi) * eta
+    H = thickness * (1.0 - 0.6 * xi) + 0.1 * thickness * shape
+    s = surface * np.sqrt(1.0 - 0.9 * xi) + 0.02 * surface * np.sin(np.pi * eta)
+    # floating at the front if the surface is low, the ocean is 100 m deeper than the base
+    floating = (s - H) < -rho_ice / rho_water * H
+    base = np.where(floating, -rho_ice / rho_water * H, s - H)
+    s = base + H
+    bed = np.where(floating, base - 100.0, base)
+    C = 1000.0 * (1.0 - 0.8 * xi) * (0.5 + 0.5 * shape)
+    smb = 1.0 - 2.0 * xi
+    vx_obs = vx + noise * max_velocity * rng.standard_normal(vx.shape)
+    vy_obs = vy + noise * max_velocity * rng.standard_normal(vy.shape)
+
+    if friction_law.lower() == "weertman":
+        friction = {"C": C, "m": 3.0}
+    elif friction_law.lower() == "budd":
+        N = rho_ice * g * H + rho_water * g * base
+        N[N <= 0] = 1
+        friction = {"coefficient": C / np.sqrt(N), "p": 1.0, "q": 1.0}
+    else:
+        raise ValueError(f"Friction law {friction_law} is not supported, use 'weertman' or 'budd'")
+
+    md = {"mesh": {"x": x, "y": y, "elements": elements.astype(float), "edges": edges.astype(float),
+                   "numberofvertices": float(x.size), "numberofelements": float(elements.shape[0]),
+                   "vertexonboundary": onboundary.astype(float),
+                   # a rough location in Greenland
+                   "lat": 66.0 + y / 111.0e3, "long": -38.0 + x / (111.0e3 * np.cos(np.deg2rad(66.0)))},
+          "inversion": {"vx_obs": vx_obs, "vy_obs": vy_obs, "vel_obs": np.sqrt(vx_obs**2 + vy_obs**2)},
+          "initialization": {"vx": vx, "vy": vy, "vel": np.sqrt(vx**2 + vy**2)},
+          "geometry": {"surface": s, "thickness": H, "base": base, "bed": bed},
+          "friction": friction,
+          "smb": {"mass_balance": smb},
+          "balancethickness": {"thickening_rate": np.zeros_like(x)},
+          "materials": {"rheology_B": 1.26802073401e+08 * np.ones_like(x), "rheology_n": 3.0,
+                        "rho_ice": rho_ice, "rho_water": rho_water},
+          "constants": {"g": g, "yts": yts},
+          "mask": {"ice_levelset": -np.ones_like(x), "ocean_levelset": np.where(floating, -1.0, 1.0)}}
+    vertices = [[0.0, 0.0], [length, 0.5 * (width - front_width)], [length, 0.5 * (width + front_width)], [0.0, width], [0.0, 0.0]]
+    return {"md": md}, vertices
+
+
+def write_exp(filename, vertices, name="domain"):
+    """ write the closed outline `vertices` to an ARGUS .exp file, the format of `Domain`
+    """
+    with open(filename, "w") as f:
+        f.write(f"## Name:{name}\n## Icon:0\n# Points Count Value\n{len(vertices)} 1.000000\n# X pos Y pos\n")
+        f.write("".join(f"{vx:.10f} {vy:.10f}\n" for vx, vy in vertices))
+        f.write("\n")
+
+
+def write_mat73(filename, data):
+    """ write a nested dict of arrays and scalars to a MATLAB v7.3 .mat file, i.e. HDF5 with the MATLAB annotations,
+        which can be read by `load_mat`. Dicts are structs, arrays are stored in the column-major order of MATLAB
+    """
+    with h5py.File(filename, "w", userblock_size=512) as f:
+        for k, v in data.items():
+            _write_mat73_item(f, k, v)
+    # the MATLAB header in the user block
+    header = f"MATLAB 7.3 MAT-file, Platform: GLNXA64, Created on: {time.strftime('%a %b %d %H:%M:%S %Y')} HDF5 schema 1.00 ."
+    with open(filename, "r+b") as fp:
+        fp.write(header.encode().ljust(116) + b"\x00"*8 + b"\x00\x02" + b"IM")
+
+
+def write_synthetic_issm(path, filename="synthetic", **kwargs):
+    """ write `synthetic_glacier` to `path`/`filename`.mat in MATLAB v7.3, and its outline to `path`/`filename`.exp
+
+    Args:
+        kwargs: the parameters of `synthetic_glacier`
+    Returns:
+        the paths of the .mat and the .exp files
+    """
+    os.makedirs(path, exist_ok=True)
+    data, vertices = synthetic_glacier(**kwargs)
+    matfile = os.path.join(path, filename + ".mat")
+    expfile = os.path.join(path, filename + ".exp")
+    write_mat73(matfile, data)
+    write_exp(expfile, vertices, name=filename)
+    return matfile, expfile
+
+
+def _mesh_edges(elements):
+    """ edges of a triangular mesh as in ISSM: [vertex1, vertex2, element1, element2], element2 is NaN on the boundary
+    """
+    ne = elements.shape[0]
+    pairs = np.sort(np.vstack([elements[:, [0, 1]], elements[:, [1, 2]], elements[:, [2, 0]]]), axis=1)
+    owner = np.tile(np.arange(1, ne+1), 3)
+    order = np.lexsort((owner, pairs[:, 1], pairs[:, 0]))
+    pairs, owner = pairs[order], owner[order]
+    first = np.ones(pairs.shape[0], dtype=bool)
+    first[1:] = np.any(pairs[1:] != pairs[:-1], axis=1)
+    start = np.flatnonzero(first)
+    # each interior edge appears twice
+    second = np.full(start.size, np.nan)
+    shared = np.append(start[1:] - start[:-1], pairs.shape[0] - start[-1]) == 2
+    second[shared] = owner[start[shared] + 1]
+    return np.column_stack([pairs[start], owner[start], second])
+
+
+def _write_mat73_item(group, name, value):
+    if isinstance(value, dict):
+        sub = group.create_group(name)
+        sub.attrs["MATLAB_class"] = np.bytes_("struct")
+        for k, v in value.items():
+            _write_mat73_item(sub, k, v)
+    else:
+        value = np.asarray(value, dtype=float)
+        # MATLAB arrays are at least 2d, n-vectors are n x 1, and stored transposed
+        if value.ndim < 2:
+            value = value.reshape(-1, 1)
+        dset = group.create_dataset(name, data=value.T)
+        dset.attrs["MATLAB_class"] = np.bytes_("double")
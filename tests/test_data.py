@@ -1,6 +1,9 @@
 import os
-from pinnicle.modeldata import ISSMmdData, MatData, Data
-from pinnicle.parameter import DataParameter, SingleDataParameter
+import numpy as np
+from pinnicle.modeldata import ISSMmdData, MatData, Data, DataCache
+from pinnicle.parameter import DataParameter, SingleDataParameter, DomainParameter
+from pinnicle.domain import Domain
+from pinnicle.utils import write_synthetic_issm
 
 def test_ISSMmdData():
     filename = "Helheim_fastflow.mat"
@@ -27,6 +30,41 @@ def test_ISSMmdData():
     icoord = data_loader.get_ice_coordinates()
     assert icoord.shape == (23049, 2)
 
+def test_synthetic_ISSMmdData(tmp_path):
+    matfile, expfile = write_synthetic_issm(str(tmp_path), num_vertices=1000, noise=0.01, jitter=0.3, seed=1)
+    hp = {}
+    hp["data_path"] = matfile
+    hp["data_size"] = {"u":500, "v":500, "s":500, "H":500, "C":None}
+    data_loader = ISSMmdData(SingleDataParameter(hp))
+    data_loader.load_data()
+    data_loader.prepare_training_data()
+    n = data_loader.X_dict['x'].shape[0]
+    assert abs(n - 1000) < 50
+    assert data_loader.sol['u'].shape == (500,1)
+    assert data_loader.X['C'].shape[0] == np.sum(data_loader.mask_dict['DBC_mask'] > 0)
+    # only the variables in data_size are read, the others when they are used
+    assert set(data_loader.data_dict.lazy_keys) == {'a', 'B', 'vel'}
+    assert data_loader.data_dict['B'].shape == (n,)
+    data_loader.prepare_training_data(data_size={"a":100})
+    assert data_loader.data_dict.lazy_keys == ['vel']
+    assert data_loader.sol['a'].shape == (100,1)
+    # all the variables in the file are listed
+    assert set(data_loader.data_dict) == {'u', 'v', 's', 'a', 'H', 'C', 'B', 'vel'}
+    assert data_loader.data_dict.lazy_keys == []
+    # V - E + F = 1 of a planar triangulation
+    assert n - data_loader.mesh_dict['edges'].shape[0] + data_loader.mesh_dict['elements'].shape[0] == 1
+    domain = Domain(DomainParameter({"shapefile": expfile}))
+    assert len(domain.vertices) == 4
+    X = np.hstack([data_loader.X_dict['x'][:,None], data_loader.X_dict['y'][:,None]])
+    interior = data_loader.mask_dict['DBC_mask'] == 0
+    assert np.all(domain.geometry.inside(X[interior]))
+    # the same friction from the Budd law
+    budd, _ = write_synthetic_issm(str(tmp_path), filename="budd", num_vertices=1000, noise=0.01, jitter=0.3, seed=1,
+            friction_law="budd")
+    budd_loader = ISSMmdData(SingleDataParameter({"data_path": budd}))
+    budd_loader.load_data()
+    assert np.allclose(budd_loader.data_dict['C'], data_loader.data_dict['C'])
+
 def test_ISSMmdData_plot():
     filename = "Helheim_fastflow.mat"
     repoPath = os.path.dirname(__file__) + "/../examples/"
@@ -122,3 +160,31 @@ def test_MatData():
 
     icoord = data_loader.get_ice_coordinates()
     assert icoord.shape == (3192, 2)
+
+def test_data_cache(tmp_path):
+    matfile, _ = write_synthetic_issm(str(tmp_path), num_vertices=1000, seed=1)
+    hp = {"data": {"ISSM": {"data_path": matfile, "data_size": {"u":100, "C":None}}},
+          "data_cache_path": os.path.join(tmp_path, "cache")}
+    data = Data(DataParameter(hp))
+    data.load_data()
+    cache = DataCache(hp["data_cache_path"])
+    assert len(cache.entries()) == 1
+    cached = Data(DataParameter(hp))
+    cached.load_data()
+    for d in ["X_dict", "data_dict", "mask_dict", "mesh_dict"]:
+        assert getattr(data.data["ISSM"], d).keys() == getattr(cached.data["ISSM"], d).keys()
+    assert isinstance(cached.data["ISSM"].data_dict["u"], np.memmap)
+    assert np.all(cached.data["ISSM"].data_dict["u"] == data.data["ISSM"].data_dict["u"])
+    cached.prepare_training_data()
+    assert cached.sol["u"].shape == (100, 1)
+
+    # a new entry for a changed file, the older one is removed when the cache is full
+    os.utime(matfile, ns=(0, 0))
+    size = cache.entries()[0][1]
+    hp["data_cache_size"] = int(1.5*size)
+    Data(DataParameter(hp)).load_data()
+    entries = cache.entries()
+    assert len(entries) == 1
+    assert entries[0][0] == cache.key(data.data["ISSM"].parameters)
+    # larger than the cache
+    assert DataCache(hp["data_cache_path"], max_size=10).save("large", {"X_dict": {"x": np.ones(10)}}) == False
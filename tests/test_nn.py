@@ -1,5 +1,5 @@
 import pinnicle as pinn
-from pinnicle.nn.helper import minmax_scale, up_scale
+from pinnicle.nn.helper import minmax_scale, up_scale, remap_scaling
 from pinnicle.parameter import NNParameter
 import numpy as np
 
@@ -17,6 +17,18 @@ def test_upscale():
     y = up_scale(x, lb, ub)
     assert np.all(abs(y- np.linspace(lb, ub, 100)) < np.finfo(float).eps*ub)
 
+def test_remap_scaling():
+    rng = np.random.default_rng(0)
+    weights = [rng.normal(size=(2, 4)), rng.normal(size=4), rng.normal(size=(4, 3)), rng.normal(size=3)]
+    lb, ub, olb, oub = np.array([0.0, 1.0]), np.array([2.0, 5.0]), np.array([-1.0, 0.0, 1.0]), np.array([1.0, 3.0, 2.0])
+    nlb, nub, nolb, noub = np.array([-1.0, 0.0]), np.array([4.0, 6.0]), np.array([-2.0, 1.0, 0.0]), np.array([5.0, 2.0, 3.0])
+    def net(w, x, lb, ub, olb, oub):
+        z = np.tanh(minmax_scale(x, lb, ub) @ w[0] + w[1])
+        return up_scale(z @ w[2] + w[3], olb, oub)
+    x = rng.uniform(0.0, 2.0, size=(10, 2))
+    new_weights = remap_scaling(weights, lb, ub, olb, oub, nlb, nub, nolb, noub)
+    assert np.allclose(net(new_weights, x, nlb, nub, nolb, noub), net(weights, x, lb, ub, olb, oub))
+
 def test_new_nn():
     p = pinn.nn.FNN()
     d = NNParameter()
@@ -69,3 +81,28 @@ def test_pfnn_list_neuron():
     p = pinn.nn.FNN(d)
     assert len(p.net.layers) == 12
 
+
+def test_ensemble_nn():
+    hp={}
+    hp['input_variables'] = ['x','y']
+    hp['output_variables'] = ['u', 'v','s']
+    hp['num_neurons'] = 4
+    hp['num_layers'] = 2
+    hp['ensemble_size'] = 3
+    d = NNParameter(hp)
+    p = pinn.nn.FNN(d)
+    assert isinstance(p.net, pinn.nn.EnsembleFNN)
+    x = np.random.rand(7, 2).astype(np.float32)
+    y = p.net(x).numpy()
+    assert y.shape == (21, 3)
+    # each member is an independent network
+    kernels = [k.numpy() for k in p.net.kernels]
+    biases = [b.numpy() for b in p.net.biases]
+    assert not np.allclose(kernels[0][0], kernels[0][1])
+    for m in range(3):
+        z = x
+        for i, (w, b) in enumerate(zip(kernels, biases)):
+            z = z @ w[m] + b[m]
+            if i < len(kernels) - 1:
+                z = np.tanh(z)
+        assert np.allclose(y[7*m:7*(m+1)], z, atol=1e-5)
@@ -61,6 +61,18 @@ def test_nn_parameter():
     assert d.is_output_scaling()
     d = NNParameter({"num_neurons":[1,2,3]})
     assert d.num_layers == 3
+    assert not d.is_ensemble()
+    d = NNParameter({"ensemble_size":4})
+    assert d.is_ensemble()
+    with pytest.raises(ValueError):
+        NNParameter({"ensemble_size":0})
+    with pytest.raises(ValueError):
+        NNParameter({"ensemble_size":2, "is_parallel":True})
+    d = NNParameter()
+    assert d.warm_start == ""
+    assert d.freeze_layers == 0
+    with pytest.raises(ValueError):
+        NNParameter({"freeze_layers":-1})
     
 def test_parameters():
     p = Parameters()
@@ -131,6 +143,7 @@ def test_training_parameters():
     hp =  {}
     p = TrainingParameter(hp)
     assert p.additional_loss == {}
+    assert p.jit_compile == False
     u_loss = {}
     u_loss['name'] = "vel log"
     u_loss['function'] = "VEL_LOG"
@@ -139,6 +152,87 @@ def test_training_parameters():
     p = TrainingParameter(hp)
     assert p.additional_loss["u"].name == u_loss['name']
 
+def test_training_stages():
+    hp = {}
+    p = TrainingParameter(hp)
+    assert p.stages == []
+    hp["stages"] = [{"optimizer":"adam", "epochs":100, "decay":["inverse time", 10, 0.5]},
+                    {"optimizer":"L-BFGS", "epochs":50, "patience":10, "max_time":60}]
+    p = TrainingParameter(hp)
+    assert len(p.stages) == 2
+    assert p.stages[0].learning_rate is None
+    assert p.stages[0].has_plateau() == False
+    assert p.stages[1].has_plateau() == True
+    assert p.stages[1].min_delta == 0
+    assert p.stages[1].check_every == 1000
+    hp["stages"] = [{"optimizer":"adam"}]
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+    hp["stages"] = [{"optimizer":"adam", "epochs":100, "pde_weight_scale":0, "num_collocation_points":500},
+                    {"optimizer":"adam", "epochs":100, "loss_weights":{"vel log":0}}, {"optimizer":"adam", "epochs":100}]
+    p = TrainingParameter(hp)
+    assert p.stages[0].has_loss_weights() == True
+    assert p.stages[1].has_loss_weights() == True
+    assert p.stages[2].has_loss_weights() == False
+    assert p.stages[2].num_collocation_points is None
+    hp["stages"] = [{"optimizer":"adam", "epochs":100, "pde_weight_scale":-1}]
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+    hp["stages"] = [{"optimizer":"adam", "epochs":100, "num_collocation_points":0}]
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+
+def test_training_threads():
+    p = TrainingParameter({})
+    assert p.num_intra_op_threads == 0
+    assert p.cpu_affinity == []
+    p = TrainingParameter({"num_intra_op_threads":4, "num_inter_op_threads":2, "cpu_affinity":[0, 1, 2, 3]})
+    assert p.num_inter_op_threads == 2
+    with pytest.raises(ValueError):
+        p = TrainingParameter({"num_intra_op_threads":-1})
+    with pytest.raises(ValueError):
+        p = TrainingParameter({"cpu_affinity":["0"]})
+
+def test_training_profiling():
+    p = TrainingParameter({})
+    assert p.has_StepProfiler() == False
+    assert p.has_TraceWindow() == False
+    p = TrainingParameter({"profile_period":100, "profile_trace":[500, 520]})
+    assert p.has_callbacks == True
+    with pytest.raises(ValueError):
+        p = TrainingParameter({"profile_trace":[520, 500]})
+    with pytest.raises(ValueError):
+        p = TrainingParameter({"profile_period":0})
+
+def test_training_minibatch():
+    hp = {}
+    p = TrainingParameter(hp)
+    assert p.is_minibatch() == False
+    hp["collocation_batch_size"] = 100
+    p = TrainingParameter(hp)
+    assert p.is_minibatch() == True
+    hp = {"data_batch_size": {"u": 100}}
+    p = TrainingParameter(hp)
+    assert p.is_minibatch() == True
+    hp = {"data_batch_size": {"u": 0}}
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+
+def test_learning_rate_schedule_parameters():
+    hp = {}
+    p = TrainingParameter(hp)
+    assert p.learning_rate_schedule is None
+    hp["learning_rate_schedule"] = {"name": "cosine", "decay_steps": 100, "warmup_steps": 10}
+    p = TrainingParameter(hp)
+    assert p.learning_rate_schedule.name == "cosine"
+    assert p.learning_rate_schedule.alpha == 0.0
+    hp["learning_rate_schedule"] = {"name": "linear"}
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+    hp = {"stages": [{"epochs": 10, "decay": ["inverse time", 10, 0.5], "learning_rate_schedule": {"name": "step"}}]}
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+
 def test_training_callbacks():
     hp = {}
     p = TrainingParameter(hp)
@@ -164,12 +258,43 @@ def test_training_callbacks_Resampler():
     assert p.has_callbacks == True
     assert p.has_PDEPointResampler() == True
 
+def test_training_callbacks_AdaptiveResampler():
+    hp = {}
+    hp["adaptive_sampling"] = "RAD"
+    p = TrainingParameter(hp)
+    assert p.has_callbacks == True
+    assert p.has_AdaptiveResampler() == True
+    assert p.has_PDEPointResampler() == False
+    hp["adaptive_sampling"] = "uniform"
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+    hp["adaptive_sampling"] = "RAR"
+    hp["period"] = 10
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+
+def test_training_callbacks_LossWeightBalancer():
+    hp = {}
+    p = TrainingParameter(hp)
+    assert p.has_LossWeightBalancer() == False
+    hp["loss_balancing"] = "gradnorm"
+    p = TrainingParameter(hp)
+    assert p.has_callbacks == True
+    assert p.has_LossWeightBalancer() == True
+    assert p.loss_balancing_period == 100
+    hp["loss_balancing"] = "annealing"
+    with pytest.raises(ValueError):
+        p = TrainingParameter(hp)
+
 def test_training_callbacks_Checkpoint():
     hp = {}
     hp["checkpoint"] = True
     p = TrainingParameter(hp)
     assert p.has_callbacks == True
     assert p.has_ModelCheckpoint() == True
+    assert p.checkpoint_period == 1000
+    assert p.checkpoint_keep_last == 3
+    assert p.checkpoint_keep_best == True
 
 def test_print_parameters(capsys):
     hp = {}
@@ -1,5 +1,7 @@
 import pinnicle as pinn
-from pinnicle.physics import Physics, SSAEquationParameter, SSA
+import tensorflow as tf
+import numpy as np
+from pinnicle.physics import Physics, SSAEquationParameter, SSA, MOLHOEquationParameter, MOLHO, full_jacobian
 from pinnicle.parameter import PhysicsParameter
 import pytest
 
@@ -175,3 +177,70 @@ def test_Physics_dummy():
     assert len(phy.output_ub) == 3
     assert len(phy.data_weights) == 3
     assert len(phy.pde_weights) == 0
+
+def test_derivative_engines():
+    MOLHO = {}
+    MOLHO["scalar_variables"] = {"B":1.26802073401e+08}
+    hp = {}
+    hp["equations"] = {"MOLHO":MOLHO}
+    phy = Physics(PhysicsParameter(hp))
+    assert phy.equations[0].derivative_engine == "component"
+
+    x = tf.random.uniform([10, 2], dtype=tf.float64)
+    W = tf.random.uniform([2, len(phy.output_var)], dtype=tf.float64)
+
+    @tf.function
+    def jacobian(x, engine):
+        y = tf.tanh(tf.matmul(x, W))
+        J = full_jacobian(x, y, engine=engine)
+        return [J[:, i, j:j+1] for i in range(len(phy.output_var)) for j in range(2)]
+
+    @tf.function
+    def jacobian_ref(x):
+        y = tf.tanh(tf.matmul(x, W))
+        return [tf.gradients(y[:, i:i+1], x)[0][:, j:j+1] for i in range(len(phy.output_var)) for j in range(2)]
+
+    J_ref = jacobian_ref(x)
+    for engine in ["forward", "vectorized"]:
+        J = jacobian(x, engine)
+        assert all([np.allclose(a, b) for a, b in zip(J, J_ref)])
+
+    # the same residuals with the full Jacobian in pdes, which is not kept after the call
+    def pdes(phy):
+        return tf.function(lambda x: phy.pdes(x, tf.tanh(tf.matmul(x, W))))
+
+    f_ref = pdes(phy)(x)
+    MOLHO["derivative_engine"] = "forward"
+    phy = Physics(PhysicsParameter(hp))
+    assert phy.equations[0].derivative_engine == "forward"
+    f = pdes(phy)(x)
+    assert all([np.allclose(a, b) for a, b in zip(f, f_ref)])
+    assert phy.equations[0].J_full is None
+
+    MOLHO["derivative_engine"] = "not defined"
+    with pytest.raises(ValueError):
+        Physics(PhysicsParameter(hp))
+
+def test_MOLHO_gauss_points():
+    p = MOLHOEquationParameter({"scalar_variables":{"B":1.26802073401e+08}})
+    assert p.num_gauss_points == 5
+    molho = MOLHO(p)
+    assert np.allclose(sorted(molho.constants["gauss_x"]), [0.04691007703066802, 0.23076534494715845, 0.5, 0.7692346550528415, 0.9530899229693319])
+    assert np.isclose(np.sum(molho.constants["gauss_weights"]), 1.0)
+
+    p = MOLHOEquationParameter({"num_gauss_points":3})
+    molho = MOLHO(p)
+    assert len(molho.constants["gauss_x"]) == 3
+
+    x = tf.random.uniform([10, 2], dtype=tf.float64)
+    W = tf.random.uniform([2, 7], dtype=tf.float64)
+    @tf.function
+    def residuals(x):
+        y = tf.sin(tf.matmul(x, W)) + 2.0
+        return molho.pde(x, y)
+    f = residuals(x)
+    assert len(f) == 4
+    assert all([fi.shape == (10, 1) for fi in f])
+
+    with pytest.raises(ValueError):
+        MOLHOEquationParameter({"num_gauss_points":0})
@@ -2,7 +2,8 @@ import os
 import pinnicle as pinn
 import numpy as np
 import deepxde as dde
-from pinnicle.utils import data_misfit, plot_nn, plot_similarity, plot_residuals, tripcolor_similarity, tripcolor_residuals
+from deepxde.backend import tf
+from pinnicle.utils import data_misfit, load_dict_from_json, plot_nn, plot_similarity, plot_residuals, tripcolor_similarity, tripcolor_residuals
 import pytest
 
 dde.config.set_default_float('float64')
@@ -134,6 +135,27 @@ def test_train(tmp_path):
     experiment.train()
     assert experiment.loss_names == ['fSSA1', 'fSSA2', 'u', 'v', 's', 'H', 'C', "vel log"]
 
+@pytest.mark.parametrize("equation,data_size", [
+    ("SSA", {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}),
+    ("MOLHO", {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}),
+    ("MC", {"u":100, "v":100, "a":100, "H":100, "vel":100})])
+def test_train_jit_compile(tmp_path, equation, data_size):
+    vel_loss = {"name":"vel log", "function":"VEL_LOG", "weight":1.0e-5}
+    experiment = pinn.PINN(params=dict(hp, is_save=False, num_collocation_points=100, jit_compile=True,
+                                       data={"ISSM": dict(issm, data_size=data_size)}, additional_loss={"vel":vel_loss},
+                                       equations={equation:{"scalar_variables":{"B":1.26802073401e+08}}}))
+    experiment.compile()
+    experiment.train()
+    assert experiment.params.training.jit_compile
+    assert "vel log" in experiment.loss_names
+    assert experiment.model.train_state.epoch == hp["epochs"]
+    assert np.all(np.isfinite(experiment.model.losshistory.loss_train[-1]))
+    # the setting of deepxde is restored
+    dde.config.enable_xla_jit()
+    experiment.compile()
+    assert dde.config.xla_jit
+    dde.config.disable_xla_jit()
+
 def test_train_PFNN(tmp_path):
     hp["is_parallel"] = True
     hp["is_save"] = False
@@ -162,10 +184,9 @@ def test_save_train(tmp_path):
     assert experiment.loss_names == ['fSSA1', 'fSSA2', 'u', 'v', 's', 'H', 'C', "vel log"]
     assert os.path.isfile(f"{tmp_path}/pinn/model-{hp['epochs']}.ckpt.index")
 
-@pytest.mark.skip(reason="[tf] change to h5 format")
 def test_train_with_callbacks(tmp_path):
     hp["save_path"] = str(tmp_path)
-    hp["is_save"] = True
+    hp["is_save"] = False
     hp["num_collocation_points"] = 100
     issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
     hp["data"] = {"ISSM": issm}
@@ -173,13 +194,332 @@ def test_train_with_callbacks(tmp_path):
     hp["period"] = 5
     hp["patience"] = 8
     hp["checkpoint"] = True
+    hp["checkpoint_period"] = 3
+    hp["checkpoint_keep_last"] = 2
     experiment = pinn.PINN(params=hp)
     experiment.compile()
     experiment.train()
     assert experiment.loss_names == ['fSSA1', 'fSSA2', 'u', 'v', 's', 'H', 'C', "vel log"]
-    assert os.path.isfile(f"{tmp_path}/pinn/model-1.ckpt.index")
-    assert os.path.isfile(f"{tmp_path}/pinn/model-9.ckpt.index")
-    assert not os.path.isfile(f"{tmp_path}/pinn/model-{hp['epochs']}.ckpt.index")
+    index = pinn.utils.list_checkpoints(f"{tmp_path}/checkpoints")
+    steps = [r["step"] for r in index["checkpoints"]]
+    assert steps[-2:] == [6, 9]
+    assert index["best"] in steps
+    assert len(steps) <= 3
+    assert len(os.listdir(f"{tmp_path}/checkpoints")) == len(steps) + 1
+    for k in ["min_delta", "period", "patience", "checkpoint", "checkpoint_period", "checkpoint_keep_last"]:
+        del hp[k]
+
+def test_train_with_metrics_log(tmp_path):
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None}
+    experiment = pinn.PINN(params=dict(hp, is_save=False, save_path=str(tmp_path), num_collocation_points=100, epochs=10,
+        metrics_log=True, metrics_period=3, metrics_buffer_size=2, data={"ISSM": issm}, equations={"SSA":SSA}))
+    experiment.compile()
+    callbacks = experiment.update_callbacks()
+    assert isinstance(callbacks[-1], pinn.utils.MetricsLogger)
+    experiment.train()
+    history = pinn.utils.History()
+    history.load(str(tmp_path), "metrics.jsonl")
+    assert history.history["steps"] == [3, 6, 9, 10]
+    assert all(len(history.history[name]) == 4 for name in experiment.loss_names)
+    assert all(lr > 0 for lr in history.history["metrics"]["learning_rate"])
+    assert all(p > 0 for p in history.history["metrics"]["points_per_s"])
+    # the losses of the last step are reused from deepxde
+    loss_train = experiment.model.train_state.loss_train
+    assert [history.history[name][-1] for name in experiment.loss_names] == pytest.approx(list(loss_train))
+    assert np.all(pinn.utils.current_losses(experiment.model) == loss_train)
+
+def test_train_with_profiling(tmp_path):
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    vel_loss = {"name":"vel log", "function":"VEL_LOG", "weight":1.0}
+    experiment = pinn.PINN(params=dict(hp, is_save=False, save_path=str(tmp_path), num_collocation_points=100, epochs=10,
+        profile_period=5, profile_trace=[2, 4], additional_loss={"vel":vel_loss}, data={"ISSM": issm}, equations={"SSA":SSA}))
+    experiment.compile()
+    experiment.train()
+    records = load_dict_from_json(str(tmp_path), "profile.json")
+    assert [r["step"] for r in records] == [5, 10]
+    assert set(records[0]["shares"]) == set(experiment.loss_names + ["optimizer", "other"])
+    assert sum(records[0]["shares"].values()) == pytest.approx(1.0)
+    assert all(t > 0 for t in records[0]["terms"].values())
+    assert len(os.listdir(os.path.join(tmp_path, "trace"))) > 0
+    # the timed training steps do not change the model
+    profiler = [c for c in experiment.update_callbacks() if isinstance(c, pinn.utils.StepProfiler)][0]
+    profiler.set_model(experiment.model)
+    profiler.step_times = [0.1]
+    weights = [v.numpy() for v in experiment.model.net.variables + experiment.model.opt_name.variables]
+    profiler.profile()
+    assert all(np.all(w == v.numpy()) for w, v in zip(weights, experiment.model.net.variables + experiment.model.opt_name.variables))
+
+def test_save_and_load_checkpoint(tmp_path):
+    hp["save_path"] = str(tmp_path)
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 100
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    experiment = pinn.PINN(params=hp)
+    experiment.compile()
+    experiment.train()
+    experiment.save_checkpoint()
+    X = experiment.dde_data.train_x_all
+
+    np.random.seed(1234)
+    resumed = pinn.PINN(params=hp)
+    resumed.load_checkpoint()
+    assert resumed.model.train_state.step == hp["epochs"]
+    assert resumed.model.train_state.epoch == experiment.model.train_state.epoch
+    assert np.all(resumed.dde_data.train_x_all == X)
+    assert int(resumed.model.opt_name.iterations) == int(experiment.model.opt_name.iterations)
+    for v1, v2 in zip(experiment.model.net.weights, resumed.model.net.weights):
+        assert np.all(v1.numpy() == v2.numpy())
+    # the random states are restored
+    assert np.random.rand() == experiment_random(tmp_path)
+    resumed.train()
+    assert resumed.model.train_state.step == 2*hp["epochs"]
+    assert resumed.model.train_state.epoch == 2*hp["epochs"]
+    assert resumed.history.history["steps"][-1] == 2*hp["epochs"]
+    with pytest.raises(ValueError):
+        resumed.load_checkpoint(step=1)
+
+def experiment_random(path):
+    arrays, meta = pinn.utils.load_checkpoint_file(f"{path}/checkpoints/ckpt-{hp['epochs']}.npz")
+    rng = np.random.RandomState()
+    rng.set_state(("MT19937", arrays["numpy_random_keys"], *meta["numpy_random"]))
+    return rng.rand()
+
+def test_warm_start(tmp_path):
+    hp["save_path"] = str(tmp_path)
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 100
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    source = pinn.PINN(params=dict(hp, is_parallel=False))
+    source.compile()
+    source.train()
+    source.save_checkpoint()
+    X = source.model_data.X["u"]
+
+    experiment = pinn.PINN(params=dict(hp, is_parallel=False))
+    # different scalings of the inputs and outputs
+    experiment.params.nn.input_lb = experiment.params.nn.input_lb - 1000.0
+    experiment.params.nn.input_ub = experiment.params.nn.input_ub * 1.5
+    experiment.params.nn.output_ub = experiment.params.nn.output_ub * 2.0
+    experiment.warm_start(str(tmp_path), freeze_layers=2)
+    experiment.compile()
+    assert np.allclose(experiment.predict(X), source.predict(X), rtol=1e-5, atol=1e-8)
+    assert len(experiment.model.net.trainable_variables) == len(experiment.model.net.weights) - 4
+    frozen = experiment.model.net.weights[0].numpy()
+    experiment.train()
+    assert np.all(experiment.model.net.weights[0].numpy() == frozen)
+    with pytest.raises(ValueError):
+        experiment.warm_start(str(tmp_path), step=1)
+
+    # from the parameters
+    experiment = pinn.PINN(params=dict(hp, is_parallel=False, warm_start=str(tmp_path), warm_start_step="best"))
+    experiment.compile()
+    assert np.allclose(experiment.predict(X), source.predict(X), rtol=1e-5, atol=1e-8)
+
+def test_warm_start_saved_model(tmp_path):
+    hp["save_path"] = str(tmp_path)
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 100
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    # saved by train, without checkpoints
+    source = pinn.PINN(params=dict(hp, is_parallel=False, is_save=True))
+    source.compile()
+    source.train()
+    X = source.model_data.X["u"]
+
+    experiment = pinn.PINN(params=dict(hp, is_parallel=False))
+    experiment.params.nn.input_ub = experiment.params.nn.input_ub * 1.5
+    experiment.warm_start(str(tmp_path))
+    experiment.compile()
+    assert np.allclose(experiment.predict(X), source.predict(X), rtol=1e-5, atol=1e-8)
+    with pytest.raises(ValueError):
+        experiment.warm_start(str(tmp_path), step=1)
+    with pytest.raises(ValueError):
+        experiment.warm_start(str(tmp_path / "pinn"))
+
+def test_train_with_adaptive_sampling(tmp_path):
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 100
+    hp["adaptive_sampling"] = "RAD"
+    hp["adaptive_period"] = 5
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    hp["equations"] = {"SSA":SSA}
+    experiment = pinn.PINN(params=hp)
+    experiment.compile()
+    callbacks = experiment.update_callbacks()
+    assert isinstance(callbacks[-1], pinn.utils.ResidualAdaptiveResampler)
+    experiment.train()
+    assert experiment.dde_data.train_x_all.shape == (100, 2)
+    assert experiment.dde_data.anchors is not None
+    hp["adaptive_sampling"] = "RAR"
+    hp["adaptive_num_add"] = 20
+    experiment = pinn.PINN(params=hp)
+    experiment.compile()
+    experiment.train()
+    assert experiment.dde_data.train_x_all.shape == (140, 2)
+    del hp["adaptive_sampling"], hp["adaptive_period"], hp["adaptive_num_add"]
+
+def test_train_with_loss_balancing(tmp_path):
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 100
+    hp["loss_balancing_period"] = 4
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    hp["equations"] = {"SSA":SSA}
+    for method in ["gradnorm", "softadapt"]:
+        hp["loss_balancing"] = method
+        experiment = pinn.PINN(params=hp)
+        experiment.compile()
+        experiment.train()
+        weights = experiment.history.history["loss_weights"]
+        assert weights["steps"][0] == 0
+        assert len(weights["fSSA1"]) == len(weights["steps"])
+        assert len(weights["steps"]) > 1
+        assert not np.allclose(experiment.model.loss_weights.numpy(), experiment.params.training.loss_weights)
+        assert all(w > 0 for w in experiment.model.loss_weights.numpy())
+    experiment.history.save(str(tmp_path))
+    assert os.path.isfile(os.path.join(tmp_path, "history.json"))
+    del hp["loss_balancing"], hp["loss_balancing_period"]
+
+def test_train_stages_with_loss_balancing(tmp_path):
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    stages = [{"optimizer":"adam", "epochs":8}, {"optimizer":"adam", "epochs":8, "pde_weight_scale":0}]
+    for method in ["gradnorm", "softadapt"]:
+        experiment = pinn.PINN(params=dict(hp, is_save=False, num_collocation_points=100, stages=stages, loss_balancing=method,
+                                           loss_balancing_period=2, data={"ISSM": issm}, equations={"SSA":SSA}))
+        experiment.compile()
+        experiment.train()
+        weights = experiment.model.loss_weights.numpy()
+        # the pde terms of the second stage are kept at 0, the others are still balanced
+        assert np.all(weights[:2] == 0)
+        assert np.all(weights[2:] > 0)
+        assert experiment.history.history["loss_weights"]["steps"][-1] == 16
+
+def test_train_stages(tmp_path):
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 100
+    hp["stages"] = [{"optimizer":"adam", "epochs":10, "decay":["inverse time", 5, 0.5], "check_every":4},
+                    {"optimizer":"L-BFGS", "epochs":20, "check_every":5, "max_time":0}]
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    hp["equations"] = {"SSA":SSA}
+    experiment = pinn.PINN(params=hp)
+    experiment.compile()
+    experiment.train()
+    steps = experiment.history.history["steps"]
+    # adam: 4, 8, 10, L-BFGS stops after the first check
+    assert steps[:4] == [0, 4, 8, 10]
+    assert 10 < steps[-1] <= 15
+    assert experiment.model.opt_name == "L-BFGS"
+    assert dde.optimizers.LBFGS_options["maxiter"] == 15000
+    del hp["stages"]
+
+def test_train_stages_with_callbacks(tmp_path):
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    stages = [{"optimizer":"adam", "epochs":10, "check_every":2}, {"optimizer":"adam", "epochs":10, "check_every":2}]
+    # the patience of EarlyStopping spans the checks of the stage, the loss never decreases by min_delta
+    experiment = pinn.PINN(params=dict(hp, is_save=False, save_path=str(tmp_path), num_collocation_points=100, stages=stages,
+                                       min_delta=1e10, patience=3, checkpoint=True, checkpoint_period=100,
+                                       data={"ISSM": issm}, equations={"SSA":SSA}))
+    experiment.compile()
+    experiment.train()
+    assert experiment.model.train_state.step == 8
+    # one checkpoint at the end of each stage
+    index = pinn.utils.list_checkpoints(os.path.join(tmp_path, "checkpoints"))
+    assert [r["step"] for r in index["checkpoints"]] == [4, 8]
+
+def test_train_checkpoint_loss(tmp_path):
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None}
+    experiment = pinn.PINN(params=dict(hp, is_save=False, save_path=str(tmp_path), num_collocation_points=100, epochs=4,
+                                       checkpoint=True, checkpoint_period=3, checkpoint_keep_best=False,
+                                       data={"ISSM": issm}, equations={"SSA":SSA}))
+    experiment.compile()
+    experiment.train()
+    # without better_only and keep_best, the loss of deepxde's last evaluation is used, as in ModelCheckpoint
+    index = pinn.utils.list_checkpoints(os.path.join(tmp_path, "checkpoints"))
+    assert [r["step"] for r in index["checkpoints"]] == [3, 4]
+    assert index["checkpoints"][0]["loss"] == pytest.approx(np.sum(experiment.model.losshistory.loss_train[0]))
+    assert index["checkpoints"][1]["loss"] == pytest.approx(np.sum(experiment.model.losshistory.loss_train[-1]))
+
+def test_train_curriculum(tmp_path):
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    stages = [{"optimizer":"adam", "epochs":2, "pde_weight_scale":0, "loss_weights":{"vel log":0}, "num_collocation_points":50},
+              {"optimizer":"adam", "epochs":2, "pde_weight_scale":0.5, "loss_weights":{"vel log":0}, "num_collocation_points":80},
+              {"optimizer":"adam", "epochs":2}]
+    vel_loss = {"name":"vel log", "function":"VEL_LOG", "weight":1.0}
+    experiment = pinn.PINN(params=dict(hp, is_save=False, num_collocation_points=100, stages=stages,
+                                       additional_loss={"vel":vel_loss}, data={"ISSM": issm}, equations={"SSA":SSA}))
+    experiment.compile()
+    weights = list(experiment.params.training.loss_weights)
+    experiment.train()
+    assert experiment.model.train_state.step == 6
+    assert experiment.dde_data.num_domain == 80
+    assert experiment.dde_data.train_x_all.shape[0] < 100
+    assert experiment.model.loss_weights == weights
+    # the pde weights of the data only stage
+    experiment.params.training.stages = experiment.params.training.stages[:1]
+    experiment.train()
+    assert all(w == 0 for w in experiment.model.loss_weights[:2])
+    assert experiment.model.loss_weights[experiment.loss_names.index("vel log")] == 0
+    with pytest.raises(ValueError):
+        experiment.params.training.stages[0].loss_weights = {"unknown":1}
+        experiment.train()
+
+def test_train_minibatch(tmp_path):
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 500
+    hp["collocation_batch_size"] = 50
+    hp["data_batch_size"] = {"u": 30, "vel": 20}
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    hp["equations"] = {"SSA":SSA}
+    experiment = pinn.PINN(params=hp)
+    assert isinstance(experiment.dde_data, pinn.modeldata.MiniBatchPDE)
+    assert isinstance(experiment.training_data[0], pinn.modeldata.MiniBatchPointSetBC)
+    assert isinstance(experiment.training_data[-1], pinn.modeldata.MiniBatchPointSetOperatorBC)
+    X1, _, _ = experiment.dde_data.train_next_batch()
+    X2, _, _ = experiment.dde_data.train_next_batch()
+    assert X1.shape == X2.shape
+    assert X1.shape[0] == 30 + 3*100 + experiment.dde_data.num_bcs[4] + 20 + 50
+    assert not np.allclose(X1, X2)
+    assert experiment.dde_data.train_x_all.shape[0] == 500
+    experiment.compile()
+    experiment.train()
+    assert np.all(np.isfinite(experiment.model.losshistory.loss_train[-1]))
+    # the test losses use the values of the test points, not of the current batch
+    bc = experiment.training_data[0]
+    X_test = experiment.model.train_state.X_test[:experiment.dde_data.num_bcs[0]]
+    idx = [np.flatnonzero(np.all(bc.batch.points == x, axis=1))[0] for x in X_test]
+    assert np.allclose(bc.batch.test_values.numpy(), bc.batch.all_values[idx])
+    assert not np.allclose(bc.batch.values.numpy(), bc.batch.all_values[idx])
+    # the test points are kept in the next call of train, and so are their values
+    experiment.train()
+    assert np.allclose(experiment.model.train_state.X_test[:experiment.dde_data.num_bcs[0]], X_test)
+    assert np.allclose(bc.batch.test_values.numpy(), bc.batch.all_values[idx])
+    del hp["collocation_batch_size"], hp["data_batch_size"]
+
+def test_train_learning_rate_schedule(tmp_path):
+    hp["save_path"] = str(tmp_path)
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 100
+    hp["learning_rate_schedule"] = {"name": "exponential", "decay_steps": 10, "decay_rate": 0.5}
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    hp["equations"] = {"SSA":SSA}
+    experiment = pinn.PINN(params=hp)
+    experiment.compile()
+    experiment.train()
+    assert np.isclose(float(experiment.model.opt_name.learning_rate), 0.5*hp["learning_rate"])
+    # a new optimizer continues the schedule
+    experiment.compile()
+    experiment.train()
+    assert np.isclose(float(experiment.model.opt_name.learning_rate), 0.25*hp["learning_rate"])
+    experiment.save_setting()
+    assert pinn.PINN(loadFrom=str(tmp_path)).params.training.learning_rate_schedule.decay_steps == 10
+    del hp["learning_rate_schedule"]
 
 def test_only_callbacks(tmp_path):
     hp["save_path"] = str(tmp_path)
@@ -273,6 +613,72 @@ def test_residuals(tmp_path):
     fig, axs = plot_residuals(experiment)
     assert (fig is not None) and (np.size(axs)==3)
 
+def test_evaluate_residuals(tmp_path):
+    hp["equations"] = {"SSA":SSA, "MC":{"scalar_variables":{"B":1.26802073401e+08}}}
+    hp["is_save"] = False
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None}
+    hp["data"] = {"ISSM": issm}
+    experiment = pinn.PINN(params=hp)
+    experiment.compile()
+    X = experiment.domain.geometry.random_points(250)
+    residuals = experiment.evaluate_residuals(X)
+    assert list(residuals.keys()) == ['fSSA1', 'fSSA2', 'fMC']
+    assert all(residuals[k].shape == (250, 1) for k in residuals)
+    ref = experiment.model.predict(X, operator=experiment.physics.pdes)
+    for k, name in enumerate(experiment.physics.residuals):
+        assert np.allclose(residuals[name], ref[k])
+    chunked = experiment.evaluate_residuals(X, chunk_size=64)
+    for name in residuals:
+        assert np.allclose(residuals[name], chunked[name])
+    with pytest.raises(ValueError):
+        experiment.evaluate_residuals(X, chunk_size=0)
+
+def test_predict(tmp_path):
+    hp["equations"] = {"SSA":SSA}
+    hp["is_save"] = False
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None}
+    hp["data"] = {"ISSM": issm}
+    experiment = pinn.PINN(params=hp)
+    experiment.compile()
+    X = experiment.domain.geometry.random_points(250)
+    ref = experiment.model.predict(X)
+    assert np.allclose(experiment.predict(X), ref)
+    assert np.allclose(experiment.predict(X, chunk_size=64), ref)
+    assert np.allclose(experiment.predict(X, max_memory=10000), ref)
+    assert np.allclose(experiment.predict(X, chunk_size=64, num_workers=3), ref)
+    out = np.zeros_like(ref)
+    assert experiment.predict(X, chunk_size=64, out=out) is out
+    assert np.allclose(out, ref)
+    experiment.predict(X, chunk_size=64, out=os.path.join(tmp_path, "pred.npy"))
+    assert np.allclose(np.load(os.path.join(tmp_path, "pred.npy")), ref)
+    with pytest.raises(ValueError):
+        experiment.predict(X, chunk_size=0)
+    with pytest.raises(ValueError):
+        experiment.predict(X, out=np.zeros((10, 5)))
+    with pytest.raises(ValueError):
+        experiment.predict(X, return_std=True)
+
+def test_train_ensemble(tmp_path):
+    hp["equations"] = {"SSA":SSA}
+    hp["is_save"] = False
+    hp["num_collocation_points"] = 100
+    issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None, "vel":100}
+    hp["data"] = {"ISSM": issm}
+    experiment = pinn.PINN(params=dict(hp, ensemble_size=3, is_parallel=False))
+    experiment.compile()
+    experiment.train()
+    X = experiment.domain.geometry.random_points(50)
+    members = experiment.model.predict(X).reshape(3, 50, 5)
+    mean, std = experiment.predict(X, chunk_size=20, return_std=True)
+    assert np.allclose(mean, np.mean(members, axis=0))
+    assert np.allclose(std, np.std(members, axis=0))
+    assert np.all(std > 0)
+    residuals = experiment.evaluate_residuals(X)
+    assert residuals["fSSA1"].shape == (50, 1)
+    # the root mean square of the members, the residuals of opposite signs do not cancel
+    members = tf.function(lambda x: experiment.physics.pdes(*experiment.model.net.forward(x)))(X)
+    assert np.allclose(residuals["fSSA1"], np.sqrt(np.mean(members[0].numpy().reshape(3, 50, 1)**2, axis=0)))
+
 def test_trisimilarity(tmp_path):
     hp["equations"] = {"SSA":SSA}
     hp["save_path"] = str(tmp_path)
@@ -0,0 +1,135 @@
+import os
+import pinnicle as pinn
+import numpy as np
+from pinnicle.sweep import set_param
+from pinnicle.utils import share_arrays, attach_arrays
+import pytest
+
+inputFileName="Helheim_fastflow.mat"
+expFileName = "fastflow_CF.exp"
+
+# path for loading data and saving models
+repoPath = os.path.dirname(__file__) + "/../examples/"
+appDataPath = os.path.join(repoPath, "dataset")
+path = os.path.join(appDataPath, inputFileName)
+
+hp = {}
+hp["epochs"] = 2
+hp["learning_rate"] = 0.001
+hp["is_save"] = False
+hp["num_neurons"] = 4
+hp["num_layers"] = 2
+hp["shapefile"] = os.path.join(repoPath, "dataset", expFileName)
+hp["num_collocation_points"] = 100
+issm = {}
+issm["data_path"] = path
+issm["data_size"] = {"u":100, "v":100, "s":100, "H":100, "C":None}
+hp["data"] = {"ISSM": issm}
+SSA = {}
+SSA["scalar_variables"] = {"B":1.26802073401e+08}
+hp["equations"] = {"SSA":SSA}
+
+def test_set_param():
+    p = {"equations": {"SSA": {"scalar_variables": {"B": 1.0}}}}
+    set_param(p, "equations.SSA.scalar_variables.B", 2.0)
+    set_param(p, "num_neurons", 5)
+    set_param(p, "data.ISSM.data_size", {"u": 10})
+    assert p == {"equations": {"SSA": {"scalar_variables": {"B": 2.0}}}, "num_neurons": 5, "data": {"ISSM": {"data_size": {"u": 10}}}}
+
+def test_trials():
+    sweep = pinn.Sweep(hp, {"num_neurons": [4, 8], "num_layers": [2, 3, 4]})
+    trials = sweep.trials()
+    assert len(trials) == 6
+    assert {"num_neurons": 8, "num_layers": 3} in trials
+    sweep = pinn.Sweep(hp, {"num_neurons": (4, 8), "learning_rate": (1e-4, 1e-2), "activation": ["tanh", "sin"]},
+            method="random", num_trials=5, seed=1)
+    trials = sweep.trials()
+    assert len(trials) == 5
+    assert all(isinstance(t["num_neurons"], int) and 4 <= t["num_neurons"] <= 8 for t in trials)
+    assert all(1e-4 <= t["learning_rate"] <= 1e-2 for t in trials)
+    with pytest.raises(ValueError):
+        pinn.Sweep(hp, {"num_neurons": (4, 8)}).trials()
+    with pytest.raises(ValueError):
+        pinn.Sweep(hp, {}, method="bayesian")
+
+def test_share_arrays():
+    arrays = {"ISSM": {"X_dict": {"x": np.arange(5.0)}, "mesh_dict": {"lat": np.array([])}}}
+    blocks, descriptors = share_arrays(arrays)
+    assert len(blocks) == 1
+    _, shared = attach_arrays(descriptors)
+    assert np.all(shared["ISSM"]["X_dict"]["x"] == np.arange(5.0))
+    assert shared["ISSM"]["mesh_dict"]["lat"].size == 0
+    with pytest.raises(ValueError):
+        shared["ISSM"]["X_dict"]["x"][0] = 1.0
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+def test_preloaded_data():
+    data = pinn.modeldata.Data(pinn.Parameters(hp).data)
+    data.load_data()
+    preloaded = {"ISSM": {"X_dict": data.data["ISSM"].X_dict, "data_dict": data.data["ISSM"].data_dict,
+                          "mask_dict": data.data["ISSM"].mask_dict, "mesh_dict": data.data["ISSM"].mesh_dict}}
+    experiment = pinn.PINN(hp, preloaded_data=preloaded)
+    assert experiment.model_data.data["ISSM"].X_dict["x"] is data.data["ISSM"].X_dict["x"]
+    assert experiment.model_data.X["u"].shape == (100, 2)
+
+def test_sweep_run(tmp_path):
+    hp["save_path"] = str(tmp_path)
+    sweep = pinn.Sweep(hp, {"num_neurons": [4, 6], "equations.SSA.scalar_variables.B": [1.2e8, 1.3e8]},
+            num_workers=2, num_threads=1)
+    table = sweep.run()
+    assert len(table) == 4
+    assert "error" not in table
+    assert list(table["steps"]) == [2]*4
+    assert np.all(np.diff(table["loss"]) >= 0)
+    assert set(table["num_neurons"]) == {4, 6}
+    assert "fSSA1" in table
+    sweep.save_summary()
+    assert os.path.isfile(os.path.join(tmp_path, "sweep.csv"))
+
+def test_successive_halving_promotion():
+    sh = pinn.SuccessiveHalving(hp, {"num_neurons": [4, 6, 8]}, min_iterations=10, max_iterations=100, reduction_factor=3)
+    assert sh.budgets == [10, 30, 90, 100]
+    pending = [0, 1, 2, 3]
+    assert sh.next_job(pending) == (0, 0)
+    sh.rungs[0] = {0: 3.0, 1: 1.0, 2: 2.0}
+    # the best of the top 1/3 is promoted once
+    assert sh.next_job(pending) == (1, 1)
+    assert sh.next_job(pending) == (1, 0)
+    # the promotion only depends on the losses of the rung
+    sh = pinn.SuccessiveHalving(hp, {"num_neurons": [4, 6, 8]}, min_iterations=10, max_iterations=100, reduction_factor=3)
+    sh.rungs[0] = {0: 3.0, 1: 1.0, 2: 2.0}
+    sh.owners = {0: 0, 1: 1, 2: 0}
+    assert sh.next_job([3]) == (1, 1)
+    assert sh.next_job([3]) == (3, 0)
+    # of 9 trials, at most 3 are promoted from rung 0, 1 from rung 1, and none from rung 2
+    assert sh.eliminated(9) == set()
+    sh.rungs[0].update({3: 4.0, 4: np.inf})
+    assert sh.eliminated(9) == {3, 4}
+    sh.promoted[1].add(1)
+    sh.rungs[1] = {1: 1.0}
+    sh.rungs[2] = {1: 1.0}
+    assert sh.eliminated(9) == {1, 3, 4}
+    sh.promoted[2].add(1)
+    sh.rungs[3] = {1: 1.0}
+    assert sh.eliminated(9) == {1, 3, 4}
+    with pytest.raises(ValueError):
+        pinn.SuccessiveHalving(hp, {}, min_iterations=10, max_iterations=5)
+
+def test_successive_halving_run(tmp_path):
+    hp["save_path"] = str(tmp_path)
+    sh = pinn.SuccessiveHalving(hp, {"num_neurons": [2, 4, 6, 8]}, method="grid", min_iterations=2, max_iterations=4,
+            reduction_factor=2, num_workers=2)
+    table = sh.run()
+    assert len(table) == 4
+    assert "error" not in table
+    # at least half of the trials are promoted to the last rung, more if a promoted trial falls out of the top half
+    # when the others finish, which depends on the order the workers finish
+    assert list(table["rung"][:2]) == [1, 1]
+    # the promoted trials continue from their models, or their checkpoints
+    assert list(table["steps"]) == [sh.budgets[r] for r in table["rung"]]
+    assert set(sh.owners.values()) <= {0, 1}
+    # a checkpoint at the end of rung 0 of each trial
+    for i in range(4):
+        assert os.path.isfile(os.path.join(tmp_path, f"trial-{i}", "checkpoints", "checkpoints.json"))
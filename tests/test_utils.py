@@ -1,8 +1,13 @@
 import pytest
 import tensorflow as tf
 import os
+import json
+import subprocess
+import sys
 import numpy as np
-from pinnicle.utils import save_dict_to_json, load_dict_from_json, data_misfit, load_mat, down_sample_core, down_sample
+from pinnicle.utils import save_dict_to_json, load_dict_from_json, data_misfit, load_mat, down_sample_core, grid_sample_core, down_sample, LearningRateSchedule, \
+        CheckpointWriter, list_checkpoints, load_checkpoint_file, set_threads, get_threads, History, \
+        load_mat_fields
 
 data = {"s":1, "v":[1, 2, 3]}
 
@@ -28,6 +33,76 @@ def test_data_misfit_functions():
     assert  data_misfit.get("MEAN_SQUARE_LOG")(tf.convert_to_tensor([1.0]),tf.convert_to_tensor([1.0])) == 0.0
     assert  data_misfit.get("MAPE")(tf.convert_to_tensor([1.0]),tf.convert_to_tensor([1.0])) == 0.0
 
+def test_learning_rate_schedule():
+    lr = LearningRateSchedule(1.0, name="exponential", decay_steps=10, decay_rate=0.5)
+    assert np.isclose(lr(0), 1.0) and np.isclose(lr(10), 0.5) and np.isclose(lr(5), 0.5**0.5)
+    lr = LearningRateSchedule(1.0, name="step", decay_steps=10, decay_rate=0.5)
+    assert np.isclose(lr(9), 1.0) and np.isclose(lr(10), 0.5)
+    lr = LearningRateSchedule(1.0, name="cosine", decay_steps=10, alpha=0.1)
+    assert np.isclose(lr(5), 0.55) and np.isclose(lr(10), 0.1) and np.isclose(lr(100), 0.1)
+    lr = LearningRateSchedule(1.0, name="inverse time", decay_steps=10, decay_rate=1.0)
+    assert np.isclose(lr(10), 0.5)
+    lr = LearningRateSchedule(1.0, name="constant", warmup_steps=4)
+    assert np.isclose(lr(0), 0.25) and np.isclose(lr(3), 1.0) and np.isclose(lr(100), 1.0)
+    lr = LearningRateSchedule(1.0, name="exponential", decay_steps=10, decay_rate=0.5, initial_step=10)
+    assert np.isclose(lr(0), 0.5)
+    with pytest.raises(ValueError):
+        LearningRateSchedule(1.0, name="linear")
+
+def test_checkpoint_writer(tmp_path):
+    writer = CheckpointWriter(str(tmp_path), keep_last=2, keep_best=True)
+    for step, loss in zip([1, 2, 3, 4], [5.0, 1.0, 3.0, 4.0]):
+        writer.submit(step, loss, {"w": np.ones(3)*step}, {"step": step})
+    writer.flush()
+    index = list_checkpoints(str(tmp_path))
+    assert [r["step"] for r in index["checkpoints"]] == [2, 3, 4]
+    assert index["best"] == 2
+    assert sorted(os.listdir(tmp_path)) == ["checkpoints.json", "ckpt-2.npz", "ckpt-3.npz", "ckpt-4.npz"]
+    arrays, meta = load_checkpoint_file(os.path.join(tmp_path, "ckpt-3.npz"))
+    assert np.all(arrays["w"] == 3)
+    assert meta["step"] == 3
+    # the index is read again by a new writer
+    assert CheckpointWriter(str(tmp_path)).index == index
+
+    # direct writes while the writer thread is running do not lose any checkpoint
+    path = os.path.join(tmp_path, "all")
+    writer = CheckpointWriter(path, keep_last=None)
+    for step in range(20):
+        writer.submit(2*step, 1.0, {"w": np.ones(100)}, {})
+        writer.write(2*step+1, 1.0, {"w": np.ones(100)}, {})
+    writer.flush()
+    assert [r["step"] for r in list_checkpoints(path)["checkpoints"]] == list(range(40))
+
+def test_load_metrics_stream(tmp_path):
+    records = [{"step": 0, "time": 1.0, "u": 3.0, "learning_rate": 0.1, "points_per_s": None},
+               {"step": 2, "time": 2.0, "u": 2.0, "learning_rate": 0.1, "points_per_s": 10.0},
+               {"step": 4, "time": 3.0, "u": 1.0, "learning_rate": 0.1, "points_per_s": 20.0},
+               # resumed from step 2
+               {"step": 2, "time": 4.0, "u": 1.5, "learning_rate": 0.1, "points_per_s": 30.0}]
+    with open(os.path.join(tmp_path, "metrics.jsonl"), "w") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in records))
+        # a record being written
+        f.write('{"step": 6, "ti')
+    history = History()
+    history.load(str(tmp_path), "metrics.jsonl")
+    assert history.history["steps"] == [0, 2, 4]
+    assert history.history["u"] == [3.0, 1.5, 1.0]
+    assert history.history["metrics"]["points_per_s"] == [None, 30.0, 20.0]
+
+def test_set_threads():
+    cpus = sorted(os.sched_getaffinity(0))
+    assert set_threads(cpu_affinity=cpus[:1])
+    assert sorted(os.sched_getaffinity(0)) == cpus[:1]
+    os.sched_setaffinity(0, cpus)
+    # the runtime of this process is initialized by the first op
+    tf.constant(1.0) + 1.0
+    assert set_threads(*get_threads())
+    assert set_threads(get_threads()[0]+1) == False
+    # a new process before any op is run
+    code = "from pinnicle.utils import set_threads, get_threads; assert set_threads(3, 2); print(get_threads())"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "(3, 2)"
+
 def test_loadmat():
     filename = "flightTracks.mat"
     repoPath = os.path.dirname(__file__) + "/../examples/"
@@ -41,6 +116,21 @@ def test_loadmat():
     path = os.path.join(appDataPath, filename)
     assert load_mat(path)
 
+def test_load_mat_fields():
+    repoPath = os.path.dirname(__file__) + "/../examples/"
+    appDataPath = os.path.join(repoPath, "dataset")
+    for filename in ["flightTracks.mat", "flightTracks73.mat"]:
+        path = os.path.join(appDataPath, filename)
+        data = load_mat(path)
+        fields = load_mat_fields(path, ["x", "y", "no_such_field"])
+        assert set(fields) == {"x", "y"}
+        assert np.array_equal(fields["x"], data["x"])
+
+    path = os.path.join(appDataPath, "Helheim_fastflow.mat")
+    fields = load_mat_fields(path, ["md/mesh/x", "md/friction/C", "md/friction/coefficient"])
+    assert set(fields) == {"md/mesh/x", "md/friction/C"}
+    assert fields["md/mesh/x"].shape == (23484,)
+
 def test_down_sample_core():
     filename = "flightTracks.mat"
     repoPath = os.path.dirname(__file__) + "/../examples/"
@@ -67,5 +157,30 @@ def test_down_sample():
         ind = down_sample(points, size)
         assert ind.shape == (size,)
 
+    # all the points if not enough
     ind = down_sample(points, 4000)
-    assert ind.shape == (3129,)
+    assert ind.shape == (3192,)
+
+    # the sizes of each variable from one downsample
+    ind = down_sample(points, {"u":100, "v":2000})
+    assert ind["u"].shape == (100,)
+    assert ind["v"].shape == (2000,)
+    assert len(np.unique(ind["v"])) == 2000
+
+    # no points needed
+    assert down_sample(points, {}) == {}
+    assert down_sample(points, 0).shape == (0,)
+    ind = down_sample(points, {"u":0, "v":0})
+    assert ind["u"].shape == (0,)
+    assert ind["v"].shape == (0,)
+
+def test_grid_sample_core():
+    points = np.vstack([[0, 0], [1, 1], np.random.default_rng(0).uniform(0, 1, (10000, 2))])
+    ind = grid_sample_core(points, resolution=11)
+    # one point in each cell, the nearest to the node
+    assert ind.shape == (121,)
+    scaled = points / 0.1
+    nodes = np.rint(scaled)
+    assert len(np.unique(nodes[ind], axis=0)) == 121
+    dist = np.linalg.norm(scaled - nodes, axis=1)
+    assert all(dist[i] == dist[np.all(nodes == nodes[i], axis=1)].min() for i in ind)